@@ -0,0 +1,27 @@
+"""add textos_base_chunks column to skills
+
+Revision ID: l8m9n0p1q2r3
+Revises: 9ecda614cab1
+Create Date: 2026-02-10 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'l8m9n0p1q2r3'
+down_revision: Union[str, None] = '9ecda614cab1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Skills existentes ficam com NULL e são fatiadas sob demanda até a próxima edição
+    op.add_column('skills', sa.Column('textos_base_chunks', sa.JSON(), nullable=True, comment='Trechos dos textos_base para recuperacao BM25 (gerado ao salvar)'))
+
+
+def downgrade() -> None:
+    op.drop_column('skills', 'textos_base_chunks')
@@ -0,0 +1,46 @@
+"""add documentos_conhecimento table
+
+Revision ID: m9n0p1q2r3s4
+Revises: l8m9n0p1q2r3
+Create Date: 2026-02-10 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm9n0p1q2r3s4'
+down_revision: Union[str, None] = 'l8m9n0p1q2r3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'documentos_conhecimento',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.String(length=36), nullable=False, comment='UUID devolvido pelo upload'),
+        sa.Column('projeto_id', sa.Integer(), nullable=False, comment='Projeto dono do documento'),
+        sa.Column('usuario_id', sa.Integer(), nullable=True, comment='Usuario que enviou'),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=150), nullable=True),
+        sa.Column('tamanho', sa.Integer(), nullable=False, comment='Tamanho do arquivo em bytes'),
+        sa.Column('texto', sa.Text(), nullable=True, comment='Texto extraido do arquivo'),
+        sa.Column('chunks', sa.JSON(), nullable=True, comment='Trechos do texto para recuperacao BM25'),
+        sa.Column('data_criacao', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('file_id'),
+    )
+    op.create_index(op.f('ix_documentos_conhecimento_id'), 'documentos_conhecimento', ['id'], unique=False)
+    op.create_index('idx_documentos_conhecimento_projeto', 'documentos_conhecimento', ['projeto_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_documentos_conhecimento_projeto', table_name='documentos_conhecimento')
+    op.drop_index(op.f('ix_documentos_conhecimento_id'), table_name='documentos_conhecimento')
+    op.drop_table('documentos_conhecimento')
@@ -0,0 +1,31 @@
+"""add sha256 to documentos_conhecimento
+
+Revision ID: n0p1q2r3s4t5
+Revises: m9n0p1q2r3s4
+Create Date: 2026-02-11 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'n0p1q2r3s4t5'
+down_revision: Union[str, None] = 'm9n0p1q2r3s4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'documentos_conhecimento',
+        sa.Column('sha256', sa.String(length=64), nullable=True, comment='SHA-256 do conteudo do arquivo'),
+    )
+    op.create_index('idx_documentos_conhecimento_sha256', 'documentos_conhecimento', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_documentos_conhecimento_sha256', table_name='documentos_conhecimento')
+    op.drop_column('documentos_conhecimento', 'sha256')
@@ -0,0 +1,44 @@
+"""add sessoes_chat table
+
+Revision ID: o1p2q3r4s5t6
+Revises: n0p1q2r3s4t5
+Create Date: 2026-02-12 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'o1p2q3r4s5t6'
+down_revision: Union[str, None] = 'n0p1q2r3s4t5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sessoes_chat',
+        sa.Column('id', sa.String(length=32), nullable=False, comment='UUID hex da sessão'),
+        sa.Column('projeto_id', sa.Integer(), nullable=False, comment='Projeto da conversa'),
+        sa.Column('usuario_id', sa.Integer(), nullable=False, comment='Dono da sessão'),
+        sa.Column('tipo_artefato', sa.String(length=50), nullable=False, comment='dfd, etp, tr, ...'),
+        sa.Column('mensagens', sa.JSON(), nullable=False),
+        sa.Column('attachments', sa.JSON(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=False),
+        sa.Column('data_atualizacao', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'idx_sessoes_chat_projeto_tipo_usuario', 'sessoes_chat',
+        ['projeto_id', 'tipo_artefato', 'usuario_id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_sessoes_chat_projeto_tipo_usuario', table_name='sessoes_chat')
+    op.drop_table('sessoes_chat')
@@ -0,0 +1,26 @@
+"""add (usuario_id, ativa) index to skills
+
+Revision ID: p2q3r4s5t6u7
+Revises: o1p2q3r4s5t6
+Create Date: 2026-02-13 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'p2q3r4s5t6u7'
+down_revision: Union[str, None] = 'o1p2q3r4s5t6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_skills_usuario_ativa', 'skills', ['usuario_id', 'ativa'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_skills_usuario_ativa', table_name='skills')
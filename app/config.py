@@ -90,10 +90,137 @@ class Settings(BaseSettings):
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     OPENROUTER_DEFAULT_MODEL: str = "arcee-ai/trinity-mini:free"
     OPENROUTER_TIMEOUT: int = 120
+    # Prefixos de modelo que exigem cache_control explícito para o cache de
+    # prompt do provedor (OpenAI/DeepSeek/etc. cacheiam o prefixo sozinhos)
+    LLM_CACHE_CONTROL_MODELS: str = "anthropic/,google/gemini"
+    # Cache de respostas idênticas (regenerar_campo, gerar_json): acima desta
+    # temperatura a variação é intencional e a resposta não é cacheada
+    LLM_RESPONSE_CACHE_ENABLED: bool = True
+    LLM_RESPONSE_CACHE_MAX_TEMPERATURE: float = 0.8
+    LLM_RESPONSE_CACHE_TTL_SECONDS: int = 600
+    # Regeneração de campo: janela só contra clique duplo/reenvio (depois, nova versão)
+    LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS: int = 15
+    LLM_RESPONSE_CACHE_MAX_BYTES: int = 256 * 1024
+    # Hedge: sem primeiro token do modelo principal dentro do atraso, dispara
+    # a mesma requisição num reserva e fica com o que responder primeiro.
+    # O atraso é o percentil LLM_HEDGE_PERCENTILE do TTFT observado (com ao
+    # menos LLM_HEDGE_MIN_SAMPLES amostras), limitado ao intervalo min/max.
+    # LLM_HEDGE_FALLBACK_MODELS: lista separada por vírgulas ("" = AVAILABLE_MODELS)
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_DELAY_MS: float = 4000
+    LLM_HEDGE_MIN_DELAY_MS: float = 1000
+    LLM_HEDGE_MAX_DELAY_MS: float = 15000
+    LLM_HEDGE_PERCENTILE: float = 90
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_FALLBACK_MODELS: str = ""
+    # Controle de admissão dos streams de chat/geração/regeneração: por
+    # usuário (ativos + fila, excedente = 429) e por worker (excedente
+    # espera na fila; fila cheia = 503). Recusas informam Retry-After
+    LLM_MAX_STREAMS_PER_USER: int = 3
+    LLM_MAX_STREAMS_PER_WORKER: int = 40
+    LLM_ADMISSION_QUEUE_SIZE: int = 20
+    LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS: int = 60
+    LLM_ADMISSION_RETRY_AFTER_SECONDS: int = 10
+    # Escalonador das chamadas ao LLM: streams simultâneos do worker ao
+    # provedor, com prioridade chat > regeneração > geração > lote e fila
+    # justa por usuário; RESERVED_INTERACTIVE vagas só o chat usa
+    LLM_SCHEDULER_MAX_CONCURRENT: int = 24
+    LLM_SCHEDULER_RESERVED_INTERACTIVE: int = 6
+    # Saúde dos modelos: sonda periódica de TTFT, tokens/s e erros de cada
+    # modelo de AVAILABLE_MODELS (janela de MODEL_HEALTH_WINDOW resultados).
+    # Saudável = ao menos MODEL_HEALTH_MIN_SAMPLES resultados e taxa de erro
+    # até MODEL_HEALTH_MAX_ERROR_RATE. A sonda só roda com MODEL_ROUTING_POLICY
+    # ou LLM_HEDGING_ENABLED ligados (são eles que usam as medições); a cada
+    # ciclo um único worker sonda (lock no Redis) e publica aos demais
+    MODEL_HEALTH_ENABLED: bool = True
+    MODEL_HEALTH_INTERVAL_SECONDS: int = 300
+    MODEL_HEALTH_WINDOW: int = 50
+    MODEL_HEALTH_MIN_SAMPLES: int = 3
+    MODEL_HEALTH_MAX_ERROR_RATE: float = 0.3
+    MODEL_HEALTH_PROBE_CONCURRENCY: int = 4
+    MODEL_HEALTH_PROBE_MAX_TOKENS: int = 8
+    MODEL_HEALTH_PROBE_TIMEOUT: float = 30.0
+    # Roteamento quando o usuário não escolhe modelo: "" (usa o padrão),
+    # "fastest_healthy" ou "cheapest_under_slo" (TTFT p90 até o SLO)
+    MODEL_ROUTING_POLICY: str = ""
+    MODEL_ROUTING_SLO_TTFT_MS: float = 5000
+
+    # ========== HTTP (POOLS DE CONEXÃO) ==========
+    HTTP2_ENABLED: bool = True
+    HTTP_POOL_MAX_CONNECTIONS: int = 20
+    HTTP_POOL_MAX_KEEPALIVE: int = 10
+    HTTP_POOL_MAX_CONNECTIONS_LLM: int = 100
+    HTTP_POOL_MAX_KEEPALIVE_LLM: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
 
     # ========== REDIS ==========
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # ========== STREAMING ==========
+    # Tempo (s) que os eventos de uma geração ficam disponíveis para retomada
+    GENERATION_BUFFER_TTL_SECONDS: int = 900
+    # Sem nenhum leitor por este tempo, o stream do LLM da geração é cancelado
+    GENERATION_ORPHAN_GRACE_SECONDS: int = 60
+    # Campos faltantes/inválidos ao fim da geração são pedidos de novo (só eles)
+    GENERATION_REPAIR_ENABLED: bool = True
+    # Artefatos com seções definidas no agente (ETP, TR, Edital) são gerados
+    # em chamadas paralelas, uma por seção
+    GENERATION_SECTIONED_ENABLED: bool = True
+
+    # ========== SESSÕES DE CHAT ==========
+    # Validade da cópia da sessão no Redis (a cópia no banco não expira)
+    CHAT_SESSION_TTL_SECONDS: int = 24 * 3600
+
+    # ========== CONTEXTO DOS AGENTES ==========
+    # Idade máxima do snapshot de contexto do chat por projeto (invalidado
+    # também a cada commit de projeto, artefatos ou PAC)
+    CONTEXT_CACHE_TTL_SECONDS: int = 300
+    # Idade máxima das skills resolvidas por usuário (invalidadas também
+    # a cada alteração em /api/skills)
+    SKILL_CACHE_TTL_SECONDS: int = 300
+    # Orçamento (tokens estimados) do prompt enviado ao LLM
+    LLM_CONTEXT_BUDGET_CHAT: int = 12000
+    LLM_CONTEXT_BUDGET_GENERATE: int = 24000
+    # Trechos dos textos_base de cada skill incluídos por mensagem (BM25)
+    SKILL_RETRIEVAL_TOP_K: int = 4
+    # Trechos de cada documento da base de conhecimento do projeto (chat / geração)
+    KB_RETRIEVAL_TOP_K: int = 5
+    KB_RETRIEVAL_TOP_K_GENERATE: int = 8
+    # Resumo rolante do histórico: acima deste total estimado, as mensagens
+    # antigas são condensadas por SUMMARY_MODEL ("" = OPENROUTER_DEFAULT_MODEL)
+    SUMMARY_TRIGGER_TOKENS: int = 3000
+    SUMMARY_KEEP_RECENT_MESSAGES: int = 6
+    SUMMARY_MODEL: str = ""
+    SUMMARY_MAX_TOKENS: int = 800
+    SUMMARY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    # Espera máxima por vaga no escalonador; estourada, o turno segue sem resumo
+    SUMMARY_SCHEDULER_WAIT_SECONDS: float = 5.0
+
+    # ========== DASHBOARD (ATUALIZAÇÃO EM SEGUNDO PLANO) ==========
+    # Catálogo e ping dos modelos exibidos nas páginas, compartilhados via
+    # Redis; cada worker relê o Redis no máximo a cada LOCAL_SECONDS
+    MODEL_CATALOG_REFRESH_SECONDS: int = 300
+    MODEL_CATALOG_PING_CONCURRENCY: int = 4
+    MODEL_CATALOG_LOCAL_SECONDS: int = 30
+    # Feeds RSS de notícias: último resultado bom fica no Redis
+    NEWS_FEED_REFRESH_SECONDS: int = 900
+    NEWS_FEED_LOCAL_SECONDS: int = 60
+    NEWS_FEED_MAX_ITEMS: int = 20
+
+    # ========== UPLOADS ==========
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    # Arquivos temporários em tmp/uploads são removidos após este tempo
+    UPLOAD_TTL_SECONDS: int = 24 * 3600
+    UPLOAD_SWEEP_INTERVAL_SECONDS: int = 3600
+
+    # ========== EXTRAÇÃO DE TEXTO (UPLOADS) ==========
+    # Processos do pool de extração (0 = min(4, CPUs))
+    EXTRACTION_WORKERS: int = 0
+    # PDFs maiores são divididos em faixas de N páginas extraídas em paralelo
+    EXTRACTION_PDF_PAGES_PER_TASK: int = 25
+    # Validade do cache de texto extraído por SHA-256 (Redis)
+    EXTRACTION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
     # ========== ADMIN ==========
     # Senha do admin inicial (NUNCA usar valor padrão em produção!)
     ADMIN_PASSWORD: str = ""
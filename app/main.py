@@ -7,7 +7,7 @@ Autor: Equipe TRE-GO
 Data: Janeiro 2026
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -75,6 +75,10 @@ limiter = Limiter(
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação (startup e shutdown)"""
     # --- STARTUP ---
+    # Pools HTTP compartilhados (Compras.gov, OpenRouter, Google News)
+    from .services.http_clients import http_clients
+    await http_clients.start()
+
     # Criar tabelas do banco de dados (Async)
     from .init_data import criar_tabelas, criar_usuario_admin, importar_pac_csv, criar_skills_sistema
     await criar_tabelas()
@@ -90,9 +94,51 @@ async def lifespan(app: FastAPI):
         finally:
             await db.close()
     
-    yield
+    # Cache de prompts dos agentes (aquecido aqui, invalidado via Redis pub/sub)
+    from .services.agents.prompt_loader import prompt_cache
+    try:
+        await prompt_cache.aquecer()
+    except Exception as e:
+        logger.warning(f"Falha ao aquecer cache de prompts (será preenchido sob demanda): {e}")
+    prompt_cache.iniciar_listener()
+    
+    # Snapshots de contexto do chat (invalidados via Redis pub/sub entre workers)
+    from .services.context_cache import context_cache
+    context_cache.iniciar_listener()
+    from .services.skill_resolver import skill_resolver
+    skill_resolver.iniciar_listener()
+    
+    # Limpeza periódica dos uploads temporários
+    from .services.upload_storage import upload_sweeper
+    upload_sweeper.iniciar()
     
+    # Sonda periódica de saúde dos modelos (roteamento e hedge)
+    from .services.model_health import model_health
+    model_health.iniciar()
+    
+    # Catálogo/ping dos modelos e notícias do dashboard (Redis, atualizados em segundo plano)
+    from .services.model_catalog import model_catalog
+    model_catalog.iniciar()
+    from .services.news_feed import news_feed
+    news_feed.iniciar()
+    
+    yield
+
     # --- SHUTDOWN ---
+    from .services.generation_buffer import generation_buffer
+    await generation_buffer.encerrar()
+    await upload_sweeper.parar()
+    await model_health.parar()
+    await model_catalog.parar()
+    await news_feed.parar()
+    from .services.text_extraction import encerrar_pool
+    encerrar_pool()
+    await prompt_cache.parar_listener()
+    await context_cache.parar_listener()
+    await skill_resolver.parar_listener()
+    await http_clients.close()
+    from .services.redis_client import close_redis
+    await close_redis()
 
 
 # ========== CRIAR APLICAÇÃO FASTAPI ==========
@@ -140,6 +186,28 @@ async def health_check():
     }
 
 
+from .auth import current_superuser
+
+
+@app.get("/health/metrics", dependencies=[Depends(current_superuser)])
+async def health_metrics():
+    """Métricas em processo do worker (pools HTTP, contadores, latências). Apenas superusuários."""
+    from .services.http_clients import http_clients
+    from .services.metrics import metrics
+    from .services.agents.prompt_caching import taxa_acerto
+    from .services.agents.response_cache import response_cache
+    from .services.admission import admission
+    from .services.agents.llm_scheduler import llm_scheduler
+    return {
+        "http_pools": http_clients.metricas(),
+        "admissao_llm": admission.estado(),
+        "escalonador_llm": llm_scheduler.estado(),
+        "prompt_cache_provedor": taxa_acerto(),
+        "cache_respostas_llm": response_cache.taxa_acerto(),
+        **metrics.snapshot(),
+    }
+
+
 # ========== ARQUIVOS ESTATICOS ==========
 
 # Montar pasta static para servir CSS, JS, imagens
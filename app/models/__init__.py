@@ -18,6 +18,8 @@ from .artefatos import (
 from .projeto import Projeto
 from .skill import Skill
 from .prompt_template import PromptTemplate
+from .documento_conhecimento import DocumentoConhecimento
+from .sessao_chat import SessaoChat
 
 # Re-export field configs from config module for backwards compatibility
 from app.config_fields.fields_config import (
@@ -31,6 +33,8 @@ __all__ = [
     "Projeto",
     "Skill",
     "PromptTemplate",
+    "DocumentoConhecimento",
+    "SessaoChat",
     "DFD",
     "ETP",
     "TR",
@@ -0,0 +1,62 @@
+"""
+Sistema LIA - Modelo de Documento da Base de Conhecimento
+=========================================================
+Arquivos enviados pelo usuário no chat de um projeto (PDF, DOCX, MD,
+TXT). O texto é extraído uma única vez no upload e gravado já fatiado
+em trechos; o chat referencia o documento pelo file_id e o agente
+recupera apenas os trechos relevantes para cada mensagem.
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
+
+from app.database import Base
+from app.utils.datetime_utils import now_brasilia
+
+
+class DocumentoConhecimento(Base):
+    """Documento anexado a um projeto, com texto extraído e trechos indexáveis."""
+    __tablename__ = "documentos_conhecimento"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(String(36), nullable=False, unique=True, comment="UUID devolvido pelo upload")
+    projeto_id = Column(
+        Integer,
+        ForeignKey("projetos.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Projeto dono do documento"
+    )
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True, comment="Usuario que enviou")
+
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(150), nullable=True)
+    tamanho = Column(Integer, nullable=False, default=0, comment="Tamanho do arquivo em bytes")
+    sha256 = Column(String(64), nullable=True, comment="SHA-256 do conteudo do arquivo")
+
+    texto = Column(Text, nullable=True, comment="Texto extraido do arquivo")
+    # Lista de objetos: [{"doc": 0, "titulo": "arquivo.pdf", "ordem": 0, "texto": "..."}]
+    chunks = Column(JSON, nullable=True, comment="Trechos do texto para recuperacao BM25")
+
+    data_criacao = Column(DateTime, default=now_brasilia, nullable=False)
+
+    __table_args__ = (
+        Index('idx_documentos_conhecimento_projeto', 'projeto_id'),
+        Index('idx_documentos_conhecimento_sha256', 'sha256'),
+    )
+
+    def __repr__(self):
+        return f"<DocumentoConhecimento(file_id='{self.file_id}', projeto_id={self.projeto_id}, filename='{self.filename}')>"
+
+    def to_dict(self):
+        """Metadados do documento (sem texto/trechos)."""
+        return {
+            "file_id": self.file_id,
+            "projeto_id": self.projeto_id,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "size": self.tamanho,
+            "chunks": len(self.chunks or []),
+            "data_criacao": self.data_criacao.isoformat() if self.data_criacao else None,
+        }
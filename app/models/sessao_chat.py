@@ -0,0 +1,48 @@
+"""
+Sistema LIA - Modelo de Sessão de Chat
+======================================
+Histórico das conversas do chat de artefatos mantido no servidor.
+
+A cópia de trabalho fica no Redis (services/chat_sessions.py); esta
+tabela é a cópia durável, usada quando a chave do Redis expira ou o
+Redis está indisponível. O cliente envia apenas a nova mensagem e o id
+da sessão.
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+
+from app.database import Base
+from app.utils.datetime_utils import now_brasilia
+
+
+class SessaoChat(Base):
+    """Conversa de um usuário no chat de um artefato de um projeto."""
+    __tablename__ = "sessoes_chat"
+
+    id = Column(String(32), primary_key=True, comment="UUID hex da sessão")
+    projeto_id = Column(
+        Integer,
+        ForeignKey("projetos.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Projeto da conversa"
+    )
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False, comment="Dono da sessão")
+    tipo_artefato = Column(String(50), nullable=False, comment="dfd, etp, tr, ...")
+
+    # [{"role": "user"|"assistant", "content": "...", "tokens": 123}]
+    mensagens = Column(JSON, nullable=False, default=list)
+    # Referências dos anexos da conversa ({type, filename, file_id, ...})
+    attachments = Column(JSON, nullable=True)
+
+    data_criacao = Column(DateTime, default=now_brasilia, nullable=False)
+    data_atualizacao = Column(DateTime, default=now_brasilia, onupdate=now_brasilia, nullable=False)
+
+    __table_args__ = (
+        Index('idx_sessoes_chat_projeto_tipo_usuario', 'projeto_id', 'tipo_artefato', 'usuario_id'),
+    )
+
+    def __repr__(self):
+        return f"<SessaoChat(id='{self.id}', projeto_id={self.projeto_id}, tipo='{self.tipo_artefato}')>"
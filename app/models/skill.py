@@ -10,7 +10,7 @@ Autor: Equipe TRE-GO
 Data: Fevereiro 2026
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -58,6 +58,14 @@ class Skill(Base):
         comment="Base de conhecimento textual (full-text) para injetar no prompt"
     )
 
+    # Trechos dos textos_base, gerados ao salvar (services/retrieval.py)
+    # Lista de objetos: [{"doc": 0, "titulo": "...", "ordem": 0, "texto": "..."}]
+    textos_base_chunks = Column(
+        JSON,
+        nullable=True,
+        comment="Trechos dos textos_base para recuperacao BM25 (gerado ao salvar)"
+    )
+
     # Timestamps
     data_criacao = Column(DateTime, default=now_brasilia, nullable=False)
     data_atualizacao = Column(DateTime, default=now_brasilia, onupdate=now_brasilia, nullable=False)
@@ -65,6 +73,11 @@ class Skill(Base):
     # Relacionamentos
     usuario = relationship("User", back_populates="skills")
 
+    __table_args__ = (
+        # Skills ativas do usuario (services/skill_resolver)
+        Index('idx_skills_usuario_ativa', 'usuario_id', 'ativa'),
+    )
+
     def __repr__(self):
         return f"<Skill(id={self.id}, nome='{self.nome}', escopo='{self.escopo}')>"
 
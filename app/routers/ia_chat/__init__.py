@@ -9,10 +9,11 @@ Each artefact has a config file (dfd.py, etp.py, etc.) that defines:
 - Context dependencies (which artefacts to load)
 - Optional extra fields
 
-The factory (criar_chat_router) generates 4 endpoints per config:
+The factory (criar_chat_router) generates these endpoints per config:
 - GET /{tipo}/chat/init/{projeto_id}
 - POST /{tipo}/chat/{projeto_id}
 - POST /{tipo}/chat/{projeto_id}/gerar
+- GET /{tipo}/chat/{projeto_id}/gerar/{generation_id}/stream
 - POST /{tipo}/chat/{projeto_id}/regenerar-campo
 """
 
@@ -6,45 +6,84 @@ Eliminates context builder duplication from ia_native.py.
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import String, literal, select, union_all
 from sqlalchemy.orm import selectinload
 from typing import List, Dict, Any, Optional
 import logging
 
 from app.models.projeto import Projeto
 from app.models.user import User
-from app.models.skill import Skill
 from app.models.artefatos import DFD, ETP, TR, Riscos, Edital, PesquisaPrecos
 from app.models.pac import PAC
 from app.services.agents import ChatContext
+from app.services.knowledge_base import carregar_documentos
+from app.services.context_cache import context_cache
+from app.services.skill_resolver import skill_resolver
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+# context_deps key -> (ChatContext field, model) for the approved-artefact lookup
+ARTEFATOS_CONTEXTO = {
+    "dfd": ("dfd", DFD),
+    "pp": ("pesquisa_precos", PesquisaPrecos),
+    "pesquisa_precos": ("pesquisa_precos", PesquisaPrecos),
+    "etp": ("etp", ETP),
+    "pgr": ("pgr", Riscos),
+    "riscos": ("pgr", Riscos),
+    "tr": ("tr", TR),
+    "edital": ("edital", Edital),
+}
+
+
 async def construir_contexto_chat(
     projeto_id: int,
     db: AsyncSession,
     tipo_artefato: str,
-    context_deps: Optional[List[str]] = None
+    context_deps: Optional[List[str]] = None,
+    usuario_id: Optional[int] = None,
 ) -> ChatContext:
     """
     Generic chat context builder.
     Loads project + dependencies based on context_deps list.
+
+    The project part is served from the per-project snapshot cache
+    (services/context_cache), invalidated whenever the project, its
+    artefacts or PAC items are committed. Skills are resolved per user
+    (services/skill_resolver) on top of the snapshot.
     
     Args:
         projeto_id: Project ID
         db: AsyncSession
         tipo_artefato: "dfd", "etp", "pgr", "tr", "edital", "je", etc.
         context_deps: List of artefact keys to load (e.g., ["dfd", "pp", "pgr"])
+        usuario_id: Current user (their own skills are added to the system ones)
     
     Returns:
-        ChatContext with loaded data
+        ChatContext with loaded data (a copy the caller may mutate)
     """
     
     # Default deps: load everything commonly needed
     if context_deps is None:
         context_deps = ["dfd", "pp", "etp", "pgr", "tr"]
+
+    context = await context_cache.obter(
+        projeto_id,
+        context_deps,
+        lambda: _carregar_contexto(projeto_id, db, tipo_artefato, context_deps),
+    )
+    context.skills = await carregar_skills_ativas(usuario_id, db)
+    return context
+
+
+async def _carregar_contexto(
+    projeto_id: int,
+    db: AsyncSession,
+    tipo_artefato: str,
+    context_deps: List[str],
+) -> ChatContext:
+    """Build the ChatContext from the database (cache miss)."""
     
     # Fetch project
     stmt = select(Projeto).where(Projeto.id == projeto_id)
@@ -86,61 +125,7 @@ async def construir_contexto_chat(
                 })
     
     # Load requested artefacts (only approved/published versions)
-    context_data = {}
-    
-    if "dfd" in context_deps:
-        stmt = select(DFD).where(
-            (DFD.projeto_id == projeto_id) & (DFD.status.in_(["aprovado", "publicado"]))
-        ).order_by(DFD.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        dfd = result.scalars().first()
-        if dfd:
-            context_data["dfd"] = {"versao": dfd.versao, "status": dfd.status}
-    
-    if "pp" in context_deps or "pesquisa_precos" in context_deps:
-        stmt = select(PesquisaPrecos).where(
-            (PesquisaPrecos.projeto_id == projeto_id) & (PesquisaPrecos.status.in_(["aprovado", "publicado"]))
-        ).order_by(PesquisaPrecos.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        pp = result.scalars().first()
-        if pp:
-            context_data["pesquisa_precos"] = {"versao": pp.versao, "status": pp.status}
-    
-    if "etp" in context_deps:
-        stmt = select(ETP).where(
-            (ETP.projeto_id == projeto_id) & (ETP.status.in_(["aprovado", "publicado"]))
-        ).order_by(ETP.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        etp = result.scalars().first()
-        if etp:
-            context_data["etp"] = {"versao": etp.versao, "status": etp.status}
-    
-    if "pgr" in context_deps or "riscos" in context_deps:
-        stmt = select(Riscos).where(
-            (Riscos.projeto_id == projeto_id) & (Riscos.status.in_(["aprovado", "publicado"]))
-        ).order_by(Riscos.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        pgr = result.scalars().first()
-        if pgr:
-            context_data["pgr"] = {"versao": pgr.versao, "status": pgr.status}
-    
-    if "tr" in context_deps:
-        stmt = select(TR).where(
-            (TR.projeto_id == projeto_id) & (TR.status.in_(["aprovado", "publicado"]))
-        ).order_by(TR.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        tr = result.scalars().first()
-        if tr:
-            context_data["tr"] = {"versao": tr.versao, "status": tr.status}
-    
-    if "edital" in context_deps:
-        stmt = select(Edital).where(
-            (Edital.projeto_id == projeto_id) & (Edital.status.in_(["aprovado", "publicado"]))
-        ).order_by(Edital.data_criacao.desc()).limit(1)
-        result = await db.execute(stmt)
-        edital = result.scalars().first()
-        if edital:
-            context_data["edital"] = {"versao": edital.versao, "status": edital.status}
+    context_data = await carregar_artefatos_aprovados(projeto_id, context_deps, db)
     
     # Build ChatContext
     context = ChatContext(
@@ -155,50 +140,73 @@ async def construir_contexto_chat(
         tr=context_data.get("tr"),
     )
     
-    # Load active skills
-    skills = await carregar_skills_ativas(projeto_id, db)
-    context.skills = skills
-    
     logger.info(f"[Context] Built for {tipo_artefato}: {len(context_data)} artefacts loaded")
     
     return context
 
 
-async def carregar_skills_ativas(projeto_id: int, db: AsyncSession) -> List[Dict[str, Any]]:
+async def carregar_artefatos_aprovados(
+    projeto_id: int,
+    context_deps: List[str],
+    db: AsyncSession,
+) -> Dict[str, Dict[str, Any]]:
     """
-    Load active skills for project (system + user-created).
-    
-    Returns list of skill dicts with nome, instrucoes, textos_base, etc.
+    Latest approved/published version of each requested artefact.
+
+    One UNION ALL round trip instead of one query per artefact type.
+    Returns {context field: {"versao", "status"}}.
     """
-    
-    # System skills (escopo='system')
-    stmt = select(Skill).where(Skill.escopo == "system").order_by(Skill.nome)
-    result = await db.execute(stmt)
-    system_skills = result.scalars().all()
-    
-    # User skills for this project
-    stmt = select(Skill).where(
-        (Skill.usuario_id != None) & (Skill.ativa == True)
-    ).order_by(Skill.nome)
+    campos = {}
+    for dep in context_deps:
+        if dep in ARTEFATOS_CONTEXTO:
+            campo, modelo = ARTEFATOS_CONTEXTO[dep]
+            campos[campo] = modelo
+    if not campos:
+        return {}
+
+    consultas = [
+        select(
+            literal(campo, String).label("campo"),
+            modelo.versao.label("versao"),
+            modelo.status.label("status"),
+        ).where(
+            (modelo.projeto_id == projeto_id) & (modelo.status.in_(["aprovado", "publicado"]))
+        ).order_by(modelo.data_criacao.desc()).limit(1).subquery()
+        for campo, modelo in campos.items()
+    ]
+    selects = [select(sub) for sub in consultas]
+    stmt = selects[0] if len(selects) == 1 else union_all(*selects)
     result = await db.execute(stmt)
-    user_skills = result.scalars().all()
-    
-    # Convert to dicts
-    skills = []
-    for skill in system_skills + user_skills:
-        skills.append({
-            "id": skill.id,
-            "nome": skill.nome,
-            "descricao": skill.descricao,
-            "instrucoes": skill.instrucoes,
-            "escopo": skill.escopo,
-            "tools": skill.tools,
-            "textos_base": skill.textos_base or [],
-        })
-    
-    logger.info(f"[Skills] Loaded {len(skills)} skills for projeto {projeto_id}")
-    
-    return skills
+    return {row.campo: {"versao": row.versao, "status": row.status} for row in result}
+
+
+async def carregar_skills_ativas(usuario_id: Optional[int], db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Active skills for the user (system + the user's own active skills).
+
+    Returns list of skill dicts with nome, instrucoes, textos_base titles
+    and textos_base_chunks (see services/skill_resolver).
+    """
+    return await skill_resolver.resolver(db, usuario_id)
+
+
+async def carregar_documentos_anexos(
+    projeto_id: int,
+    attachments: Optional[List[Dict[str, Any]]],
+    db: AsyncSession,
+) -> List[Dict[str, Any]]:
+    """
+    Resolve attachments that reference the project knowledge base.
+
+    Attachments carrying a file_id and no extracted_text were persisted on
+    upload; their chunks are loaded here so the agent can retrieve only
+    the relevant passages.
+    """
+    file_ids = [
+        att["file_id"] for att in (attachments or [])
+        if att.get("file_id") and not att.get("extracted_text")
+    ]
+    return await carregar_documentos(db, projeto_id, file_ids)
 
 
 def stream_agent_response(agent_output: str) -> str:
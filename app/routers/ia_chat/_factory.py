@@ -1,7 +1,8 @@
 """
 Sistema LIA - Chat Router Factory
 ==================================
-Generic factory that creates 4 chat endpoints for any artefact type.
+Generic factory that creates the chat endpoints for any artefact type:
+init, chat, gerar, the gerar resume stream (SSE v2) and regenerar-campo.
 
 Eliminates 80% code duplication across DFD, ETP, PGR, TR, Edital, etc.
 Each config defines only its differences:
@@ -11,27 +12,117 @@ Each config defines only its differences:
 - Optional extra fields
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 from dataclasses import dataclass
-import json
+from contextlib import aclosing
 import logging
 import asyncio
 from datetime import datetime
 
 from app.database import get_db
-from app.config import settings
 from app.auth import current_active_user as auth_get_current_user
 from app.models.user import User
 from app.schemas.ia_schemas import ChatMessageInput, ChatGenerateInput, ChatInitResponse, RegenerarCampoInput, Message
 from app.services.agents import ConversationalAgent
-from ._context import carregar_skills_ativas, stream_agent_response
+from app.services.agents.llm_client import get_agent
+from ._context import carregar_documentos_anexos, stream_agent_response
+from app.services.generation_buffer import generation_buffer
+from app.services.stream_cancel import cancelar_ao_desconectar
+from app.services.admission import admission, AdmissaoRecusada
+from app.services.chat_sessions import chat_sessions, EstadoSessao
+from app.services.agents.json_stream import IncrementalJSONParser, validar_campo, campos_faltantes
+from app.models.artefatos import ARTEFATO_MAP
+from app.config import settings
+from ._sse import SSEEncoder, PROTOCOLO_V2, negociar_protocolo, headers_sse
 
 logger = logging.getLogger(__name__)
 
 
+def verificar_admissao(current_user: User) -> None:
+    """Fast 429/503 (with Retry-After) before building a stream over the concurrency limits."""
+    try:
+        admission.verificar(current_user.id)
+    except AdmissaoRecusada as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def admitir_stream(usuario_id: int, sse: SSEEncoder, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Holds an admission slot for the whole stream.
+    
+    While queued, the position is sent as 'queue' events; the slot is
+    released when the stream ends, fails or is cancelled.
+    """
+    try:
+        async with admission.vaga(usuario_id) as vaga:
+            async for posicao in vaga.aguardar():
+                yield sse.evento({'type': 'queue', 'position': posicao})
+            async with aclosing(stream):
+                async for frame in stream:
+                    yield frame
+    except AdmissaoRecusada as e:
+        yield sse.erro(str(e), {'retry_after': e.retry_after})
+
+
+async def intercalar_streams(streams: List[AsyncIterator[Any]]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Runs several streams concurrently, yielding (stream index, item) in arrival order.
+    
+    An exception in any stream is re-raised here; closing this generator
+    cancels (and closes) the streams still running.
+    """
+    fila: asyncio.Queue = asyncio.Queue()
+    fim = object()
+    
+    async def bombear(i: int, stream: AsyncIterator[Any]) -> None:
+        try:
+            async with aclosing(stream):
+                async for item in stream:
+                    await fila.put((i, item))
+        except Exception as e:
+            await fila.put((i, e))
+        finally:
+            await fila.put((i, fim))
+    
+    tarefas = [asyncio.create_task(bombear(i, s)) for i, s in enumerate(streams)]
+    try:
+        restantes = len(tarefas)
+        while restantes:
+            i, item = await fila.get()
+            if item is fim:
+                restantes -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield i, item
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+async def secao_tolerante(stream: AsyncIterator[Any], secao: List[str]) -> AsyncIterator[Any]:
+    """A failed section only loses its fields (re-requested afterwards), not the whole generation."""
+    try:
+        async with aclosing(stream):
+            async for item in stream:
+                yield item
+    except Exception as e:
+        logger.warning(f"[Sectioned Gen] Section {secao} failed: {e}")
+
+
+# Chat types whose ARTEFATO_MAP key differs
+_TIPO_ARTEFATO = {"justificativa_excepcionalidade": "jep"}
+
+
+def campos_do_artefato(tipo: str) -> Dict[str, Dict[str, Any]]:
+    """Field config (*_CAMPOS_CONFIG) used to validate generated fields."""
+    return ARTEFATO_MAP.get(_TIPO_ARTEFATO.get(tipo, tipo), {}).get("config", {})
+
+
 @dataclass
 class ArtefactChatConfig:
     """Configuration for an artefact chat endpoint factory"""
@@ -46,7 +137,7 @@ class ArtefactChatConfig:
 
 def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
     """
-    Factory: creates 4 endpoints for an artefact's chat flow.
+    Factory: creates the chat endpoints for an artefact's chat flow.
     
     Args:
         config: ArtefactChatConfig with tipo, agent_class, context_deps, etc.
@@ -56,6 +147,7 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
         - GET /chat/init/{projeto_id}
         - POST /chat/{projeto_id}
         - POST /chat/{projeto_id}/gerar
+        - GET  /chat/{projeto_id}/gerar/{generation_id}/stream (resume, SSE v2)
         - POST /chat/{projeto_id}/regenerar-campo
     """
     
@@ -64,6 +156,28 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
     # Import here to avoid circular imports
     from ._context import construir_contexto_chat
     
+    async def carregar_historico(
+        projeto_id: int,
+        body: Any,
+        current_user: User,
+    ) -> "tuple[Optional[EstadoSessao], List[Message], List[Dict[str, Any]]]":
+        """
+        Resolve (session, history, attachments) for a chat/gerar request.
+        
+        With session_id the history comes from the server-side session;
+        without it, from the legacy `history` field sent by the client.
+        """
+        if not body.session_id:
+            history = [Message(role=msg["role"], content=msg["content"]) for msg in body.history]
+            return None, history, body.attachments or []
+        
+        sessao = await chat_sessions.obter(body.session_id, projeto_id, config.tipo, current_user.id)
+        if sessao is None:
+            raise HTTPException(status_code=404, detail="Sessão de chat não encontrada ou expirada")
+        # None: client did not send the field; [] means the user removed every attachment
+        attachments = sessao.attachments if body.attachments is None else body.attachments
+        return sessao, sessao.historico(), attachments
+    
     # ========== INIT ==========
     @router.get("/chat/init/{projeto_id}", response_model=ChatInitResponse)
     async def init_chat(
@@ -79,18 +193,24 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
                 projeto_id=projeto_id,
                 db=db,
                 tipo_artefato=config.tipo,
-                context_deps=config.context_deps
+                context_deps=config.context_deps,
+                usuario_id=current_user.id,
             )
             
-            skills = await carregar_skills_ativas(projeto_id, db)
+            welcome_message = f"Bem-vindo ao fluxo de {config.label}! 🚀"
+            sessao = await chat_sessions.criar(
+                projeto_id, config.tipo, current_user.id,
+                mensagens=[("assistant", welcome_message)],
+            )
             
             return ChatInitResponse(
                 projeto_id=projeto_id,
                 projeto_titulo=context.projeto_titulo,
                 setor_usuario=context.setor_usuario,
-                welcome_message=f"Bem-vindo ao fluxo de {config.label}! 🚀",
+                welcome_message=welcome_message,
                 initial_fields=[],  # Pode ser customizado por config
-                skills_ativas=skills
+                skills_ativas=context.skills,
+                session_id=sessao.id,
             )
         except Exception as e:
             logger.error(f"[{config.tipo.upper()} Init] Erro: {e}")
@@ -102,11 +222,14 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
     async def chat_message(
         projeto_id: int,
         body: ChatMessageInput,
+        request: Request,
         db: AsyncSession = Depends(get_db),
         current_user: User = Depends(auth_get_current_user),
     ):
         """Chat stream — responde mensagens do usuário"""
+        verificar_admissao(current_user)
         logger.info(f"[{config.tipo.upper()} Chat] Projeto {projeto_id}, msg: {body.content[:50]}...")
+        sessao, history, attachments = await carregar_historico(projeto_id, body, current_user)
         
         try:
             # Build context
@@ -114,55 +237,72 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
                 projeto_id=projeto_id,
                 db=db,
                 tipo_artefato=config.tipo,
-                context_deps=config.context_deps
+                context_deps=config.context_deps,
+                usuario_id=current_user.id,
             )
+            context.documentos = await carregar_documentos_anexos(projeto_id, attachments, db)
             
-            # Convert history to Message objects
-            history = [
-                Message(role=msg["role"], content=msg["content"])
-                for msg in body.history
-            ]
-            
-            # Create agent
-            modelo_ia = body.model or settings.OPENROUTER_DEFAULT_MODEL
-            agent = config.agent_chat_class(model_override=modelo_ia)
+            # Shared agent instance — model is chosen per call
+            # (None: the agent routes it through model_health)
+            modelo_ia = body.model
+            agent = get_agent(config.agent_chat_class)
+            protocolo = negociar_protocolo(request)
             
-            async def stream_chat():
-                """SSE stream for chat response"""
-                reasoning_buffer = ""
-                content_buffer = ""
+            async def stream_chat(sse: SSEEncoder):
+                """SSE stream for chat response (v1 cumulative, v2 deltas)"""
                 marker_sent = False
+                # Only the tail of the buffer can contain a marker that was not there before
+                janela_marker = max(len(config.marker), len("iniciando a geração"))
                 try:
                     async for chunk_data in agent.chat(
                         message=body.content,
                         history=history,
                         context=context,
-                        attachments=body.attachments or []
+                        attachments=attachments,
+                        model=modelo_ia,
+                        usuario_id=current_user.id,
                     ):
                         if chunk_data["type"] == "reasoning":
-                            reasoning_buffer += chunk_data["content"]
-                            yield f"data: {json.dumps({'type': 'reasoning', 'content': reasoning_buffer})}\n\n"
+                            yield sse.delta("reasoning", chunk_data["content"])
                         
-                        elif chunk_data["type"] == "content":
-                            content_buffer += chunk_data["content"]
-                            yield f"data: {json.dumps({'type': 'chunk', 'content': content_buffer})}\n\n"
+                        elif chunk_data["type"] == "context":
+                            # Prompt size report (estimated tokens, trimmed sections)
+                            yield sse.evento(chunk_data)
                         
-                        # Check for generation marker
-                        if not marker_sent and (config.marker in content_buffer or "iniciando a geração" in content_buffer.lower()):
-                            marker_sent = True
-                            yield f"data: {json.dumps({'type': 'action', 'action': 'generate', 'message': f'Pronto para gerar {config.label}...'})}\n\n"
+                        elif chunk_data["type"] == "content":
+                            yield sse.delta("chunk", chunk_data["content"])
+                            
+                            # Check for generation marker
+                            if not marker_sent:
+                                cauda = sse.buffer("chunk")[-(janela_marker + len(chunk_data["content"])):]
+                                if config.marker in cauda or "iniciando a geração" in cauda.lower():
+                                    marker_sent = True
+                                    yield sse.evento({'type': 'action', 'action': 'generate', 'message': f'Pronto para gerar {config.label}...'})
                     
-                    # Stream finished — send done event
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                    # Stream finished — record the turn in the server-side session
+                    if sessao is not None:
+                        try:
+                            await chat_sessions.acrescentar(
+                                sessao,
+                                [("user", body.content), ("assistant", sse.buffer("chunk"))],
+                                attachments=attachments,
+                            )
+                        except Exception as e:
+                            logger.error(f"[{config.tipo.upper()} Chat] Failed to save session {sessao.id[:8]}: {e}")
+                    
+                    # Send done event
+                    yield sse.checkpoint()
+                    yield sse.evento({'type': 'done'})
                 
                 except Exception as e:
                     logger.error(f"[{config.tipo.upper()} Chat] Stream error: {e}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                    yield sse.erro(str(e))
             
+            sse = SSEEncoder(protocolo)
             return StreamingResponse(
-                stream_chat(),
+                cancelar_ao_desconectar(request, admitir_stream(current_user.id, sse, stream_chat(sse)), origem=f"chat.{config.tipo}"),
                 media_type="text/event-stream",
-                headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+                headers={**headers_sse(protocolo), **({"X-Chat-Session-Id": sessao.id} if sessao else {})}
             )
         
         except Exception as e:
@@ -175,11 +315,14 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
     async def gerar_from_chat(
         projeto_id: int,
         body: ChatGenerateInput,
+        request: Request,
         db: AsyncSession = Depends(get_db),
         current_user: User = Depends(auth_get_current_user),
     ):
         """Generate artefact from chat history — SSE stream"""
+        verificar_admissao(current_user)
         logger.info(f"[{config.tipo.upper()} Gen] Projeto {projeto_id}")
+        _sessao, messages, attachments = await carregar_historico(projeto_id, body, current_user)
         
         try:
             # Build context
@@ -187,70 +330,159 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
                 projeto_id=projeto_id,
                 db=db,
                 tipo_artefato=config.tipo,
-                context_deps=config.context_deps
+                context_deps=config.context_deps,
+                usuario_id=current_user.id,
             )
             
-            # Convert history to Message objects
-            messages = [
-                Message(role=msg["role"], content=msg["content"])
-                for msg in body.history
-            ]
-            
             # Add attachments/skills to context
-            if body.attachments:
+            if attachments:
                 textos_anexos = []
-                for att in body.attachments:
+                for att in attachments:
                     if att.get("extracted_text"):
                         textos_anexos.append(f"[{att.get('filename', 'arquivo')}]: {att['extracted_text']}")
                 if textos_anexos:
                     context.dados_coletados['base_conhecimento'] = "\n\n".join(textos_anexos)
+                # Documents persisted in the project knowledge base (referenced by file_id)
+                context.documentos = await carregar_documentos_anexos(projeto_id, attachments, db)
             
-            # Create agent
-            modelo_ia = body.model or settings.OPENROUTER_DEFAULT_MODEL
-            agent = config.agent_chat_class(model_override=modelo_ia)
+            # Shared agent instance — model is chosen per call
+            # (None: the agent routes it through model_health)
+            modelo_ia = body.model
+            agent = get_agent(config.agent_chat_class)
+            protocolo = negociar_protocolo(request)
+            campos_config = campos_do_artefato(config.tipo)
             
-            async def stream_generation():
-                """SSE stream for generation"""
-                reasoning_buffer = ""
-                json_buffer = ""
+            async def stream_generation(sse: SSEEncoder, generation_id: Optional[str] = None):
+                """SSE stream for generation (v1 cumulative, v2 deltas)"""
                 try:
-                    async for chunk_data in agent.gerar(context, messages):
-                        if chunk_data["type"] == "reasoning":
-                            reasoning_buffer += chunk_data["content"]
-                            yield f"data: {json.dumps({'type': 'reasoning', 'content': reasoning_buffer})}\n\n"
-                        
-                        elif chunk_data["type"] == "content":
-                            json_buffer += chunk_data["content"]
-                            yield f"data: {json.dumps({'type': 'chunk', 'content': json_buffer})}\n\n"
-                            await asyncio.sleep(0)
+                    if generation_id:
+                        yield sse.evento({'type': 'generation', 'generation_id': generation_id})
                     
-                    # Try to parse final JSON
-                    try:
-                        # Clean up JSON: remove markdown backticks if present
-                        cleaned = json_buffer.strip()
-                        if cleaned.startswith('```json'):
-                            cleaned = cleaned[7:]
-                        if cleaned.startswith('```'):
-                            cleaned = cleaned[3:]
-                        if cleaned.endswith('```'):
-                            cleaned = cleaned[:-3]
-                        
-                        artefato_data = json.loads(cleaned)
-                        logger.info(f"[{config.tipo.upper()} Gen] JSON generated: {len(artefato_data)} fields")
-                        yield f"data: {json.dumps({'type': 'complete', 'success': True, 'data': artefato_data})}\n\n"
-                    except json.JSONDecodeError as e:
-                        logger.error(f"[{config.tipo.upper()} Gen] JSON parse error: {e}")
-                        logger.error(f"[{config.tipo.upper()} Gen] Raw buffer (first 500 chars): {json_buffer[:500]}")
-                        yield f"data: {json.dumps({'type': 'error', 'error': f'JSON parse error: {str(e)}'})}\n\n"
+                    # Fields are delivered as soon as they close in the token stream
+                    parsers: List[IncrementalJSONParser] = []
+                    
+                    def entregar(campos):
+                        for campo, valor in campos:
+                            if validar_campo(campos_config, campo, valor) is None:
+                                yield sse.evento({'type': 'field_complete', 'field': campo, 'value': valor})
+                    
+                    async def consumir(streams, texto: bool = False):
+                        """One JSON object per stream (run concurrently); raw text only for a single stream."""
+                        novos = [IncrementalJSONParser() for _ in streams]
+                        parsers.extend(novos)
+                        async with aclosing(intercalar_streams(streams)) as chunks:
+                            async for i, chunk_data in chunks:
+                                if chunk_data["type"] == "content":
+                                    if texto:
+                                        yield sse.delta("chunk", chunk_data["content"])
+                                    for frame in entregar(novos[i].alimentar(chunk_data["content"])):
+                                        yield frame
+                                elif chunk_data["type"] == "reasoning" and texto:
+                                    yield sse.delta("reasoning", chunk_data["content"])
+                                await asyncio.sleep(0)
+                        for parser in novos:
+                            for frame in entregar(parser.finalizar()):
+                                yield frame
+                    
+                    def gerados():
+                        """(valid fields, {broken field: reason}) over all calls so far; later calls win."""
+                        dados, erros = {}, {}
+                        for parser in parsers:
+                            erros.update(parser.invalidos)
+                            for campo, valor in parser.campos.items():
+                                erro = validar_campo(campos_config, campo, valor)
+                                if erro:
+                                    erros[campo] = erro
+                                else:
+                                    dados[campo] = valor
+                        return dados, {k: e for k, e in erros.items() if k not in dados}
+                    
+                    preparada = await agent.preparar_geracao(context, messages, model=modelo_ia, usuario_id=current_user.id)
+                    yield sse.evento({'type': 'context', **preparada.montagem.relatorio()})
+                    
+                    secoes = agent.secoes_geracao if settings.GENERATION_SECTIONED_ENABLED else []
+                    if secoes:
+                        # Independent field groups run in parallel on the same prompt;
+                        # cross-referencing fields follow, with the merged draft
+                        logger.info(f"[{config.tipo.upper()} Gen] Sectioned generation: {secoes} + {agent.campos_consistencia}")
+                        yield sse.evento({'type': 'sections', 'sections': secoes, 'consistency': agent.campos_consistencia})
+                        async with aclosing(consumir([
+                            secao_tolerante(agent.stream_geracao(preparada, campos=secao, usuario_id=current_user.id), secao)
+                            for secao in secoes
+                        ])) as frames:
+                            async for frame in frames:
+                                yield frame
+                        if agent.campos_consistencia:
+                            async with aclosing(consumir([agent.stream_geracao(
+                                preparada, campos=agent.campos_consistencia,
+                                rascunho=gerados()[0], usuario_id=current_user.id,
+                            )])) as frames:
+                                async for frame in frames:
+                                    yield frame
+                    else:
+                        async with aclosing(consumir([agent.stream_geracao(preparada, usuario_id=current_user.id)], texto=True)) as frames:
+                            async for frame in frames:
+                                yield frame
+                    yield sse.checkpoint()
+                    
+                    artefato_data, invalidos = gerados()
+                    pendentes = list(invalidos)
+                    if secoes:
+                        # Each call was asked for specific keys
+                        pedidos = [c for secao in secoes for c in secao] + agent.campos_consistencia
+                        pendentes += [c for c in pedidos if c not in artefato_data and c not in invalidos]
+                    elif not all(p.completo for p in parsers):
+                        pendentes += [c for c in campos_faltantes(campos_config, artefato_data) if c not in invalidos]
+                    
+                    # Broken or truncated output: re-request only the affected fields
+                    if pendentes and settings.GENERATION_REPAIR_ENABLED:
+                        logger.warning(f"[{config.tipo.upper()} Gen] Re-requesting fields {pendentes}: {invalidos}")
+                        yield sse.evento({'type': 'repair', 'fields': pendentes})
+                        async with aclosing(consumir([agent.stream_geracao(
+                            preparada, campos=pendentes, rascunho=artefato_data or None, usuario_id=current_user.id,
+                        )])) as frames:
+                            async for frame in frames:
+                                yield frame
+                        artefato_data, invalidos = gerados()
+                        pendentes = [c for c in pendentes if c not in artefato_data]
+                    
+                    if not artefato_data:
+                        logger.error(f"[{config.tipo.upper()} Gen] No valid fields in output: {invalidos}")
+                        logger.error(f"[{config.tipo.upper()} Gen] Raw buffer (first 500 chars): {sse.buffer('chunk')[:500]}")
+                        yield sse.erro('JSON parse error: nenhum campo válido na resposta')
+                        return
+                    
+                    logger.info(f"[{config.tipo.upper()} Gen] JSON generated: {len(artefato_data)} fields")
+                    complete = {'type': 'complete', 'success': True, 'data': artefato_data}
+                    if pendentes:
+                        complete['missing'] = pendentes
+                    yield sse.evento(complete)
                 
                 except Exception as e:
                     logger.error(f"[{config.tipo.upper()} Gen] Error: {e}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                    yield sse.erro(str(e))
+            
+            if protocolo == PROTOCOLO_V2:
+                # v2: the LLM stream runs detached, writing to a server-side buffer.
+                # This response (and any resume) only reads from that buffer; the
+                # buffer cancels the LLM stream if no reader returns within the grace period.
+                generation_id = generation_buffer.criar(usuario_id=current_user.id)
+                sse = SSEEncoder(protocolo)
+                generation_buffer.iniciar(
+                    generation_id,
+                    admitir_stream(current_user.id, sse, stream_generation(sse, generation_id)),
+                )
+                return StreamingResponse(
+                    generation_buffer.ler(generation_id),
+                    media_type="text/event-stream",
+                    headers={**headers_sse(protocolo), "X-Generation-Id": generation_id}
+                )
             
+            sse = SSEEncoder(protocolo)
             return StreamingResponse(
-                stream_generation(),
+                cancelar_ao_desconectar(request, admitir_stream(current_user.id, sse, stream_generation(sse)), origem=f"gerar.{config.tipo}"),
                 media_type="text/event-stream",
-                headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+                headers=headers_sse(protocolo)
             )
         
         except Exception as e:
@@ -258,15 +490,43 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
             raise HTTPException(status_code=400, detail=str(e))
     
     
+    # ========== RESUME GENERATION ==========
+    @router.get("/chat/{projeto_id}/gerar/{generation_id}/stream")
+    async def retomar_geracao(
+        projeto_id: int,
+        generation_id: str,
+        request: Request,
+        current_user: User = Depends(auth_get_current_user),
+    ):
+        """Resume a v2 generation stream after Last-Event-ID — SSE stream"""
+        existe, usuario_id = await generation_buffer.dono(generation_id)
+        if not existe or usuario_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Geração não encontrada ou expirada")
+        
+        try:
+            apos = int(request.headers.get("Last-Event-ID") or 0)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+        
+        logger.info(f"[{config.tipo.upper()} Gen] Retomando {generation_id[:8]} após evento {apos}")
+        return StreamingResponse(
+            generation_buffer.ler(generation_id, apos=apos),
+            media_type="text/event-stream",
+            headers={**headers_sse(PROTOCOLO_V2), "X-Generation-Id": generation_id}
+        )
+    
+    
     # ========== REGENERATE FIELD ==========
     @router.post("/chat/{projeto_id}/regenerar-campo")
     async def regenerar_campo(
         projeto_id: int,
         body: RegenerarCampoInput,
+        request: Request,
         db: AsyncSession = Depends(get_db),
         current_user: User = Depends(auth_get_current_user),
     ):
         """Regenerate a single field — SSE stream"""
+        verificar_admissao(current_user)
         logger.info(f"[{config.tipo.upper()} Regen] Campo '{body.campo}' do projeto {projeto_id}")
         
         try:
@@ -275,20 +535,22 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
                 projeto_id=projeto_id,
                 db=db,
                 tipo_artefato=config.tipo,
-                context_deps=config.context_deps
+                context_deps=config.context_deps,
+                usuario_id=current_user.id,
             )
             
-            # Create agent
-            modelo_ia = body.model or settings.OPENROUTER_DEFAULT_MODEL
-            agent = config.agent_chat_class(model_override=modelo_ia)
+            # Shared agent instance — model is chosen per call
+            # (None: the agent routes it through model_health)
+            modelo_ia = body.model
+            agent = get_agent(config.agent_chat_class)
+            protocolo = negociar_protocolo(request)
             
             # Convert context to dict for regenerar_campo (if needed)
             from dataclasses import asdict
             context_dict = asdict(context)
             
-            async def stream_regen():
-                """SSE stream for field regeneration"""
-                content_buffer = ""
+            async def stream_regen(sse: SSEEncoder):
+                """SSE stream for field regeneration (v1 cumulative, v2 deltas)"""
                 first_chunk_trimmed = False
                 try:
                     async for chunk in agent.regenerar_campo(
@@ -296,26 +558,32 @@ def criar_chat_router(config: ArtefactChatConfig) -> APIRouter:
                         contexto=context_dict,
                         valor_atual=body.valor_atual,
                         instrucoes=body.prompt_adicional,
+                        model=modelo_ia,
+                        usuario_id=current_user.id,
+                        nova_versao=body.nova_versao,
                     ):
-                        content_buffer += chunk
-                        # Trim leading whitespace from the very first non-empty chunk
-                        if not first_chunk_trimmed and content_buffer.strip():
-                            content_buffer = content_buffer.lstrip()
+                        # Trim leading whitespace until the first non-empty chunk
+                        if not first_chunk_trimmed:
+                            chunk = chunk.lstrip()
+                            if not chunk:
+                                continue
                             first_chunk_trimmed = True
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': content_buffer})}\n\n"
+                        yield sse.delta("chunk", chunk)
                         await asyncio.sleep(0)
                     
                     logger.info(f"[{config.tipo.upper()} Regen] Complete para '{body.campo}'")
-                    yield f"data: {json.dumps({'type': 'done', 'campo': body.campo, 'content': content_buffer})}\n\n"
+                    yield sse.checkpoint()
+                    yield sse.evento({'type': 'done', 'campo': body.campo, 'content': sse.buffer("chunk")})
                 
                 except Exception as e:
                     logger.error(f"[{config.tipo.upper()} Regen] Error: {e}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                    yield sse.erro(str(e))
             
+            sse = SSEEncoder(protocolo)
             return StreamingResponse(
-                stream_regen(),
+                cancelar_ao_desconectar(request, admitir_stream(current_user.id, sse, stream_regen(sse)), origem=f"regen.{config.tipo}"),
                 media_type="text/event-stream",
-                headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+                headers=headers_sse(protocolo)
             )
         
         except Exception as e:
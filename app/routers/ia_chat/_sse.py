@@ -0,0 +1,129 @@
+"""
+Sistema LIA - Codificador SSE dos Streams de Chat
+=================================================
+Formata os eventos SSE de chat, geração e regeneração de campo.
+
+Dois protocolos, negociados pelo header X-SSE-Protocol da requisição:
+
+- v1 (padrão, clientes antigos): cada evento 'chunk'/'reasoning' carrega
+  o buffer acumulado em 'content'. Custo quadrático no tamanho da saída.
+- v2: cada evento carrega só o 'delta' novo e um id monotônico (linha
+  'id:' do SSE). A cada CHECKPOINT_INTERVALO eventos de delta é enviado
+  um 'checkpoint' com o tamanho acumulado de cada buffer, para o cliente
+  validar a remontagem. Custo linear: os trechos são guardados em lista
+  e só unidos quando o buffer é lido.
+
+Os tamanhos do checkpoint são em unidades UTF-16, como o .length das
+strings do navegador (emoji e outros caracteres fora do BMP contam 2).
+
+Eventos que não são deltas (action, done, complete, error) têm o mesmo
+payload nos dois protocolos; em v2 também recebem id.
+
+Uso:
+    sse = SSEEncoder(negociar_protocolo(request))
+    yield sse.delta("chunk", texto)
+    yield sse.evento({"type": "done"})
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+
+PROTOCOLO_HEADER = "X-SSE-Protocol"
+PROTOCOLO_V1 = 1
+PROTOCOLO_V2 = 2
+
+# Eventos de delta entre dois checkpoints (protocolo v2)
+CHECKPOINT_INTERVALO = 50
+
+
+def tamanho_utf16(texto: str) -> int:
+    """Tamanho da string em unidades UTF-16 (o String.length do JavaScript)."""
+    return len(texto.encode("utf-16-le")) // 2
+
+
+def negociar_protocolo(request: Request) -> int:
+    """Lê o header X-SSE-Protocol; qualquer valor diferente de '2' cai em v1."""
+    valor = (request.headers.get(PROTOCOLO_HEADER) or "").strip()
+    return PROTOCOLO_V2 if valor == "2" else PROTOCOLO_V1
+
+
+def headers_sse(protocolo: int) -> Dict[str, str]:
+    """Headers da StreamingResponse, ecoando o protocolo escolhido."""
+    return {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        PROTOCOLO_HEADER: str(protocolo),
+    }
+
+
+class SSEEncoder:
+    """Mantém os buffers acumulados e formata os eventos no protocolo negociado."""
+
+    def __init__(self, protocolo: int = PROTOCOLO_V1, event_id: int = 0):
+        self.protocolo = protocolo
+        self.event_id = event_id
+        # Trechos acumulados por tipo; unidos só na leitura (buffer())
+        self._partes: Dict[str, List[str]] = {}
+        self._tamanhos_utf16: Dict[str, int] = {}
+        self._deltas_desde_checkpoint = 0
+
+    @property
+    def v2(self) -> bool:
+        return self.protocolo == PROTOCOLO_V2
+
+    def buffer(self, tipo: str) -> str:
+        """Conteúdo acumulado de um tipo de delta ('chunk', 'reasoning')."""
+        partes = self._partes.get(tipo)
+        if not partes:
+            return ""
+        if len(partes) > 1:
+            partes[:] = ["".join(partes)]
+        return partes[0]
+
+    def _formatar(self, payload: Dict[str, Any]) -> str:
+        dados = json.dumps(payload)
+        if not self.v2:
+            return f"data: {dados}\n\n"
+        self.event_id += 1
+        return f"id: {self.event_id}\ndata: {dados}\n\n"
+
+    def delta(self, tipo: str, texto: str) -> str:
+        """
+        Acumula um trecho e retorna o evento correspondente.
+
+        v1: {'type': tipo, 'content': <acumulado>}
+        v2: {'type': tipo, 'delta': texto}, seguido de checkpoint periódico.
+        """
+        self._partes.setdefault(tipo, []).append(texto)
+        self._tamanhos_utf16[tipo] = self._tamanhos_utf16.get(tipo, 0) + tamanho_utf16(texto)
+
+        if not self.v2:
+            return self._formatar({"type": tipo, "content": self.buffer(tipo)})
+
+        saida = self._formatar({"type": tipo, "delta": texto})
+        self._deltas_desde_checkpoint += 1
+        if self._deltas_desde_checkpoint >= CHECKPOINT_INTERVALO:
+            saida += self.checkpoint()
+        return saida
+
+    def checkpoint(self) -> str:
+        """Evento com o tamanho (UTF-16) de cada buffer (apenas v2; vazio em v1)."""
+        if not self.v2:
+            return ""
+        self._deltas_desde_checkpoint = 0
+        return self._formatar({
+            "type": "checkpoint",
+            "lengths": dict(self._tamanhos_utf16),
+        })
+
+    def evento(self, payload: Dict[str, Any]) -> str:
+        """Evento de controle (action/done/complete/error), igual nos dois protocolos."""
+        return self._formatar(payload)
+
+    def erro(self, mensagem: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        return self.evento({"type": "error", "error": mensagem, **(extra or {})})
@@ -4,10 +4,12 @@ Sistema LIA - Router de Modelos de IA
 Endpoint para gerenciar modelos disponíveis do OpenRouter
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from typing import Dict, Any
 
+from app.auth import current_superuser
 from app.config import settings, AVAILABLE_MODELS, MODEL_TIERS
+from app.services.model_health import model_health
 
 router = APIRouter()
 
@@ -18,12 +20,15 @@ async def list_available_models() -> Dict[str, Any]:
     Lista modelos disponíveis do OpenRouter para seleção pelo usuário.
     
     Returns:
-        Dict contendo lista de modelos e modelo padrão
+        Dict contendo lista de modelos, modelo padrão e se a opção
+        "Automático" (sem modelo, escolhido pela política de roteamento)
+        está disponível
     """
     return {
         "models": AVAILABLE_MODELS,
         "default": settings.OPENROUTER_DEFAULT_MODEL,
-        "tiers": MODEL_TIERS
+        "tiers": MODEL_TIERS,
+        "auto_routing": bool(settings.MODEL_HEALTH_ENABLED and settings.MODEL_ROUTING_POLICY),
     }
 
 
@@ -39,3 +44,16 @@ async def get_current_model() -> Dict[str, str]:
         "id": settings.OPENROUTER_DEFAULT_MODEL,
         "name": "Trinity Mini (Padrão)"
     }
+
+
+@router.get("/api/ia/models/health", dependencies=[Depends(current_superuser)])
+async def get_models_health() -> Dict[str, Any]:
+    """
+    Retorna a saúde medida de cada modelo e a escolha da política de roteamento.
+    Apenas superusuários (expõe o estado interno do roteamento).
+    
+    Returns:
+        Dict com política ativa, modelo escolhido e métricas por modelo
+        (TTFT p50/p90, tokens/s, taxa de erro, custo)
+    """
+    return model_health.resumo()
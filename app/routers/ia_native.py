@@ -25,7 +25,7 @@ Autor: Equipe TRE-GO
 Data: Fevereiro 2026
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -42,6 +42,9 @@ from app.services.agents import (
     DFDAgent, ETPAgent, PGRAgent, TRAgent, EditalAgent,
     RDVEAgent, JVAAgent, TRSAgent, ADEAgent, JPEFAgent, CEAgent
 )
+from app.services.agents.llm_client import get_agent
+from app.services.agents.llm_scheduler import CLASSE_LOTE
+from app.services.stream_cancel import cancelar_ao_desconectar
 from app.services.deep_research import deep_research_service
 from app.schemas.ia_schemas import DeepResearchRequest
 from pydantic import BaseModel
@@ -110,6 +113,7 @@ async def obter_agente(tipo: str) -> JSONResponse:
 async def gerar_artefato_stream(
     tipo: str,
     projeto_id: int,
+    request: Request,
     prompt_adicional: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_get_current_user),
@@ -117,6 +121,8 @@ async def gerar_artefato_stream(
     """
     Direct generation without chat — stream response as SSE.
     
+    The upstream LLM stream is cancelled if the client disconnects.
+    
     For artefacts that don't use conversational flow.
     """
     
@@ -138,14 +144,14 @@ async def gerar_artefato_stream(
         "itens_pac": [],
     }
     
-    # Create agent and generate
+    # Shared agent instance and generate
     AgentClass = AGENT_REGISTRY[tipo]["class"]
-    agent = AgentClass()
+    agent = get_agent(AgentClass)
     
     async def stream_response():
         try:
             json_buffer = ""
-            async for chunk in agent.gerar(contexto, prompt_adicional):
+            async for chunk in agent.gerar(contexto, prompt_adicional, usuario_id=current_user.id):
                 json_buffer += chunk
                 yield f"data: {json.dumps({'content': json_buffer})}\n\n"
             
@@ -160,7 +166,7 @@ async def gerar_artefato_stream(
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
     
     return StreamingResponse(
-        stream_response(),
+        cancelar_ao_desconectar(request, stream_response(), origem=f"ia_native.{tipo}"),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
     )
@@ -200,11 +206,12 @@ async def gerar_artefato_sync(
     
     # Generate
     AgentClass = AGENT_REGISTRY[tipo]["class"]
-    agent = AgentClass()
+    agent = get_agent(AgentClass)
     
     try:
         json_buffer = ""
-        async for chunk in agent.gerar(contexto, prompt_adicional):
+        # No one follows this response as a stream: lowest scheduler priority
+        async for chunk in agent.gerar(contexto, prompt_adicional, classe=CLASSE_LOTE, usuario_id=current_user.id):
             json_buffer += chunk
         
         # Parse result
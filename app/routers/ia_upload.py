@@ -3,28 +3,41 @@ Router para Upload de Arquivos para IA
 ======================================
 Gerencia o upload de arquivos (imagens, PDFs) para uso no contexto da IA.
 
+O corpo multipart é lido em fluxo (upload_storage.receber_upload): o
+limite de tamanho vale durante o recebimento, não depois dele.
+
+Quando o upload informa projeto_id, o texto extraído é gravado na base
+de conhecimento do projeto (já fatiado) e a resposta traz apenas o
+file_id: o chat referencia o documento por ele, sem reenviar o texto.
+
 Autor: Equipe TRE-GO
 Data: Fevereiro 2026
 """
 
-import os
-import shutil
 import uuid
 from typing import List, Optional
 from pathlib import Path
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.database import get_db
+from app.auth import current_active_user, optional_current_active_user
+from app.models.user import User
+from app.models.projeto import Projeto
+from app.models.documento_conhecimento import DocumentoConhecimento
+from app.services.knowledge_base import salvar_documento, listar_documentos, remover_documento
+from app.services.text_extraction import extrair_texto
+from app.services.upload_storage import (
+    UPLOAD_DIR, MARGEM_MULTIPART, UploadInvalido, UploadMuitoGrande, receber_upload, remover_arquivo,
+)
 
 router = APIRouter(prefix="/api/ia-upload", tags=["IA Utils"])
 
-# Configuração de diretório de upload temporário
-UPLOAD_DIR = Path("tmp/uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 class UploadResponse(BaseModel):
     file_id: str
     filename: str
@@ -32,13 +45,65 @@ class UploadResponse(BaseModel):
     size: int
     url: Optional[str] = None
     extracted_text: Optional[str] = None
+    persisted: bool = False  # Gravado na base de conhecimento do projeto
+    chunks: int = 0
+
+
+async def _projeto_do_usuario(projeto_id: int, user: Optional[User], db: AsyncSession) -> Projeto:
+    """Projeto acessível ao usuário (dono ou superusuário)."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Autenticação necessária")
+    result = await db.execute(select(Projeto).where(Projeto.id == projeto_id))
+    projeto = result.scalars().first()
+    if not projeto:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
+    if projeto.usuario_id != user.id and not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Acesso negado a este projeto")
+    return projeto
+
 
 @router.post("/", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(optional_current_active_user),
+):
     """
     Faz upload de um arquivo para uso no contexto da IA.
     Suporta Imagens (PNG, JPG) e PDF.
+
+    Formulário multipart: "file" (obrigatório) e "projeto_id" (opcional).
+
+    Com projeto_id, documentos de texto são persistidos na base de
+    conhecimento do projeto e extracted_text não é devolvido.
     """
+    limite = settings.UPLOAD_MAX_BYTES
+    limite_mb = limite // (1024 * 1024)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limite + MARGEM_MULTIPART:
+        raise HTTPException(status_code=400, detail=f"Arquivo muito grande (max {limite_mb}MB)")
+
+    # Gerar ID único; o arquivo é gravado como {file_id}{extensão} enquanto chega
+    file_id = str(uuid.uuid4())
+    try:
+        recebido = await receber_upload(request, UPLOAD_DIR, file_id, limite)
+    except UploadMuitoGrande:
+        raise HTTPException(status_code=400, detail=f"Arquivo muito grande (max {limite_mb}MB)")
+    except UploadInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    file_path = recebido.caminho
+    safe_filename = file_path.name
+
+    try:
+        projeto_id = recebido.campos.get("projeto_id") or None
+        if projeto_id is not None:
+            if not projeto_id.isdigit():
+                raise HTTPException(status_code=400, detail="projeto_id inválido")
+            projeto_id = int(projeto_id)
+            await _projeto_do_usuario(projeto_id, current_user, db)
+    except HTTPException:
+        remover_arquivo(file_path)
+        raise
     
     # Validar tipo de arquivo
     allowed_types = [
@@ -49,90 +114,91 @@ async def upload_file(file: UploadFile = File(...)):
     ]
     
     # Alguns browsers enviam markdown como text/x-markdown ou vazios, entao validamos extensao tambem
-    filename_lower = file.filename.lower()
+    filename_lower = recebido.filename.lower()
     is_markdown = filename_lower.endswith('.md')
     is_docx = filename_lower.endswith('.docx')
     
-    if file.content_type not in allowed_types and not (is_markdown or is_docx):
+    if recebido.content_type not in allowed_types and not (is_markdown or is_docx):
          # Logar para debug se necessario, mas por hora apenas rejeitar se nao for compativel
          pass
          # raise HTTPException(status_code=400, detail=f"Tipo de arquivo não suportado. Permitidos: {', '.join(allowed_types)}")
     
-    # Validar tamanho (ex: 10MB)
-    MAX_SIZE = 10 * 1024 * 1024
-    
-    # Gerar ID único
-    file_id = str(uuid.uuid4())
-    extension = Path(file.filename).suffix
-    safe_filename = f"{file_id}{extension}"
-    file_path = UPLOAD_DIR / safe_filename
-    
     try:
-        # Salvar arquivo
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        file_size = file_path.stat().st_size
-        if file_size > MAX_SIZE:
-            os.remove(file_path)
-            raise HTTPException(status_code=400, detail="Arquivo muito grande (max 10MB)")
-
-        extracted_text = None
-        content_type = file.content_type
+        file_size, sha256 = recebido.tamanho, recebido.sha256
+        content_type = recebido.content_type
 
         # Normalizar content type baseada na extensao se necessario
         if is_markdown: content_type = "text/markdown"
         if is_docx: content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         
-        # Se for PDF
-        if content_type == "application/pdf":
-            try:
-                import fitz  # pymupdf
-                doc = fitz.open(str(file_path))
-                text = ""
-                for page in doc:
-                    text += page.get_text() + "\n"
-                doc.close()
-                extracted_text = text.strip()
-            except ImportError:
-                import pypdf
-                reader = pypdf.PdfReader(file_path)
-                text = ""
-                for page in reader.pages:
-                    text += (page.extract_text() or "") + "\n"
-                extracted_text = text.strip()
-            except Exception as e:
-                print(f"Erro PDF: {e}")
-        
-        # Se for Texto ou Markdown
-        elif content_type in ["text/plain", "text/markdown"] or is_markdown:
-             with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                 extracted_text = f.read()
-
-        # Se for DOCX
-        elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or is_docx:
-            try:
-                import docx
-                doc = docx.Document(file_path)
-                extracted_text = "\n".join([para.text for para in doc.paragraphs])
-            except Exception as e:
-                 print(f"Erro DOCX: {e}")
-                 extracted_text = f"Erro ao ler DOCX: {str(e)}"
+        # Extração fora do event loop (pool de processos), com cache por SHA-256
+        extracted_text = await extrair_texto(file_path, content_type, sha256)
 
         # URL para servir o arquivo (se necessário, para o frontend mostrar preview)
         # Por enquanto, assumimos que o frontend usa URL.createObjectURL para preview local
         # e o backend usa o caminho físico ou base64 para mandar pra IA.
+
+        if projeto_id is not None and extracted_text:
+            doc = await salvar_documento(
+                db,
+                file_id=file_id,
+                projeto_id=projeto_id,
+                usuario_id=current_user.id,
+                filename=recebido.filename,
+                content_type=content_type,
+                tamanho=file_size,
+                sha256=sha256,
+                texto=extracted_text,
+            )
+            return UploadResponse(
+                file_id=file_id,
+                filename=recebido.filename,
+                content_type=recebido.content_type,
+                size=file_size,
+                url=f"/static/uploads/{safe_filename}",
+                persisted=True,
+                chunks=len(doc.chunks or []),
+            )
         
         return UploadResponse(
             file_id=file_id,
-            filename=file.filename,
-            content_type=file.content_type,
+            filename=recebido.filename,
+            content_type=recebido.content_type,
             size=file_size,
             url=f"/static/uploads/{safe_filename}", # Exemplo hipotético
             extracted_text=extracted_text
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        if file_path.exists():
-            os.remove(file_path)
+        remover_arquivo(file_path)
         raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
+
+
+@router.get("/projeto/{projeto_id}")
+async def listar_documentos_projeto(
+    projeto_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(current_active_user),
+):
+    """Lista os documentos da base de conhecimento do projeto (sem o texto)."""
+    await _projeto_do_usuario(projeto_id, current_user, db)
+    documentos = await listar_documentos(db, projeto_id)
+    return {"documentos": [doc.to_dict() for doc in documentos]}
+
+
+@router.delete("/{file_id}")
+async def remover_documento_projeto(
+    file_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(current_active_user),
+):
+    """Remove um documento da base de conhecimento do projeto."""
+    result = await db.execute(select(DocumentoConhecimento).where(DocumentoConhecimento.file_id == file_id))
+    doc = result.scalars().first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    await _projeto_do_usuario(doc.projeto_id, current_user, db)
+    await remover_documento(db, doc)
+    return {"success": True, "file_id": file_id}
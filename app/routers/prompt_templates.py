@@ -1,6 +1,8 @@
 """
 Router para gerenciamento de templates de prompts
 Permite editar, versionar e ativar/desativar prompts sem deploy de código
+
+Toda escrita invalida o PromptCache dos agentes em todos os workers.
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -10,7 +12,7 @@ from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.models.prompt_template import PromptTemplate
-from app.services.agents.prompt_loader import clear_prompt_cache
+from app.services.agents.prompt_loader import prompt_cache
 from app.auth import current_active_user, User
 
 router = APIRouter(
@@ -130,8 +132,8 @@ async def criar_prompt(
     await session.commit()
     await session.refresh(prompt)
     
-    # Limpar cache
-    clear_prompt_cache()
+    # Invalidar cache (este worker + demais via Redis pub/sub)
+    await prompt_cache.invalidar(prompt.agent_type, prompt.prompt_type)
     
     return prompt
 
@@ -174,8 +176,8 @@ async def atualizar_prompt(
     await session.commit()
     await session.refresh(prompt)
     
-    # Limpar cache
-    clear_prompt_cache()
+    # Invalidar cache (este worker + demais via Redis pub/sub)
+    await prompt_cache.invalidar(prompt.agent_type, prompt.prompt_type)
     
     return prompt
 
@@ -228,8 +230,8 @@ async def criar_versao(
     await session.commit()
     await session.refresh(novo_prompt)
     
-    # Limpar cache
-    clear_prompt_cache()
+    # Invalidar cache (este worker + demais via Redis pub/sub)
+    await prompt_cache.invalidar(novo_prompt.agent_type, novo_prompt.prompt_type)
     
     return novo_prompt
 
@@ -245,19 +247,22 @@ async def deletar_prompt(
     
     CUIDADO: Isso pode quebrar agentes se não houver outro prompt ativo!
     """
-    stmt = delete(PromptTemplate).where(PromptTemplate.id == prompt_id)
+    stmt = select(PromptTemplate).where(PromptTemplate.id == prompt_id)
     result = await session.execute(stmt)
+    prompt = result.scalar_one_or_none()
     
-    if result.rowcount == 0:
+    if not prompt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Prompt template {prompt_id} não encontrado"
         )
     
+    agent_type, prompt_type = prompt.agent_type, prompt.prompt_type
+    await session.execute(delete(PromptTemplate).where(PromptTemplate.id == prompt_id))
     await session.commit()
     
-    # Limpar cache
-    clear_prompt_cache()
+    # Invalidar cache (este worker + demais via Redis pub/sub)
+    await prompt_cache.invalidar(agent_type, prompt_type)
 
 
 # Função auxiliar
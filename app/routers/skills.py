@@ -17,6 +17,8 @@ from app.models.skill import Skill
 from app.models.user import User
 from app.auth import current_active_user as get_current_user
 from app.schemas.skills import SkillCreate, SkillUpdate, SkillResponse
+from app.services.retrieval import fatiar_textos_base, skill_index
+from app.services.skill_resolver import skill_resolver
 
 router = APIRouter()
 
@@ -61,11 +63,13 @@ async def criar_skill(
         instrucoes=skill_data.instrucoes,
         tools=skill_data.tools,
         textos_base=skill_data.textos_base,
+        textos_base_chunks=fatiar_textos_base(skill_data.textos_base),
         escopo="user",
         usuario_id=current_user.id,
     )
     db.add(nova_skill)
     await db.commit()
+    skill_resolver.invalidar(current_user.id)
     await db.refresh(nova_skill)
     return nova_skill
 
@@ -115,7 +119,13 @@ async def atualizar_skill(
     for field, value in update_data.items():
         setattr(skill, field, value)
 
+    # Re-fatiar a base de conhecimento para a busca por trechos
+    if "textos_base" in update_data:
+        skill.textos_base_chunks = fatiar_textos_base(skill.textos_base)
+        skill_index.invalidar(skill.id)
+
     await db.commit()
+    skill_resolver.invalidar(current_user.id)
     await db.refresh(skill)
     return skill
 
@@ -141,3 +151,5 @@ async def excluir_skill(
 
     await db.delete(skill)
     await db.commit()
+    skill_index.invalidar(skill_id)
+    skill_resolver.invalidar(current_user.id)
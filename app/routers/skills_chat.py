@@ -10,13 +10,15 @@ Data: Fevereiro 2026
 import json
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
 
 from app.models.user import User
 from app.auth import current_active_user as get_current_user
 from app.schemas.skills import SkillChatMessage
 from app.services.agents.skill_wizard_agent import SkillWizardAgent
+from app.services.agents.llm_client import get_agent
+from app.services.stream_cancel import cancelar_ao_desconectar
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,7 @@ router = APIRouter()
 @router.post("/skills/chat")
 async def chat_skill_wizard(
     message: SkillChatMessage,
+    request: Request,
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -35,12 +38,12 @@ async def chat_skill_wizard(
     inclui [SKILL_READY] + JSON no texto.
     """
     modelo_ia = message.model
-    agent = SkillWizardAgent(model_override=modelo_ia)
+    agent = get_agent(SkillWizardAgent)
 
     async def stream_chat():
         buffer = ""
         try:
-            async for chunk in agent.chat(message.content, message.history):
+            async for chunk in agent.chat(message.content, message.history, model=modelo_ia):
                 buffer += chunk
                 yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
 
@@ -56,7 +59,7 @@ async def chat_skill_wizard(
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
 
     return StreamingResponse(
-        stream_chat(),
+        cancelar_ao_desconectar(request, stream_chat(), origem="skills_chat"),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
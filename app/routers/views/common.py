@@ -9,7 +9,7 @@ Data: Janeiro 2026
 
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from typing import Optional
@@ -142,6 +142,23 @@ def require_login(usuario: Optional[User]) -> Optional[RedirectResponse]:
     return None
 
 
+# ========== RESPOSTAS CONDICIONAIS (ETAG) ==========
+
+def resposta_condicional(request: Request, conteudo, etag: str) -> Response:
+    """
+    JSON com ETag; 304 sem corpo se o navegador ja tem esta versao.
+
+    Cache-Control no-cache: o navegador guarda a resposta, mas revalida
+    (If-None-Match) a cada uso.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    etags_cliente = {e.strip().removeprefix("W/") for e in if_none_match.split(",") if e.strip()}
+    if etag in etags_cliente or "*" in etags_cliente:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(conteudo, headers=headers)
+
+
 # ========== CONFIGURACAO DE ARTEFATOS ==========
 
 # Usar o mapa centralizado de artefatos (sem DFD para fluxo de workflow)
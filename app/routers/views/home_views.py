@@ -14,8 +14,6 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
-import httpx
-import xml.etree.ElementTree as ET
 
 from app.database import get_db
 from app.models.user import User
@@ -26,10 +24,14 @@ from app.models.artefatos import (
     DFD, ETP, TR, Riscos, Edital, PesquisaPrecos
 )
 from app.auth import optional_current_active_user
+from app.services.http_clients import http_clients
+from app.services.news_feed import news_feed
+from app.services.model_catalog import model_catalog, pingar_modelo, MODELOS_CONFIGURACAO
 
 from .common import (
     templates,
     require_login,
+    resposta_condicional,
     logger
 )
 
@@ -40,188 +42,38 @@ router = APIRouter()
 # ========== DASHBOARD INICIAL ==========
 
 async def fetch_licitacao_news():
-    """Busca notícias sobre Licitações e IA no Google News RSS."""
-    # Busca 2 feeds: licitações e IA
-    feeds = [
-        "https://news.google.com/rss/search?q=licitações+públicas+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419",
-        "https://news.google.com/rss/search?q=inteligência+artificial+IA+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419"
-    ]
-    noticias = []
-    
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            for rss_url in feeds:
-                try:
-                    response = await client.get(rss_url)
-                    if response.status_code == 200:
-                        root = ET.fromstring(response.content)
-                        # Parse todas as notícias recentes (sem limite inicialmente)
-                        for item in root.findall(".//item"):
-                            title = item.find("title").text if item.find("title") is not None else "Sem título"
-                            link = item.find("link").text if item.find("link") is not None else "#"
-                            pub_date = item.find("pubDate").text if item.find("pubDate") is not None else ""
-                            # Formatar data simples
-                            data_fmt = "Recente"
-                            if pub_date:
-                                try:
-                                    dt = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
-                                    # Só mostra notícias dos últimos 7 dias
-                                    dias_atras = (datetime.utcnow() - dt).days
-                                    if dias_atras <= 7:
-                                        data_fmt = dt.strftime("%d %b")
-                                    else:
-                                        continue  # pula notícias muito antigas
-                                except:
-                                    pass
-                            # Evita duplicatas
-                            if not any(n["titulo"].lower() == title.lower() for n in noticias):
-                                noticias.append({
-                                    "titulo": title,
-                                    "link": link,
-                                    "data": data_fmt,
-                                    "descricao": title
-                                })
-                except Exception as e:
-                    logger.warning(f"Erro ao buscar feed {rss_url}: {e}")
-                    continue
-        
-        # Se conseguiu notícias, retorna apenas 2
-        if noticias:
-            return noticias[:2]
-            
-    except Exception as e:
-        logger.error(f"Erro geral ao buscar notícias RSS: {e}")
-    
-    # Fallback: retorna placeholder com instruções
-    return [
-        {
-            "titulo": "Notícias sobre Licitações e IA em tempo real",
-            "link": "https://news.google.com/search?q=licitações+públicas+brasil",
-            "data": "Hoje",
-            "descricao": "Atualizações contínuas sobre licitações públicas e inteligência artificial no Brasil"
-        },
-        {
-            "titulo": "Acompanhe as últimas tendências em contratações públicas",
-            "link": "https://news.google.com/search?q=inteligência+artificial+brasil",
-            "data": "Hoje",
-            "descricao": "Tecnologia e inovação em processos de licitação"
-        }
-    ]
+    """Notícias sobre Licitações e IA (feed atualizado em segundo plano)."""
+    noticias = await news_feed.obter()
+    return noticias[:2]
 
 async def fetch_online_models():
-    """Verifica status dos modelos na API OpenRouter."""
-    online_models = set()
-    try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            headers = {
-                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                "HTTP-Referer": "https://lia.tre-go.jus.br",
-                "X-Title": "LIA TRE-GO"
-            }
-            resp = await client.get("https://openrouter.ai/api/v1/models", headers=headers)
-            if resp.status_code == 200:
-                data = resp.json()
-                for model in data.get("data", []):
-                    online_models.add(model.get("id"))
-    except Exception as e:
-        logger.warning(f"Erro ao verificar status dos modelos: {e}")
-        # Fallback: mantém o default como online se falhar para não quebrar a UI
-        online_models.add("arcee-ai/trinity-mini:free")
-    return online_models
+    """Modelos online no OpenRouter (snapshot atualizado em segundo plano)."""
+    snapshot = await model_catalog.obter()
+    return set(snapshot["online"])
 
 @router.get("/api/verificar-modelos", response_class=JSONResponse)
-async def verificar_modelos_api():
-    """API para verificar status dos modelos em tempo real (AJAX)."""
-    online = await fetch_online_models()
-    return {"online": list(online)}
+async def verificar_modelos_api(request: Request):
+    """API com os modelos online (AJAX); responde 304 se nada mudou."""
+    snapshot = await model_catalog.obter()
+    return resposta_condicional(request, {"online": snapshot["online"]}, snapshot["etags"]["online"])
 
 
 @router.get("/api/ping-modelo/{modelo_nome:path}", response_class=JSONResponse)
-async def ping_modelo_api(modelo_nome: str):
+async def ping_modelo_api(request: Request, modelo_nome: str):
     """
-    Faz um ping REAL no modelo para verificar se está respondendo.
-    Envia uma mensagem mínima e verifica a resposta.
+    Status do modelo, do último ping feito em segundo plano.
+    Modelos fora de MODELOS_CONFIGURACAO são pingados na hora.
     
     Retorna:
     - status: 'online', 'rate_limited', 'offline', 'error'
     - tempo_ms: tempo de resposta em milissegundos
     - mensagem: descrição do status
     """
-    import time
-    
-    start_time = time.time()
-    
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            headers = {
-                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                "HTTP-Referer": "https://lia.ai",
-                "X-Title": "LIA",
-                "Content-Type": "application/json"
-            }
-            
-            # Requisição mínima para testar o modelo
-            payload = {
-                "model": modelo_nome,
-                "messages": [{"role": "user", "content": "ping"}],
-                "max_tokens": 1,
-                "temperature": 0
-            }
-            
-            resp = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            tempo_ms = int((time.time() - start_time) * 1000)
-            
-            if resp.status_code == 200:
-                return {
-                    "status": "online",
-                    "tempo_ms": tempo_ms,
-                    "mensagem": f"Respondeu em {tempo_ms}ms"
-                }
-            elif resp.status_code == 429:
-                return {
-                    "status": "rate_limited",
-                    "tempo_ms": tempo_ms,
-                    "mensagem": "Rate limit atingido"
-                }
-            elif resp.status_code == 503:
-                return {
-                    "status": "offline",
-                    "tempo_ms": tempo_ms,
-                    "mensagem": "Modelo indisponível"
-                }
-            else:
-                error_detail = ""
-                try:
-                    error_data = resp.json()
-                    error_detail = error_data.get("error", {}).get("message", "")
-                except:
-                    pass
-                return {
-                    "status": "error",
-                    "tempo_ms": tempo_ms,
-                    "mensagem": f"Erro {resp.status_code}: {error_detail[:50]}" if error_detail else f"Erro HTTP {resp.status_code}"
-                }
-                
-    except httpx.TimeoutException:
-        tempo_ms = int((time.time() - start_time) * 1000)
-        return {
-            "status": "offline",
-            "tempo_ms": tempo_ms,
-            "mensagem": "Timeout (15s)"
-        }
-    except Exception as e:
-        tempo_ms = int((time.time() - start_time) * 1000)
-        logger.error(f"Erro ao pingar modelo {modelo_nome}: {e}")
-        return {
-            "status": "error",
-            "tempo_ms": tempo_ms,
-            "mensagem": f"Erro: {str(e)[:30]}"
-        }
+    snapshot = await model_catalog.obter()
+    status = snapshot["status"].get(modelo_nome)
+    if status is None:
+        return await pingar_modelo(modelo_nome)
+    return resposta_condicional(request, status, snapshot["etags"]["status"][modelo_nome])
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -468,28 +320,7 @@ async def configuracoes_page(
     if not usuario:
         return RedirectResponse(url="/login", status_code=303)
 
-    modelos_lista = [
-        "allenai/molmo-2-8b:free",
-        "arcee-ai/trinity-large-preview:free",
-        "arcee-ai/trinity-mini:free",
-        "cognitivecomputations/dolphin-mistral-24b-venice-edition:free",
-        "deepseek/deepseek-r1-0528:free",
-        "google/gemma-3-12b-it:free",
-        "google/gemma-3-27b-it:free",
-        "meta-llama/llama-3.3-70b-instruct:free",
-        "mistralai/mistral-small-3.1-24b-instruct:free",
-        "nvidia/nemotron-3-nano-30b-a3b:free",
-        "nousresearch/hermes-3-llama-3.1-405b:free",
-        "openai/gpt-oss-120b:free",
-        "openai/gpt-oss-20b:free",
-        "qwen/qwen3-4b:free",
-        "qwen/qwen3-next-80b-a3b-instruct:free",
-        "tngtech/deepseek-r1t-chimera:free",
-        "tngtech/deepseek-r1t2-chimera:free",
-        "tngtech/tng-r1t-chimera:free",
-        "upstage/solar-pro-3:free",
-        "liquid/lfm-2.5-1.2b-thinking:free"
-    ]
+    modelos_lista = MODELOS_CONFIGURACAO
     
     online_models = await fetch_online_models()
     
@@ -645,28 +476,7 @@ async def listar_todos_artefatos(
     }
 
     # Lista de modelos de IA (alfabética, com status online/offline)
-    modelos_lista = [
-        "allenai/molmo-2-8b:free",
-        "arcee-ai/trinity-large-preview:free",
-        "arcee-ai/trinity-mini:free",
-        "cognitivecomputations/dolphin-mistral-24b-venice-edition:free",
-        "deepseek/deepseek-r1-0528:free",
-        "google/gemma-3-12b-it:free",
-        "google/gemma-3-27b-it:free",
-        "meta-llama/llama-3.3-70b-instruct:free",
-        "mistralai/mistral-small-3.1-24b-instruct:free",
-        "nvidia/nemotron-3-nano-30b-a3b:free",
-        "nousresearch/hermes-3-llama-3.1-405b:free",
-        "openai/gpt-oss-120b:free",
-        "openai/gpt-oss-20b:free",
-        "qwen/qwen3-4b:free",
-        "qwen/qwen3-next-80b-a3b-instruct:free",
-        "tngtech/deepseek-r1t-chimera:free",
-        "tngtech/deepseek-r1t2-chimera:free",
-        "tngtech/tng-r1t-chimera:free",
-        "upstage/solar-pro-3:free",
-        "liquid/lfm-2.5-1.2b-thinking:free"
-    ]
+    modelos_lista = MODELOS_CONFIGURACAO
 
     online_models = await fetch_online_models()
 
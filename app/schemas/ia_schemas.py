@@ -544,8 +544,9 @@ class ChatMessageInput(BaseModel):
     """Generic input for chat message to any artefact"""
     content: str
     history: List[Dict[str, str]] = []  # Previous messages: [{"role": "user"/"assistant", "content": "..."}, ...]
+    session_id: Optional[str] = None  # Server-side session (from chat init); replaces history
     model: Optional[str] = None
-    attachments: Optional[List[Dict[str, Any]]] = []
+    attachments: Optional[List[Dict[str, Any]]] = None  # None: keep the session's attachments
     
     # Artefact-specific optional fields (used by various handlers)
     gestor: Optional[str] = None  # For ETP, TR, Edital
@@ -558,9 +559,10 @@ class ChatMessageInput(BaseModel):
 
 class ChatGenerateInput(BaseModel):
     """Generic input for generation from chat history"""
-    history: List[Dict[str, str]]
+    history: List[Dict[str, str]] = []
+    session_id: Optional[str] = None  # Server-side session (from chat init); replaces history
     model: Optional[str] = None
-    attachments: Optional[List[Dict[str, Any]]] = []
+    attachments: Optional[List[Dict[str, Any]]] = None  # None: keep the session's attachments
     skills: Optional[List[str]] = []  # Active skill IDs
     deep_research_context: Optional[str] = None
     
@@ -580,6 +582,7 @@ class ChatInitResponse(BaseModel):
     welcome_message: str
     initial_fields: List[Dict[str, Any]]  # Fields to show in UI
     skills_ativas: List[Dict[str, Any]] = []
+    session_id: Optional[str] = None  # Send back in chat/gerar instead of the history
 
 
 class RegenerarCampoInput(BaseModel):
@@ -589,6 +592,7 @@ class RegenerarCampoInput(BaseModel):
     prompt_adicional: Optional[str] = None
     model: Optional[str] = None
     categoria_risco: Optional[str] = None  # For PGR
+    nova_versao: bool = False  # Skip the response cache (explicit "regenerate again")
 
 
 class DeepResearchRequest(BaseModel):
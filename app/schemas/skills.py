@@ -14,6 +14,8 @@ class SkillCreate(BaseModel):
     nome: str = Field(..., min_length=3, max_length=200)
     descricao: Optional[str] = Field(None, max_length=1000)
     instrucoes: str = Field(..., min_length=10, max_length=5000)
+    tools: Optional[List[str]] = None
+    textos_base: Optional[List[dict]] = None  # [{"titulo": "...", "conteudo": "..."}]
 
 
 class SkillUpdate(BaseModel):
@@ -22,6 +24,8 @@ class SkillUpdate(BaseModel):
     descricao: Optional[str] = Field(None, max_length=1000)
     instrucoes: Optional[str] = Field(None, min_length=10, max_length=5000)
     ativa: Optional[bool] = None
+    tools: Optional[List[str]] = None
+    textos_base: Optional[List[dict]] = None
 
 
 class SkillResponse(BaseModel):
@@ -33,6 +37,8 @@ class SkillResponse(BaseModel):
     escopo: str
     ativa: bool
     usuario_id: Optional[int]
+    tools: Optional[List[str]] = None
+    textos_base: Optional[List[dict]] = None
     data_criacao: datetime
     data_atualizacao: datetime
 
@@ -10,6 +10,11 @@ Serviços Disponíveis:
 - ArtefatosService: Mapeamento de campos IA para modelos do banco
 - PDFService: Geração de PDFs de artefatos
 - DeepResearchService: [NOT IMPLEMENTED] Pesquisa aprofundada com APIs externas
+- HTTPClientRegistry: Pools HTTP compartilhados por upstream (criados no lifespan)
+- Metrics: Contadores e latências em processo (expostos em /health/metrics)
+- SkillKnowledgeIndex: Busca BM25 nos trechos dos textos_base das skills
+- ContextSnapshotCache: Contexto do chat por projeto, invalidado nos commits
+- SkillResolver: Skills do sistema + do usuário, em cache por usuário
 
 Padrão de Importação:
 Importe os singletons e classes diretamente dos módulos:
@@ -18,6 +23,19 @@ Importe os singletons e classes diretamente dos módulos:
 - from app.services.estatisticas_precos import calcular_estatisticas, detectar_outliers_iqr
 - from app.services.artefatos_service import mapear_campos_artefato
 - from app.services.pdf_service import gerar_pdf_artefato
+- from app.services.http_clients import http_clients
+- from app.services.metrics import metrics
+- from app.services.retrieval import skill_index, fatiar_textos_base
+- from app.services.knowledge_base import salvar_documento, carregar_documentos
+- from app.services.text_extraction import extrair_texto, calcular_sha256
+- from app.services.upload_storage import receber_upload, upload_sweeper
+- from app.services.chat_sessions import chat_sessions
+- from app.services.context_cache import context_cache
+- from app.services.skill_resolver import skill_resolver
+- from app.services.model_health import model_health
+- from app.services.model_catalog import model_catalog
+- from app.services.news_feed import news_feed
+- from app.services.admission import admission, AdmissaoRecusada
 
 Autor: Equipe TRE-GO
 Data: Fevereiro 2026
@@ -0,0 +1,188 @@
+"""
+Sistema LIA - Controle de Admissão dos Streams de LLM
+=====================================================
+Limita quantos streams de chat, geração e regeneração de campo ficam
+abertos ao mesmo tempo neste worker. O limite do slowapi conta
+requisições por minuto, não streams longos em andamento.
+
+- Por usuário: até LLM_MAX_STREAMS_PER_USER streams (ativos ou na fila);
+  além disso a requisição é recusada com 429. Um usuário com dez abas
+  abertas não ocupa as vagas dos demais.
+- Por worker: até LLM_MAX_STREAMS_PER_WORKER streams ativos; os demais
+  esperam numa fila FIFO de até LLM_ADMISSION_QUEUE_SIZE posições,
+  recebendo a posição por SSE ('queue'). Com a fila cheia, 503.
+- Quem espera mais que LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS desiste (erro
+  no stream, com retry_after).
+- Recusas informam Retry-After (LLM_ADMISSION_RETRY_AFTER_SECONDS).
+
+A recusa rápida acontece no endpoint (`verificar`), antes de abrir a
+resposta; a vaga em si é tomada dentro do gerador do stream (`vaga`),
+para ser sempre devolvida quando o stream termina, falha ou é cancelado.
+
+Uso:
+    admission.verificar(usuario_id)           # AdmissaoRecusada (429/503)
+
+    async def stream():
+        async with admission.vaga(usuario_id) as vaga:
+            async for posicao in vaga.aguardar():
+                yield sse.evento({"type": "queue", "position": posicao})
+            ...
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissaoRecusada(Exception):
+    """Stream recusado por limite de concorrência (status HTTP e Retry-After)."""
+
+    def __init__(self, mensagem: str, status_code: int, retry_after: int):
+        super().__init__(mensagem)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Vaga:
+    """Pedido de vaga de um stream; ativo ao sair de `aguardar()`."""
+
+    def __init__(self, controlador: "AdmissionController", usuario_id: Optional[int]):
+        self.controlador = controlador
+        self.usuario_id = usuario_id
+        self.admitida = False
+        self.inicio = time.monotonic()
+
+    async def __aenter__(self) -> "Vaga":
+        self.controlador._entrar(self)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.controlador._sair(self)
+
+    async def aguardar(self) -> AsyncIterator[int]:
+        """Gera a posição na fila (1 = próxima) a cada mudança, até ser admitida."""
+        limite = self.inicio + settings.LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS
+        ultima = None
+        while not self.admitida:
+            posicao = self.controlador.posicao(self)
+            if posicao != ultima:
+                ultima = posicao
+                yield posicao
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                metrics.incr("llm.admissao", resultado="tempo_esgotado")
+                raise AdmissaoRecusada(
+                    "Tempo de espera na fila esgotado; tente novamente em instantes",
+                    503, settings.LLM_ADMISSION_RETRY_AFTER_SECONDS,
+                )
+            mudou = self.controlador._mudou
+            try:
+                await asyncio.wait_for(mudou.wait(), timeout=restante)
+            except asyncio.TimeoutError:
+                pass
+        if ultima is not None:
+            metrics.observe("llm.admissao.espera_ms", (time.monotonic() - self.inicio) * 1000)
+
+
+class AdmissionController:
+    """Vagas de stream por usuário e por worker, com fila de espera limitada."""
+
+    def __init__(self):
+        self._ativos = 0
+        self._por_usuario: Dict[Optional[int], int] = {}  # ativos + na fila
+        self._fila: Deque[Vaga] = deque()
+        self._mudou = asyncio.Event()
+
+    def _sinalizar(self) -> None:
+        """Acorda quem espera na fila (posição mudou ou vaga liberada)."""
+        self._mudou.set()
+        self._mudou = asyncio.Event()
+
+    # ========== RECUSA RÁPIDA ==========
+
+    def verificar(self, usuario_id: Optional[int]) -> None:
+        """Recusa (AdmissaoRecusada) se o usuário ou o worker estão no limite."""
+        if self._por_usuario.get(usuario_id, 0) >= settings.LLM_MAX_STREAMS_PER_USER:
+            metrics.incr("llm.admissao", resultado="recusado_usuario")
+            raise AdmissaoRecusada(
+                f"Limite de {settings.LLM_MAX_STREAMS_PER_USER} respostas simultâneas por usuário atingido",
+                429, settings.LLM_ADMISSION_RETRY_AFTER_SECONDS,
+            )
+        if self._ativos >= settings.LLM_MAX_STREAMS_PER_WORKER and len(self._fila) >= settings.LLM_ADMISSION_QUEUE_SIZE:
+            metrics.incr("llm.admissao", resultado="recusado_capacidade")
+            raise AdmissaoRecusada(
+                "Servidor no limite de respostas simultâneas; tente novamente em instantes",
+                503, settings.LLM_ADMISSION_RETRY_AFTER_SECONDS,
+            )
+
+    # ========== VAGAS ==========
+
+    def vaga(self, usuario_id: Optional[int]) -> Vaga:
+        return Vaga(self, usuario_id)
+
+    def _entrar(self, vaga: Vaga) -> None:
+        # Refaz a verificação: outra requisição pode ter ocupado a vaga
+        # entre o endpoint e o início do stream
+        self.verificar(vaga.usuario_id)
+        self._por_usuario[vaga.usuario_id] = self._por_usuario.get(vaga.usuario_id, 0) + 1
+        if self._ativos < settings.LLM_MAX_STREAMS_PER_WORKER and not self._fila:
+            self._ativos += 1
+            vaga.admitida = True
+            metrics.incr("llm.admissao", resultado="admitido")
+            return
+        self._fila.append(vaga)
+        metrics.incr("llm.admissao", resultado="fila")
+        logger.info(f"[Admissão] Usuário {vaga.usuario_id} na fila (posição {len(self._fila)})")
+
+    def _sair(self, vaga: Vaga) -> None:
+        restante = self._por_usuario.get(vaga.usuario_id, 1) - 1
+        if restante > 0:
+            self._por_usuario[vaga.usuario_id] = restante
+        else:
+            self._por_usuario.pop(vaga.usuario_id, None)
+
+        if vaga.admitida:
+            self._ativos -= 1
+            self._admitir_proximos()
+        else:
+            try:
+                self._fila.remove(vaga)
+            except ValueError:
+                pass
+        self._sinalizar()
+
+    def _admitir_proximos(self) -> None:
+        while self._fila and self._ativos < settings.LLM_MAX_STREAMS_PER_WORKER:
+            proxima = self._fila.popleft()
+            proxima.admitida = True
+            self._ativos += 1
+
+    def posicao(self, vaga: Vaga) -> int:
+        try:
+            return self._fila.index(vaga) + 1
+        except ValueError:
+            return 0
+
+    def estado(self) -> Dict[str, Any]:
+        """Ocupação atual do worker (para /health/metrics)."""
+        return {
+            "ativos": self._ativos,
+            "fila": len(self._fila),
+            "usuarios": len(self._por_usuario),
+            "max_por_worker": settings.LLM_MAX_STREAMS_PER_WORKER,
+            "max_por_usuario": settings.LLM_MAX_STREAMS_PER_USER,
+        }
+
+
+# Instância global
+admission = AdmissionController()
@@ -18,16 +18,33 @@ Agentes Conversacionais:
 
 Infraestrutura:
 - PromptLoader: Carrega prompts do banco de dados
+- PromptCache: Cache de prompts por worker, invalidado via Redis pub/sub
 - ContextBuilder: Constrói blocos de contexto compartilhados
+- LLMClientManager / get_agent: Cliente OpenRouter e instâncias de agentes compartilhados
+- ContextAssembler: Ajusta o contexto dos prompts a um orçamento de tokens
+- ConversationSummarizer: Resumo rolante (cacheado) das mensagens antigas do chat
+- prompt_caching: Prefixo estático cacheável no provedor e taxa de acerto do cache
+- LLMResponseCache: Respostas de chamadas idênticas (regeneração, gerar_json) no Redis
+- LLMHedger: Hedge entre modelos (primeiro token vence), com atraso adaptado ao TTFT
+- LLMScheduler: Prioridade (chat > regeneração > geração > lote) e fila justa por usuário nas chamadas ao LLM
+- IncrementalJSONParser: Campos do JSON de geração entregues à medida que fecham no stream
 
 Autor: Equipe TRE-GO
 Data: Janeiro 2026
 """
 
 from .base_agent import BaseAgent
-from .conversational_agent import ConversationalAgent, ChatContext, Message, ChatState
-from .prompt_loader import PromptLoader, load_prompt_cached, clear_prompt_cache
+from .conversational_agent import ConversationalAgent, ChatContext, Message, ChatState, GeracaoPreparada
+from .prompt_loader import PromptLoader, PromptCache, prompt_cache, load_prompt_cached, clear_prompt_cache
 from .context_builder import ContextBuilder
+from .llm_client import LLMClientManager, llm_clients, get_agent
+from .context_budget import ContextAssembler, SecaoContexto, estimar_tokens
+from .conversation_summary import ConversationSummarizer, conversation_summarizer
+from .prompt_caching import mensagem_sistema, registrar_uso
+from .response_cache import LLMResponseCache, response_cache
+from .hedging import LLMHedger, llm_hedger
+from .llm_scheduler import LLMScheduler, llm_scheduler
+from .json_stream import IncrementalJSONParser
 from .dfd_agent import DFDAgent
 from .dfd_chat_agent import DFDChatAgent
 from .etp_agent import ETPAgent
@@ -63,10 +80,30 @@ __all__ = [
     "ChatContext",
     "Message",
     "ChatState",
+    "GeracaoPreparada",
     "PromptLoader",
+    "PromptCache",
+    "prompt_cache",
     "load_prompt_cached",
     "clear_prompt_cache",
     "ContextBuilder",
+    "LLMClientManager",
+    "llm_clients",
+    "get_agent",
+    "ContextAssembler",
+    "SecaoContexto",
+    "estimar_tokens",
+    "ConversationSummarizer",
+    "conversation_summarizer",
+    "mensagem_sistema",
+    "registrar_uso",
+    "LLMResponseCache",
+    "response_cache",
+    "LLMHedger",
+    "llm_hedger",
+    "LLMScheduler",
+    "llm_scheduler",
+    "IncrementalJSONParser",
     "DFDAgent",
     "DFDChatAgent",
     "ETPAgent",
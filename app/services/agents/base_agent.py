@@ -10,13 +10,18 @@ Data: Janeiro 2026
 
 import json
 import logging
+from contextlib import aclosing
 from abc import ABC, abstractmethod
 from typing import AsyncGenerator, Dict, Any, Optional, List
 from openai import AsyncOpenAI
 
 from app.config import settings
-from app.database import AsyncSessionLocal
-from .prompt_loader import PromptLoader
+from app.services.model_health import model_health
+from .prompt_loader import prompt_cache
+from .llm_client import llm_clients
+from .response_cache import response_cache
+from .hedging import llm_hedger
+from .llm_scheduler import CLASSE_GERACAO, CLASSE_LOTE, CLASSE_REGENERACAO
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +35,12 @@ class BaseAgent(ABC):
     - build_user_prompt(): Construir o prompt do usuário com contexto
     - campos: Lista de campos que o agente gera
     
-    O system_prompt agora é carregado do banco na primeira geração.
+    O system_prompt vem do cache de prompts (aquecido no startup e
+    invalidado quando um template é alterado).
+
+    As instâncias não guardam estado por requisição: o cliente OpenRouter
+    é compartilhado pelo processo e o modelo pode ser sobrescrito por
+    chamada (parâmetro `model`), permitindo reutilizar o mesmo agente.
     """
     
     # Configurações padrão (podem ser sobrescritas por subclasses)
@@ -41,44 +51,48 @@ class BaseAgent(ABC):
     # Tipo do agente para buscar prompt no banco (definido em cada subclasse)
     agent_type: str = ""
     
-    # Prompt do sistema (carregado do banco na primeira geração)
+    # Prompt do sistema (lido do cache de prompts a cada geração)
     system_prompt: str = ""
-    _prompt_loaded: bool = False
     
     # Lista de campos que este agente gera
     campos: List[str] = []
     
     def __init__(self, model_override: Optional[str] = None):
-        """Inicializa o cliente OpenAI apontando para OpenRouter. Permite override do modelo."""
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENROUTER_API_KEY,
-            base_url=settings.OPENROUTER_BASE_URL,
-            timeout=settings.OPENROUTER_TIMEOUT,
-        )
+        """Define o modelo padrão da instância. Permite override do modelo."""
         # Se o usuário selecionou um modelo, usa ele; senão, usa o default
-        self.model = model_override or self.model or settings.OPENROUTER_DEFAULT_MODEL
+        # (sem modelo fixo, cada chamada pode ser roteada por model_health)
+        self._modelo_fixo = model_override or self.model
+        self.model = self._modelo_fixo or settings.OPENROUTER_DEFAULT_MODEL
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Cliente OpenRouter compartilhado pelo processo (pool keep-alive)."""
+        return llm_clients.get()
+    
+    def _resolve_model(self, model: Optional[str] = None) -> str:
+        """
+        Modelo da chamada: override explícito, modelo fixo do agente,
+        modelo escolhido pela política de roteamento ou padrão.
+        """
+        return model or self._modelo_fixo or model_health.escolher() or self.model
     
     async def _load_prompt(self):
-        """Carrega o system_prompt do banco se ainda não foi carregado."""
-        if self._prompt_loaded or not self.agent_type:
+        """Carrega o system_prompt do cache de prompts (banco apenas em cache miss)."""
+        if not self.agent_type:
             return
         
         try:
-            async with AsyncSessionLocal() as session:
-                loader = PromptLoader(session)
-                self.system_prompt = await loader.get_prompt(
-                    agent_type=self.agent_type,
-                    prompt_type="system"
-                )
-                self._prompt_loaded = True
-                logger.debug(f"[{self.__class__.__name__}] Prompt carregado do banco")
+            prompt = await prompt_cache.get(self.agent_type, "system")
+            if prompt is not None:
+                self.system_prompt = prompt
+            else:
+                logger.warning(f"[{self.__class__.__name__}] Prompt 'system' não encontrado. Usando prompt inline se disponível.")
         except Exception as e:
             logger.warning(
                 f"[{self.__class__.__name__}] Erro ao carregar prompt do banco: {e}. "
                 f"Usando prompt inline se disponível."
             )
             # Se falhar, mantém o prompt inline (backwards compatibility durante migração)
-            self._prompt_loaded = True
     
     @abstractmethod
     def build_user_prompt(self, contexto: Dict[str, Any]) -> str:
@@ -93,10 +107,40 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def _stream_texto(
+        self,
+        modelo: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        classe: str = CLASSE_GERACAO,
+        usuario_id: Optional[int] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Stream do conteúdo de uma chamada ao LLM (escalonada; com hedge, se ligado)."""
+        _modelo_usado, stream = await llm_hedger.abrir(modelo, lambda m: self.client.chat.completions.create(
+            model=m,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        ), classe=classe, usuario_id=usuario_id, custo=max_tokens)
+        
+        # Fechar o stream garante que a resposta HTTP ao OpenRouter seja
+        # encerrada se o consumidor for cancelado (ex: cliente desconectou)
+        async with aclosing(stream):
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
     async def gerar(
         self,
         contexto: Dict[str, Any],
         prompt_adicional: Optional[str] = None,
+        model: Optional[str] = None,
+        usar_cache: bool = False,
+        forcar_cache: bool = False,
+        classe: str = CLASSE_GERACAO,
+        usuario_id: Optional[int] = None,
     ) -> AsyncGenerator[str, None]:
         """
         Gera o artefato completo usando streaming.
@@ -104,6 +148,11 @@ class BaseAgent(ABC):
         Args:
             contexto: Dados do projeto e itens PAC
             prompt_adicional: Instruções extras do usuário
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            usar_cache: Reaproveitar a resposta de uma chamada idêntica (response_cache)
+            forcar_cache: Cachear mesmo acima da temperatura limite
+            classe: Classe de prioridade no escalonador (llm_scheduler)
+            usuario_id: Usuário da chamada (fila justa do escalonador)
             
         Yields:
             Chunks de texto conforme são gerados pela IA
@@ -121,21 +170,23 @@ class BaseAgent(ABC):
             {"role": "user", "content": user_prompt},
         ]
         
-        logger.info(f"[{self.__class__.__name__}] Iniciando geração com modelo {self.model}")
+        modelo = self._resolve_model(model)
+        logger.info(f"[{self.__class__.__name__}] Iniciando geração com modelo {modelo}")
         
-        try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                stream=True,
+        def chamar():
+            return self._stream_texto(
+                modelo, messages, self.temperature, self.max_tokens, classe=classe, usuario_id=usuario_id,
             )
-            
-            async for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    yield content
+        
+        try:
+            if usar_cache:
+                stream = response_cache.responder(
+                    modelo, messages, self.temperature, self.max_tokens, chamar, forcar=forcar_cache,
+                )
+            else:
+                stream = chamar()
+            async for content in stream:
+                yield content
                     
         except Exception as e:
             logger.error(f"[{self.__class__.__name__}] Erro na geração: {e}")
@@ -147,15 +198,27 @@ class BaseAgent(ABC):
         contexto: Dict[str, Any],
         valor_atual: Optional[str] = None,
         instrucoes: Optional[str] = None,
+        model: Optional[str] = None,
+        forcar_cache: bool = False,
+        usuario_id: Optional[int] = None,
+        nova_versao: bool = False,
     ) -> AsyncGenerator[str, None]:
         """
         Regenera um campo específico do artefato.
         
+        Chamadas idênticas em sequência (clique duplo, reenvio) são servidas
+        pelo cache de respostas por LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS;
+        nova_versao=True ("regenerar de novo") ignora o cache.
+        
         Args:
             campo: Nome do campo a regenerar
             contexto: Dados do projeto e itens PAC
             valor_atual: Valor atual do campo (para referência)
             instrucoes: Instruções específicas para regeneração
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            forcar_cache: Cachear mesmo acima da temperatura limite
+            usuario_id: Usuário da chamada (fila justa do escalonador)
+            nova_versao: Pedir outra versão (não reaproveitar a resposta em cache)
             
         Yields:
             Chunks de texto conforme são gerados pela IA
@@ -200,19 +263,25 @@ DIRETRIZES:
         
         logger.info(f"[{self.__class__.__name__}] Regenerando campo '{campo}'")
         
-        try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature + 0.1,  # Ligeiramente mais criativo
-                max_tokens=2048,  # Campo único precisa menos tokens
-                stream=True,
+        modelo = self._resolve_model(model)
+        temperatura = self.temperature + 0.1  # Ligeiramente mais criativo
+        max_tokens = 2048  # Campo único precisa menos tokens
+        
+        def chamar():
+            return self._stream_texto(
+                modelo, messages, temperatura, max_tokens, classe=CLASSE_REGENERACAO, usuario_id=usuario_id,
             )
-            
-            async for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    yield content
+        
+        try:
+            if nova_versao:
+                stream = chamar()
+            else:
+                stream = response_cache.responder(
+                    modelo, messages, temperatura, max_tokens, chamar,
+                    forcar=forcar_cache, ttl=settings.LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS,
+                )
+            async for content in stream:
+                yield content
                     
         except Exception as e:
             logger.error(f"[{self.__class__.__name__}] Erro ao regenerar campo: {e}")
@@ -222,21 +291,32 @@ DIRETRIZES:
         self,
         contexto: Dict[str, Any],
         prompt_adicional: Optional[str] = None,
+        model: Optional[str] = None,
+        forcar_cache: bool = False,
+        usuario_id: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Gera o artefato e retorna como dicionário JSON.
-        Útil quando não precisa de streaming.
+        Útil quando não precisa de streaming. Usa o cache de respostas
+        (chamadas idênticas não voltam ao LLM) e a classe "lote" do
+        escalonador (ninguém acompanha o stream).
         
         Args:
             contexto: Dados do projeto e itens PAC
             prompt_adicional: Instruções extras do usuário
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            forcar_cache: Cachear mesmo acima da temperatura limite
+            usuario_id: Usuário da chamada (fila justa do escalonador)
             
         Returns:
             Dicionário com os campos gerados
         """
         full_response = ""
         
-        async for chunk in self.gerar(contexto, prompt_adicional):
+        async for chunk in self.gerar(
+            contexto, prompt_adicional, model=model, usar_cache=True, forcar_cache=forcar_cache,
+            classe=CLASSE_LOTE, usuario_id=usuario_id,
+        ):
             full_response += chunk
         
         # Tentar parsear como JSON
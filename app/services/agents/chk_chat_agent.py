@@ -95,13 +95,29 @@ Vou te ajudar a verificar a conformidade documental do processo licitatório con
 
 Ou se preferir, posso gerar o checklist automaticamente com base nos artefatos já aprovados."""
 
-    def build_chat_system_prompt(self, context: ChatContext) -> str:
-        """Constroi o system prompt para o modo chat."""
+    def build_chat_prompt_estatico(self) -> str:
+        """Prompt do agente, checklist e instrucoes (prefixo estatico do chat)."""
         checklist = "\n".join([f"- {item}" for item in self.dados_necessarios])
 
-        base_prompt = f"""{self.system_prompt_chat}
+        return f"""{self.system_prompt_chat}
 
-CONTEXTO DO PROJETO:
+DADOS IMPORTANTES A COLETAR:
+{checklist}
+
+INSTRUCOES:
+1. Converse naturalmente para entender a situacao documental do processo
+2. Use os artefatos ja aprovados que ja temos no contexto - NAO pergunte sobre eles!
+3. Pergunte apenas sobre documentos que NAO temos no sistema (disponibilidade orcamentaria, parecer juridico, portarias)
+4. ASSIM QUE o usuario responder sobre documentos adicionais ou pedir para gerar, IMEDIATAMENTE:
+   - Faca um resumo breve dos documentos identificados
+   - Adicione [GERAR_CHK] ao final da mensagem
+5. Se o usuario pedir "gerar", "criar", "fazer o checklist", adicione [GERAR_CHK] imediatamente
+6. NUNCA mencione JSON, schemas ou formatos tecnicos
+7. Seja conciso - 1-2 mensagens no maximo antes de mostrar [GERAR_CHK]"""
+
+    def build_chat_contexto_projeto(self, context: ChatContext) -> str:
+        """Contexto do projeto e dos artefatos ja aprovados."""
+        base_prompt = f"""CONTEXTO DO PROJETO:
 - ID: {context.projeto_id}
 - Titulo: {context.projeto_titulo}
 - Setor: {context.setor_usuario}
@@ -136,22 +152,6 @@ CONTEXTO DO PROJETO:
             if valor:
                 base_prompt += f"\n  - Valor Total: R$ {valor:,.2f}"
 
-        base_prompt += f"""
-
-DADOS IMPORTANTES A COLETAR:
-{checklist}
-
-INSTRUCOES:
-1. Converse naturalmente para entender a situacao documental do processo
-2. Use os artefatos ja aprovados que ja temos no contexto - NAO pergunte sobre eles!
-3. Pergunte apenas sobre documentos que NAO temos no sistema (disponibilidade orcamentaria, parecer juridico, portarias)
-4. ASSIM QUE o usuario responder sobre documentos adicionais ou pedir para gerar, IMEDIATAMENTE:
-   - Faca um resumo breve dos documentos identificados
-   - Adicione [GERAR_CHK] ao final da mensagem
-5. Se o usuario pedir "gerar", "criar", "fazer o checklist", adicione [GERAR_CHK] imediatamente
-6. NUNCA mencione JSON, schemas ou formatos tecnicos
-7. Seja conciso - 1-2 mensagens no maximo antes de mostrar [GERAR_CHK]"""
-
         return base_prompt
 
     def build_generate_prompt(self, context: ChatContext, conversa_resumo: str) -> str:
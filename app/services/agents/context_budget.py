@@ -0,0 +1,188 @@
+"""
+Sistema LIA - Orçamento de Tokens do Contexto
+=============================================
+Monta o contexto enviado ao LLM dentro de um orçamento de tokens.
+
+O contexto é dividido em seções com prioridade. Quando a soma estimada
+passa do orçamento, as seções menos relevantes são cortadas primeiro
+(documentos de skills, anexos, mensagens antigas do histórico), e a
+última seção cortada é truncada em vez de removida, se couber em parte.
+Seções obrigatórias (prompt do sistema, mensagem atual) nunca são cortadas.
+
+A contagem de tokens é uma estimativa local (caracteres por token por
+família de modelo), sem chamada de rede nem tokenizer externo.
+
+Uso:
+    assembler = ContextAssembler(modelo, orcamento_tokens=16000)
+    montagem = assembler.montar([
+        SecaoContexto("sistema", system_prompt, PRIORIDADE_OBRIGATORIA),
+        SecaoContexto("anexo:edital.pdf", texto, PRIORIDADE_ANEXO),
+    ])
+    montagem.texto("sistema")      # conteúdo final da seção ("" se cortada)
+    montagem.relatorio()           # tokens estimados, cortes, orçamento
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (maior = menos relevante = cortada antes)
+PRIORIDADE_OBRIGATORIA = 0
+PRIORIDADE_SKILL = 1           # Instruções das skills ativas
+PRIORIDADE_HISTORICO = 2       # Mensagens recentes (as antigas recebem +1 por idade)
+PRIORIDADE_ANEXO = 20          # Textos extraídos de anexos
+PRIORIDADE_SKILL_DOC = 30      # textos_base das skills
+
+# Caracteres por token para texto em português, por família de modelo.
+# Estimativa conservadora (arredonda para mais tokens).
+CHARS_POR_TOKEN = {
+    "openai/": 3.6,
+    "google/": 3.8,
+    "meta-llama/": 3.3,
+    "nousresearch/": 3.3,
+    "mistralai/": 3.1,
+    "cognitivecomputations/": 3.1,
+    "qwen/": 3.2,
+    "deepseek/": 3.3,
+    "tngtech/": 3.3,
+}
+CHARS_POR_TOKEN_PADRAO = 3.0
+
+# Custo fixo por mensagem do chat (role, separadores)
+TOKENS_POR_MENSAGEM = 4
+
+MARCADOR_TRUNCADO = "\n[... conteúdo truncado para caber no contexto ...]"
+
+
+def chars_por_token(modelo: Optional[str]) -> float:
+    """Razão caracteres/token da família do modelo."""
+    for prefixo, razao in CHARS_POR_TOKEN.items():
+        if modelo and modelo.startswith(prefixo):
+            return razao
+    return CHARS_POR_TOKEN_PADRAO
+
+
+def estimar_tokens(texto: str, modelo: Optional[str] = None) -> int:
+    """Estimativa local do número de tokens de um texto para o modelo."""
+    if not texto:
+        return 0
+    return int(len(texto) / chars_por_token(modelo)) + 1
+
+
+@dataclass
+class SecaoContexto:
+    """Bloco do contexto que pode ser mantido, truncado ou removido."""
+    nome: str
+    texto: str
+    prioridade: int = PRIORIDADE_OBRIGATORIA
+    truncavel: bool = True  # False: removida inteira quando cortada
+    tokens: int = 0
+
+
+@dataclass
+class MontagemContexto:
+    """Resultado da montagem: seções mantidas e relatório de cortes."""
+    modelo: str
+    orcamento: int
+    secoes: List[SecaoContexto]
+    removidas: List[str] = field(default_factory=list)
+    truncadas: List[str] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return sum(s.tokens for s in self.secoes)
+
+    def texto(self, nome: str) -> str:
+        for secao in self.secoes:
+            if secao.nome == nome:
+                return secao.texto
+        return ""
+
+    def mantidas(self, prefixo: str) -> List[SecaoContexto]:
+        """Seções mantidas cujo nome começa com o prefixo, na ordem original."""
+        return [s for s in self.secoes if s.nome.startswith(prefixo)]
+
+    def relatorio(self) -> Dict[str, Any]:
+        return {
+            "modelo": self.modelo,
+            "tokens": self.tokens,
+            "orcamento": self.orcamento,
+            "removidas": self.removidas,
+            "truncadas": self.truncadas,
+        }
+
+
+class ContextAssembler:
+    """Ajusta um conjunto de seções a um orçamento de tokens."""
+
+    def __init__(self, modelo: str, orcamento_tokens: int):
+        self.modelo = modelo
+        self.orcamento = orcamento_tokens
+
+    def estimar(self, texto: str) -> int:
+        return estimar_tokens(texto, self.modelo)
+
+    def montar(self, secoes: List[SecaoContexto]) -> MontagemContexto:
+        for secao in secoes:
+            secao.tokens = self.estimar(secao.texto)
+
+        excesso = sum(s.tokens for s in secoes) - self.orcamento
+        removidas, truncadas = [], []
+
+        if excesso > 0:
+            # Menos relevantes primeiro; empate: a que vem depois na lista
+            candidatas = sorted(
+                (i for i, s in enumerate(secoes) if s.prioridade > PRIORIDADE_OBRIGATORIA),
+                key=lambda i: (secoes[i].prioridade, i),
+                reverse=True,
+            )
+            for i in candidatas:
+                if excesso <= 0:
+                    break
+                secao = secoes[i]
+                if secao.tokens <= excesso or not secao.truncavel:
+                    excesso -= secao.tokens
+                    secao.tokens = 0
+                    removidas.append(secao.nome)
+                else:
+                    self._truncar(secao, secao.tokens - excesso)
+                    excesso = 0
+                    truncadas.append(secao.nome)
+
+        montagem = MontagemContexto(
+            modelo=self.modelo,
+            orcamento=self.orcamento,
+            secoes=[s for s in secoes if s.nome not in removidas],
+            removidas=removidas,
+            truncadas=truncadas,
+        )
+        if excesso > 0:
+            logger.warning(
+                f"[Contexto] Seções obrigatórias excedem o orçamento "
+                f"({montagem.tokens} > {self.orcamento} tokens, modelo {self.modelo})"
+            )
+        return montagem
+
+    def _truncar(self, secao: SecaoContexto, tokens_alvo: int) -> None:
+        limite = max(0, int((tokens_alvo - self.estimar(MARCADOR_TRUNCADO)) * chars_por_token(self.modelo)))
+        secao.texto = secao.texto[:limite] + MARCADOR_TRUNCADO
+        secao.tokens = self.estimar(secao.texto)
+
+
+def registrar_montagem(agente: str, modo: str, montagem: MontagemContexto) -> None:
+    """Loga e registra nas métricas o tamanho do payload e os cortes feitos."""
+    metrics.observe("llm.prompt_tokens", montagem.tokens, agente=agente, modo=modo)
+    if montagem.removidas or montagem.truncadas:
+        metrics.incr("llm.contexto_cortado", agente=agente, modo=modo)
+        logger.info(
+            f"[{agente}] Contexto ({modo}) ajustado ao orçamento de {montagem.orcamento} tokens: "
+            f"removidas={montagem.removidas} truncadas={montagem.truncadas}"
+        )
+    logger.info(f"[{agente}] Payload ({modo}): ~{montagem.tokens} tokens estimados ({montagem.modelo})")
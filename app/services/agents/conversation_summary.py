@@ -0,0 +1,282 @@
+"""
+Sistema LIA - Resumo Incremental da Conversa
+============================================
+Condensa as mensagens antigas do chat num resumo feito por um modelo
+barato, para que cada turno envie "resumo + mensagens recentes" em vez
+de um recorte cru do histórico.
+
+Funcionamento:
+- Enquanto o histórico estimado fica abaixo de SUMMARY_TRIGGER_TOKENS,
+  nada é resumido (o histórico segue inteiro).
+- Acima disso, as mensagens antigas são resumidas em blocos de
+  BLOCO_MENSAGENS: o ponto de corte só avança de bloco em bloco, e as
+  últimas SUMMARY_KEEP_RECENT_MESSAGES (ou um pouco mais) seguem cruas.
+- O resumo de cada prefixo é guardado pelo hash desse prefixo
+  (memória do worker + Redis). No turno seguinte o mesmo prefixo
+  reaproveita o resumo; quando o corte avança, o novo resumo é feito a
+  partir do resumo anterior + o bloco novo (resumo rolante), sem
+  reprocessar a conversa inteira.
+
+O resumo passa pelo escalonador na classe de quem o pediu (chat ou
+geração), para não esperar atrás da fila de lote, e a espera pela vaga
+é limitada a SUMMARY_SCHEDULER_WAIT_SECONDS. Cada resumo roda numa
+tarefa própria: o cliente que o disparou pode desconectar sem derrubar
+as outras requisições da mesma conversa que aguardam o resultado.
+
+Se o modelo de resumo falhar (ou a vaga não sair a tempo), o histórico
+é devolvido sem resumo e o chamador segue com o comportamento antigo
+(recorte das últimas mensagens).
+
+Uso:
+    resumo, recentes = await conversation_summarizer.condensar(
+        history, modelo, classe=CLASSE_CHAT, usuario_id=user.id
+    )
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.redis_client import get_redis, marcar_falha
+from .context_budget import estimar_tokens
+from .llm_client import llm_clients
+from .llm_scheduler import llm_scheduler, CLASSE_CHAT
+
+if TYPE_CHECKING:
+    from .conversational_agent import Message
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "lia:resumo"
+
+# O ponto de corte do resumo avança em blocos deste tamanho
+BLOCO_MENSAGENS = 4
+
+# Resumos anteriores procurados ao estender um resumo (em blocos)
+MAX_BLOCOS_RETROCESSO = 8
+
+MAX_RESUMOS_EM_CACHE = 512
+
+PROMPT_RESUMO = """Você resume conversas entre um usuário e a LIA, assistente de elaboração de documentos de contratação pública (Lei 14.133/2021).
+
+Produza um resumo objetivo em português, em tópicos curtos, preservando TODOS os fatos úteis para elaborar o documento: necessidades, quantidades, valores, prazos, locais, justificativas, decisões tomadas, preferências e pendências. Não invente informações e não inclua saudações."""
+
+
+def _hash_prefixos(history: List["Message"], passo: int) -> Dict[int, str]:
+    """Hash encadeado do histórico em cada fronteira de bloco {n: hash(history[:n])}."""
+    h = hashlib.sha256()
+    hashes = {0: h.hexdigest()}
+    for i, msg in enumerate(history, start=1):
+        h.update(f"{msg.role}\x1f{msg.content}\x1e".encode("utf-8"))
+        if i % passo == 0:
+            hashes[i] = h.copy().hexdigest()
+    return hashes
+
+
+def _tokens(msg: "Message", modelo: Optional[str]) -> int:
+    """Tokens da mensagem; usa a contagem guardada na sessão de chat, se houver."""
+    tokens = (getattr(msg, "metadata", None) or {}).get("tokens")
+    return tokens if tokens is not None else estimar_tokens(msg.content, modelo)
+
+
+def _formatar(mensagens: List["Message"]) -> str:
+    linhas = []
+    for msg in mensagens:
+        autor = "Usuário" if msg.role == "user" else "LIA"
+        linhas.append(f"{autor}: {msg.content}")
+    return "\n\n".join(linhas)
+
+
+class ConversationSummarizer:
+    """Resumos rolantes do histórico, em cache por hash do prefixo."""
+
+    def __init__(self):
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._em_andamento: Dict[str, "asyncio.Task[str]"] = {}
+
+    @property
+    def modelo(self) -> str:
+        return settings.SUMMARY_MODEL or settings.OPENROUTER_DEFAULT_MODEL
+
+    # ========== CACHE ==========
+
+    def _guardar_local(self, chave: str, resumo: str) -> None:
+        self._local[chave] = resumo
+        self._local.move_to_end(chave)
+        while len(self._local) > MAX_RESUMOS_EM_CACHE:
+            self._local.popitem(last=False)
+
+    async def _buscar(self, chave: str) -> Optional[str]:
+        resumo = self._local.get(chave)
+        if resumo is not None:
+            self._local.move_to_end(chave)
+            return resumo
+        r = await get_redis()
+        if r is None:
+            return None
+        try:
+            resumo = await r.get(f"{PREFIXO_REDIS}:{chave}")
+        except Exception as e:
+            logger.warning(f"[Resumo] Erro ao ler cache Redis: {e}")
+            marcar_falha()
+            return None
+        if resumo is not None:
+            self._guardar_local(chave, resumo)
+        return resumo
+
+    async def _gravar(self, chave: str, resumo: str) -> None:
+        self._guardar_local(chave, resumo)
+        r = await get_redis()
+        if r is None:
+            return
+        try:
+            await r.set(f"{PREFIXO_REDIS}:{chave}", resumo, ex=settings.SUMMARY_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"[Resumo] Erro ao gravar cache Redis: {e}")
+            marcar_falha()
+
+    # ========== RESUMO ==========
+
+    async def _resumir(
+        self,
+        resumo_anterior: Optional[str],
+        mensagens: List["Message"],
+        classe: str,
+        usuario_id: Optional[int],
+    ) -> str:
+        conteudo = ""
+        if resumo_anterior:
+            conteudo += f"RESUMO ATÉ AQUI:\n{resumo_anterior}\n\n"
+        conteudo += f"NOVAS MENSAGENS:\n{_formatar(mensagens)}\n\n"
+        conteudo += "Escreva o resumo atualizado da conversa inteira."
+
+        # Passa pelo escalonador na classe do chamador; sem vaga a tempo, segue sem resumo
+        vaga = await asyncio.wait_for(
+            llm_scheduler.reservar(classe, usuario_id, custo=settings.SUMMARY_MAX_TOKENS),
+            timeout=settings.SUMMARY_SCHEDULER_WAIT_SECONDS,
+        )
+        try:
+            resposta = await llm_clients.get().chat.completions.create(
+                model=self.modelo,
+                messages=[
+                    {"role": "system", "content": PROMPT_RESUMO},
+                    {"role": "user", "content": conteudo},
+                ],
+                temperature=0.2,
+                max_tokens=settings.SUMMARY_MAX_TOKENS,
+            )
+        finally:
+            vaga.liberar()
+        texto = (resposta.choices[0].message.content or "").strip() if resposta.choices else ""
+        if not texto:
+            raise ValueError("modelo de resumo retornou conteúdo vazio")
+        return texto
+
+    async def _resumo_do_prefixo(
+        self,
+        history: List["Message"],
+        corte: int,
+        hashes: Dict[int, str],
+        classe: str,
+        usuario_id: Optional[int],
+    ) -> str:
+        """Resumo de history[:corte], estendendo o maior prefixo já resumido."""
+        chave = hashes[corte]
+        resumo = await self._buscar(chave)
+        if resumo is not None:
+            metrics.incr("llm.resumo_conversa", resultado="cache")
+            return resumo
+
+        # Mesma conversa sendo resumida por outra requisição: aguarda a mesma tarefa.
+        # A tarefa não pertence a nenhum chamador: o cancelamento de um (cliente
+        # desconectado) não chega a ela nem aos demais que a aguardam
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.create_task(self._gerar(history, corte, hashes, classe, usuario_id))
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda t: self._concluida(chave, t))
+        try:
+            return await asyncio.shield(tarefa)
+        except asyncio.CancelledError:
+            # Só a própria tarefa cancelada (desligamento): vira falha comum, sem resumo
+            if tarefa.cancelled():
+                raise RuntimeError("resumo cancelado") from None
+            raise
+
+    def _concluida(self, chave: str, tarefa: "asyncio.Task[str]") -> None:
+        if self._em_andamento.get(chave) is tarefa:
+            del self._em_andamento[chave]
+        # Evita "Task exception was never retrieved" quando ninguém mais aguardava
+        if not tarefa.cancelled():
+            tarefa.exception()
+
+    async def _gerar(
+        self,
+        history: List["Message"],
+        corte: int,
+        hashes: Dict[int, str],
+        classe: str,
+        usuario_id: Optional[int],
+    ) -> str:
+        base, resumo_base = 0, None
+        limite = max(0, corte - MAX_BLOCOS_RETROCESSO * BLOCO_MENSAGENS)
+        # Inclui o próprio limite (o prefixo vazio, n = 0, nunca tem resumo)
+        for n in range(corte - BLOCO_MENSAGENS, max(limite - 1, 0), -BLOCO_MENSAGENS):
+            resumo_base = await self._buscar(hashes[n])
+            if resumo_base is not None:
+                base = n
+                break
+
+        resumo = await self._resumir(resumo_base, history[base:corte], classe, usuario_id)
+        await self._gravar(hashes[corte], resumo)
+        metrics.incr("llm.resumo_conversa", resultado="gerado")
+        logger.info(
+            f"[Resumo] Mensagens {base}-{corte} condensadas "
+            f"({'incremental' if resumo_base else 'completo'}, modelo {self.modelo})"
+        )
+        return resumo
+
+    async def condensar(
+        self,
+        history: List["Message"],
+        modelo_tokens: Optional[str] = None,
+        classe: str = CLASSE_CHAT,
+        usuario_id: Optional[int] = None,
+    ) -> Tuple[Optional[str], List["Message"]]:
+        """
+        Retorna (resumo das mensagens antigas, mensagens recentes).
+
+        `classe` e `usuario_id` são os do chamador: a chamada de resumo
+        entra no escalonador com a mesma prioridade do turno que a espera.
+
+        Sem resumo (histórico curto ou falha do modelo de resumo), devolve
+        (None, history).
+        """
+        total = sum(_tokens(m, modelo_tokens) for m in history)
+        if total < settings.SUMMARY_TRIGGER_TOKENS:
+            return None, history
+
+        manter = settings.SUMMARY_KEEP_RECENT_MESSAGES
+        corte = max(0, len(history) - manter) // BLOCO_MENSAGENS * BLOCO_MENSAGENS
+        if corte == 0:
+            return None, history
+
+        hashes = _hash_prefixos(history[:corte], BLOCO_MENSAGENS)
+        try:
+            resumo = await self._resumo_do_prefixo(history, corte, hashes, classe, usuario_id)
+        except Exception as e:
+            metrics.incr("llm.resumo_conversa", resultado="erro")
+            logger.warning(f"[Resumo] Falha ao resumir conversa, seguindo sem resumo: {e!r}")
+            return None, history
+        return resumo, history[corte:]
+
+
+# Instância global
+conversation_summarizer = ConversationSummarizer()
@@ -13,15 +13,29 @@ Data: Fevereiro 2026
 
 import json
 import logging
-from typing import AsyncGenerator, Dict, Any, List, Optional
-from dataclasses import dataclass, field
+from contextlib import aclosing
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from openai import AsyncOpenAI
 import asyncio
 
 from app.config import settings
-from app.database import AsyncSessionLocal
-from .prompt_loader import PromptLoader
+from app.services.retrieval import skill_index
+from app.services.knowledge_base import documento_index
+from app.services.model_health import model_health
+from .prompt_loader import prompt_cache
+from .llm_client import llm_clients
+from .conversation_summary import conversation_summarizer
+from .prompt_caching import mensagem_sistema, opcoes_stream, registrar_uso
+from .response_cache import response_cache
+from .hedging import llm_hedger
+from .llm_scheduler import CLASSE_CHAT, CLASSE_GERACAO, CLASSE_REGENERACAO
+from .context_budget import (
+    ContextAssembler, MontagemContexto, SecaoContexto, registrar_montagem,
+    PRIORIDADE_OBRIGATORIA, PRIORIDADE_SKILL, PRIORIDADE_HISTORICO,
+    PRIORIDADE_ANEXO, PRIORIDADE_SKILL_DOC,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -58,10 +72,20 @@ class ChatContext:
     # Dados coletados na conversa
     dados_coletados: Dict[str, Any] = field(default_factory=dict)
     attachments: List[Dict[str, Any]] = field(default_factory=list)
+    # Documentos da base de conhecimento do projeto: [{file_id, filename, chunks}]
+    documentos: List[Dict[str, Any]] = field(default_factory=list)
     # Skills (habilidades) ativas para este projeto
     skills: List[Dict[str, Any]] = field(default_factory=list)
 
 
+@dataclass
+class GeracaoPreparada:
+    """Prompt de geração montado uma vez e compartilhado pelas chamadas da geração."""
+    modelo: str
+    messages: List[Dict[str, str]]
+    montagem: MontagemContexto
+
+
 class ConversationalAgent:
     """
     Agente base para interação conversacional.
@@ -69,6 +93,10 @@ class ConversationalAgent:
     O agente conversa com o usuário para coletar informações,
     e quando detecta que tem dados suficientes, sinaliza que
     está pronto para gerar o artefato.
+    
+    A instância é reutilizável entre requisições: o histórico e o
+    contexto chegam por chamada, o cliente OpenRouter é compartilhado
+    e o modelo pode ser sobrescrito com o parâmetro `model`.
     """
     
     # Configurações (sobrescrever em subclasses)
@@ -78,13 +106,16 @@ class ConversationalAgent:
     max_tokens_generate: int = 8192
     model: str = None
     
+    # Orçamento de tokens do prompt (None = settings.LLM_CONTEXT_BUDGET_*)
+    orcamento_tokens_chat: Optional[int] = None
+    orcamento_tokens_generate: Optional[int] = None
+    
     # Tipo do agente para buscar prompts no banco (definido em cada subclasse)
     agent_type: str = ""
     
-    # Prompts (carregados do banco na primeira geração)
+    # Prompts (lidos do cache de prompts a cada chamada)
     system_prompt_chat: str = ""
     system_prompt_generate: str = ""
-    _prompts_loaded: bool = False
     
     # Checklist de dados necessários (sobrescrever em subclasses)
     dados_necessarios: List[str] = []
@@ -92,53 +123,87 @@ class ConversationalAgent:
     # Nome do artefato para mensagens
     nome_artefato: str = "artefato"
     
+    # Geração em seções paralelas (artefatos grandes): grupos independentes
+    # de campos do schema, gerados em chamadas concorrentes sobre o mesmo
+    # prompt e mesclados num só JSON. Vazio = uma única chamada.
+    secoes_geracao: List[List[str]] = []
+    # Campos que citam os das seções: gerados depois delas, com o rascunho
+    campos_consistencia: List[str] = []
+    
     def __init__(self, model_override: Optional[str] = None):
-        """Inicializa o cliente OpenAI apontando para OpenRouter. Permite override do modelo."""
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENROUTER_API_KEY,
-            base_url=settings.OPENROUTER_BASE_URL,
-            timeout=settings.OPENROUTER_TIMEOUT,
-        )
-        self.model = model_override or self.model or settings.OPENROUTER_DEFAULT_MODEL
+        """Define o modelo padrão da instância. Permite override do modelo."""
+        # Sem modelo fixo, cada chamada pode ser roteada por model_health
+        self._modelo_fixo = model_override or self.model
+        self.model = self._modelo_fixo or settings.OPENROUTER_DEFAULT_MODEL
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Cliente OpenRouter compartilhado pelo processo (pool keep-alive)."""
+        return llm_clients.get()
+    
+    def _resolve_model(self, model: Optional[str] = None) -> str:
+        """
+        Modelo da chamada: override explícito, modelo fixo do agente,
+        modelo escolhido pela política de roteamento ou padrão.
+        """
+        return model or self._modelo_fixo or model_health.escolher() or self.model
     
     async def _load_prompts(self):
-        """Carrega os prompts do banco se ainda não foram carregados."""
-        if self._prompts_loaded or not self.agent_type:
+        """Carrega os prompts do cache de prompts (banco apenas em cache miss)."""
+        if not self.agent_type:
             return
         
         try:
-            async with AsyncSessionLocal() as session:
-                loader = PromptLoader(session)
-                prompts = await loader.get_prompts_multiple(
-                    agent_type=self.agent_type,
-                    prompt_types=["system_chat", "system_generate"]
-                )
-                
-                if "system_chat" in prompts:
-                    self.system_prompt_chat = prompts["system_chat"]
-                if "system_generate" in prompts:
-                    self.system_prompt_generate = prompts["system_generate"]
-                
-                self._prompts_loaded = True
-                logger.debug(f"[{self.__class__.__name__}] Prompts carregados do banco")
+            prompts = await prompt_cache.get_multiple(
+                agent_type=self.agent_type,
+                prompt_types=["system_chat", "system_generate"]
+            )
+            
+            if "system_chat" in prompts:
+                self.system_prompt_chat = prompts["system_chat"]
+            if "system_generate" in prompts:
+                self.system_prompt_generate = prompts["system_generate"]
+            
+            logger.debug(f"[{self.__class__.__name__}] Prompts carregados do cache")
         except Exception as e:
             logger.warning(
                 f"[{self.__class__.__name__}] Erro ao carregar prompts do banco: {e}. "
                 f"Usando prompts inline se disponíveis."
             )
             # Se falhar, mantém os prompts inline (backwards compatibility durante migração)
-            self._prompts_loaded = True
     
-    def build_chat_system_prompt(self, context: ChatContext) -> str:
+    def build_chat_prompt_estatico(self) -> str:
         """
-        Constrói o system prompt para o modo chat.
-        Inclui contexto do projeto e checklist.
+        Parte estática do system prompt do chat: prompt do agente,
+        checklist e instruções.
+        
+        Não depende do projeto nem do turno, para formar o prefixo
+        cacheável pelo provedor (ver prompt_caching). Dados do projeto vão
+        em build_chat_contexto_projeto().
         """
         checklist = "\n".join([f"- {item}" for item in self.dados_necessarios])
         
-        base_prompt = f"""{self.system_prompt_chat}
+        return f"""{self.system_prompt_chat}
+
+DADOS IMPORTANTES A COLETAR:
+{checklist}
 
-CONTEXTO DO PROJETO:
+INSTRUÇÕES:
+1. Converse naturalmente para coletar as informações
+2. Use os dados do projeto que já temos (PAC, etc.)
+3. NÃO pergunte sobre item do PAC - já está vinculado automaticamente
+4. Quando tiver informações suficientes, faça um resumo e pergunte: "Posso gerar o {self.nome_artefato} agora?"
+5. OBRIGATÓRIO: Se o usuário confirmar, você DEVE PRIMEIRO responder com uma frase natural confirmando a ação (ex: "Entendido, vou gerar agora o documento.") e SÓ DEPOIS adicionar a tag [GERAR_{self.nome_artefato.upper()}] ao final da mensagem.
+6. NUNCA envie a tag [GERAR_{self.nome_artefato.upper()}] sozinha ou no início da mensagem.
+7. NUNCA mencione JSON, schemas ou formatos técnicos para o usuário
+8. Seja conciso e objetivo nas perguntas"""
+    
+    def build_chat_contexto_projeto(self, context: ChatContext) -> str:
+        """
+        Parte dinâmica do system prompt do chat: dados do projeto,
+        artefatos aprovados e dados já informados pelo usuário.
+        """
+        base_prompt = f"""CONTEXTO DO PROJETO:
 - ID: {context.projeto_id}
 - Título: {context.projeto_titulo}
 - Setor: {context.setor_usuario}
@@ -165,55 +230,118 @@ CONTEXTO DO PROJETO:
             logger.info(f"[Agent] Dados coletados incluídos no prompt: {list(context.dados_coletados.keys())}")
         else:
             logger.info("[Agent] Nenhum dado coletado no contexto")
-
+        
+        return base_prompt
+    
+    def build_chat_system_prompt(self, context: ChatContext) -> str:
+        """
+        System prompt completo do modo chat (parte estática + projeto).
+        
+        chat() usa as duas partes separadamente; anexos e skills não
+        entram aqui: são seções de secoes_conhecimento(), ajustadas ao
+        orçamento de tokens.
+        """
+        return f"{self.build_chat_prompt_estatico()}\n\n{self.build_chat_contexto_projeto(context)}"
+    
+    # ========== CONTEXTO COM ORÇAMENTO DE TOKENS ==========
+    
+    def secoes_conhecimento(self, context: ChatContext, consulta: str = "") -> List[SecaoContexto]:
+        """
+        Anexos e skills ativas como seções cortáveis do contexto de chat.
+        
+        Dos textos_base de cada skill e dos documentos do projeto entram
+        apenas os trechos mais relevantes para `consulta` (BM25,
+        SKILL_RETRIEVAL_TOP_K por skill, KB_RETRIEVAL_TOP_K por documento).
+        Ordem de corte (menos relevante primeiro): trechos das skills,
+        anexos e, por último, as instruções das skills.
+        """
+        secoes = []
+        
         # Anexos/base de conhecimento
-        if context.attachments:
-            base_prompt += "\n\nBASE DE CONHECIMENTO (arquivos anexados pelo usuário):"
-            base_prompt += "\nIMPORTANTE: Analise CRITICAMENTE se cada documento é relevante para o artefato sendo elaborado."
-            base_prompt += "\nSe um documento NÃO tem relação com o artefato, informe honestamente ao usuário que o documento não é relevante para este contexto."
-            base_prompt += "\nNUNCA invente conexões forçadas entre documentos e o artefato."
-            for att in context.attachments:
-                if att.get("extracted_text"):
-                    base_prompt += f"\n\n--- {att.get('filename', 'arquivo')} ---\n{att['extracted_text'][:2000]}"
-            logger.info(f"[Agent] {len(context.attachments)} anexo(s) incluído(s) no prompt")
-
+        for i, att in enumerate(context.attachments):
+            if att.get("extracted_text"):
+                secoes.append(SecaoContexto(
+                    f"anexo:{i}",
+                    f"\n\n--- {att.get('filename', 'arquivo')} ---\n{att['extracted_text'][:2000]}",
+                    PRIORIDADE_ANEXO,
+                ))
+        secoes += self.secoes_documentos(context, consulta, settings.KB_RETRIEVAL_TOP_K, prefixo="anexo:doc")
+        
         # Skills (habilidades) ativas
-        if context.skills:
-            base_prompt += "\n\n========== HABILIDADES ATIVAS =========="
-            base_prompt += "\nVoce DEVE aplicar estas instrucoes durante toda a interacao:\n"
-            for skill in context.skills:
-                base_prompt += f"\n--- {skill.get('nome', 'Skill')} ({skill.get('icone', '⚡')}) ---\n"
-                if skill.get('descricao'):
-                    base_prompt += f"Descricao: {skill['descricao']}\n"
-                
-                # Injetar textos base da skill (RAG via contexto)
-                if skill.get('textos_base'):
-                    base_prompt += "\n  [DOCUMENTOS DE REFERENCIA DA SKILL]:"
-                    for doc in skill['textos_base']:
-                        titulo = doc.get('titulo', 'Documento')
-                        conteudo = doc.get('conteudo', '')[:5000] # Limite de seguranca por doc
-                        base_prompt += f"\n  - {titulo}:\n'''{conteudo}'''\n"
-
-                base_prompt += f"{skill.get('instrucoes', '')}\n"
-            base_prompt += "\n========== FIM DAS HABILIDADES ==========\n"
-            logger.info(f"[Agent] {len(context.skills)} skill(s) injetada(s) no prompt")
-
-        base_prompt += f"""
-
-DADOS IMPORTANTES A COLETAR:
-{checklist}
-
-INSTRUÇÕES:
-1. Converse naturalmente para coletar as informações
-2. Use os dados do projeto que já temos (PAC, etc.)
-3. NÃO pergunte sobre item do PAC - já está vinculado automaticamente
-4. Quando tiver informações suficientes, faça um resumo e pergunte: "Posso gerar o {self.nome_artefato} agora?"
-5. OBRIGATÓRIO: Se o usuário confirmar, você DEVE PRIMEIRO responder com uma frase natural confirmando a ação (ex: "Entendido, vou gerar agora o documento.") e SÓ DEPOIS adicionar a tag [GERAR_{self.nome_artefato.upper()}] ao final da mensagem.
-6. NUNCA envie a tag [GERAR_{self.nome_artefato.upper()}] sozinha ou no início da mensagem.
-7. NUNCA mencione JSON, schemas ou formatos técnicos para o usuário
-8. Seja conciso e objetivo nas perguntas"""
+        for i, skill in enumerate(context.skills):
+            cabecalho = f"\n--- {skill.get('nome', 'Skill')} ({skill.get('icone', '⚡')}) ---\n"
+            if skill.get('descricao'):
+                cabecalho += f"Descricao: {skill['descricao']}\n"
+            secoes.append(SecaoContexto(
+                f"skill:{i}",
+                cabecalho + f"{skill.get('instrucoes', '')}\n",
+                PRIORIDADE_SKILL,
+                truncavel=False,
+            ))
+            
+            # Trechos dos textos base relevantes para a mensagem (RAG local)
+            trechos = skill_index.buscar(skill, consulta, k=settings.SKILL_RETRIEVAL_TOP_K)
+            for rank, (_score, chunk) in enumerate(trechos):
+                secoes.append(SecaoContexto(
+                    f"trecho_skill:{i}:{rank}",
+                    f"  [REFERENCIA DA SKILL] {chunk.get('titulo', 'Documento')} (trecho {chunk.get('ordem', 0) + 1}):\n'''{chunk.get('texto', '')}'''\n",
+                    PRIORIDADE_SKILL_DOC + rank,
+                ))
         
-        return base_prompt
+        return secoes
+    
+    def secoes_documentos(
+        self,
+        context: ChatContext,
+        consulta: str,
+        k: int,
+        prefixo: str = "documento",
+    ) -> List[SecaoContexto]:
+        """Trechos mais relevantes de cada documento da base do projeto."""
+        secoes = []
+        for i, documento in enumerate(context.documentos):
+            for rank, (_score, chunk) in enumerate(documento_index.buscar(documento, consulta, k=k)):
+                secoes.append(SecaoContexto(
+                    f"{prefixo}:{i}:{rank}",
+                    f"\n\n--- {documento.get('filename', 'arquivo')} (trecho {chunk.get('ordem', 0) + 1}) ---\n{chunk.get('texto', '')}",
+                    PRIORIDADE_ANEXO + rank,
+                ))
+        return secoes
+    
+    def renderizar_skills(self, montagem: MontagemContexto) -> str:
+        """Instruções das skills que couberam no orçamento (parte do prefixo estático)."""
+        skills = montagem.mantidas("skill:")
+        if not skills:
+            return ""
+        texto = "\n\n========== HABILIDADES ATIVAS =========="
+        texto += "\nVoce DEVE aplicar estas instrucoes durante toda a interacao:\n"
+        texto += "".join(s.texto for s in skills)
+        texto += "\n========== FIM DAS HABILIDADES ==========\n"
+        return texto
+    
+    def renderizar_conhecimento(self, montagem: MontagemContexto) -> str:
+        """Anexos e trechos das skills que couberam no orçamento (mudam a cada turno)."""
+        texto = ""
+        
+        anexos = montagem.mantidas("anexo:")
+        if anexos:
+            texto += "\n\nBASE DE CONHECIMENTO (arquivos anexados pelo usuário):"
+            texto += "\nIMPORTANTE: Analise CRITICAMENTE se cada documento é relevante para o artefato sendo elaborado."
+            texto += "\nSe um documento NÃO tem relação com o artefato, informe honestamente ao usuário que o documento não é relevante para este contexto."
+            texto += "\nNUNCA invente conexões forçadas entre documentos e o artefato."
+            texto += "".join(s.texto for s in anexos)
+        
+        trechos = montagem.mantidas("trecho_skill:")
+        if trechos:
+            texto += "\n\nREFERENCIAS DAS HABILIDADES (trechos relevantes para esta mensagem):\n"
+            texto += "".join(s.texto for s in trechos)
+        
+        return texto
+    
+    def _orcamento(self, modo: str) -> int:
+        if modo == "chat":
+            return self.orcamento_tokens_chat or settings.LLM_CONTEXT_BUDGET_CHAT
+        return self.orcamento_tokens_generate or settings.LLM_CONTEXT_BUDGET_GENERATE
     
     async def chat(
         self,
@@ -221,6 +349,8 @@ INSTRUÇÕES:
         history: List[Message],
         context: ChatContext,
         attachments: Optional[List[Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        usuario_id: Optional[int] = None,
     ) -> AsyncGenerator[Dict[str, str], None]:
         """
         Processa uma mensagem do usuário e retorna resposta em streaming.
@@ -230,27 +360,67 @@ INSTRUÇÕES:
             history: Histórico de mensagens anteriores
             context: Contexto do projeto
             attachments: Lista de anexos {type, url, content, ...}
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            usuario_id: Usuário da chamada (fila justa do escalonador)
             
         Yields:
             Chunks de texto da resposta
         """
         # Carregar prompts do banco se necessário
         await self._load_prompts()
+        modelo = self._resolve_model(model)
         
-        # Montar mensagens para a API
-        messages = [
-            {"role": "system", "content": self.build_chat_system_prompt(context)}
+        # Histórico longo: mensagens antigas viram um resumo (cacheado), as recentes seguem cruas.
+        # Das recentes, no máximo 10; as mais antigas são cortadas primeiro
+        resumo, recentes = await conversation_summarizer.condensar(
+            history, modelo, classe=CLASSE_CHAT, usuario_id=usuario_id
+        )
+        historico = recentes[-10:]
+        secoes = [
+            SecaoContexto("sistema", self.build_chat_prompt_estatico()),
+            SecaoContexto("projeto", "\n\n" + self.build_chat_contexto_projeto(context)),
         ]
-        
-        # Adicionar histórico (últimas 10 mensagens para economizar tokens)
-        for msg in history[-10:]:
+        # Consulta para os trechos das skills: mensagem atual + última pergunta anterior
+        ultima_do_usuario = next((m.content for m in reversed(historico) if m.role == "user"), "")
+        secoes += self.secoes_conhecimento(context, consulta=f"{message}\n{ultima_do_usuario}")
+        if resumo:
+            secoes.append(SecaoContexto(
+                "resumo", f"\n\nRESUMO DA CONVERSA ATÉ AQUI:\n{resumo}",
+                PRIORIDADE_HISTORICO + len(historico),
+            ))
+        for i, msg in enumerate(historico):
             # TODO: Se o histórico tiver imagens, precisaríamos tratar aqui também.
             # Por enquanto, assumimos que histórico é apenas texto ou simplificado.
+            secoes.append(SecaoContexto(
+                f"historico:{i}", msg.content,
+                PRIORIDADE_HISTORICO + (len(historico) - 1 - i),
+                truncavel=False,
+            ))
+        secoes.append(SecaoContexto("mensagem", message, PRIORIDADE_OBRIGATORIA))
+        for i, att in enumerate(attachments or []):
+            if not att.get("type", "").startswith("image/") and att.get("extracted_text"):
+                secoes.append(SecaoContexto(
+                    f"mensagem_anexo:{i}",
+                    f"\n\n[CONTEÚDO DO ARQUIVO ANEXADO ({att.get('filename')}):]\n{att.get('extracted_text')}\n",
+                    PRIORIDADE_ANEXO,
+                ))
+        
+        montagem = ContextAssembler(modelo, self._orcamento("chat")).montar(secoes)
+        registrar_montagem(self.__class__.__name__, "chat", montagem)
+        yield {"type": "context", **montagem.relatorio()}
+        
+        # Montar mensagens para a API: prefixo estável (cacheável no provedor) + cauda do turno
+        prefixo = montagem.texto("sistema") + self.renderizar_skills(montagem)
+        cauda = montagem.texto("projeto") + self.renderizar_conhecimento(montagem) + montagem.texto("resumo")
+        messages = [mensagem_sistema(prefixo, cauda, modelo)]
+        for secao in montagem.mantidas("historico:"):
+            msg = historico[int(secao.nome.split(":")[1])]
             messages.append({"role": msg.role, "content": msg.content})
         
         # Construir mensagem do usuário (multimodal se houver anexos)
+        texto_usuario = message + "".join(s.texto for s in montagem.mantidas("mensagem_anexo:"))
         if attachments:
-            content_parts = [{"type": "text", "text": message}]
+            content_parts = [{"type": "text", "text": texto_usuario}]
             
             for att in attachments:
                 if att.get("type", "").startswith("image/"):
@@ -263,14 +433,11 @@ INSTRUÇÕES:
                             "type": "image_url",
                             "image_url": {"url": url}
                         })
-                elif att.get("extracted_text"):
-                    # Se for PDF/texto com conteúdo extraído, adicionar como texto
-                    text_content = f"\n\n[CONTEÚDO DO ARQUIVO ANEXADO ({att.get('filename')}):]\n{att.get('extracted_text')}\n"
-                    content_parts[0]["text"] += text_content
+                # PDF/texto com conteúdo extraído já está em texto_usuario (se coube no orçamento)
 
             messages.append({"role": "user", "content": content_parts})
         else:
-            messages.append({"role": "user", "content": message})
+            messages.append({"role": "user", "content": texto_usuario})
         
         logger.info(f"[{self.__class__.__name__}] Chat com {len(messages)} mensagens")
         logger.info(f"[{self.__class__.__name__}] ===== PAYLOAD ENVIADO À IA (chat) =====")
@@ -295,35 +462,39 @@ INSTRUÇÕES:
         logger.info(f"[{self.__class__.__name__}] ===== FIM PAYLOAD (chat) =====")
 
         try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
+            # Com hedge ligado, um modelo reserva pode assumir se o principal demorar
+            modelo_usado, stream = await llm_hedger.abrir(modelo, lambda m: self.client.chat.completions.create(
+                model=m,
                 messages=messages,
                 temperature=self.temperature_chat,
                 max_tokens=self.max_tokens_chat,
                 stream=True,
-            )
+                **opcoes_stream(),
+            ), classe=CLASSE_CHAT, usuario_id=usuario_id, custo=self.max_tokens_chat)
             
-            async for chunk in stream:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta:
-                    # Verificar se há campo de raciocínio (OpenRouter/DeepSeek)
-                    # Pode vir em 'reasoning', 'reasoning_content' ou model_extra
-                    reasoning_content = getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None)
+            async with aclosing(stream):
+                async for chunk in stream:
+                    registrar_uso(chunk, modelo_usado, "chat")
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if delta:
+                        # Verificar se há campo de raciocínio (OpenRouter/DeepSeek)
+                        # Pode vir em 'reasoning', 'reasoning_content' ou model_extra
+                        reasoning_content = getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None)
                     
-                    # Fallback para model_extra se disponível
-                    if not reasoning_content and hasattr(delta, "model_extra") and delta.model_extra:
-                        reasoning_content = delta.model_extra.get("reasoning") or delta.model_extra.get("reasoning_content")
+                        # Fallback para model_extra se disponível
+                        if not reasoning_content and hasattr(delta, "model_extra") and delta.model_extra:
+                            reasoning_content = delta.model_extra.get("reasoning") or delta.model_extra.get("reasoning_content")
 
-                    if reasoning_content:
-                        # Yield reasoning as a structured event
-                        yield {"type": "reasoning", "content": reasoning_content}
+                        if reasoning_content:
+                            # Yield reasoning as a structured event
+                            yield {"type": "reasoning", "content": reasoning_content}
 
-                    # Content normal
-                    if delta.content:
-                        yield {"type": "content", "content": delta.content}
+                        # Content normal
+                        if delta.content:
+                            yield {"type": "content", "content": delta.content}
                     
-                    # Forcar flush do evento no loop interno
-                    await asyncio.sleep(0)
+                        # Forcar flush do evento no loop interno
+                        await asyncio.sleep(0)
                     
         except Exception as e:
             logger.error(f"[{self.__class__.__name__}] Erro no chat: {e}")
@@ -333,6 +504,9 @@ INSTRUÇÕES:
         self,
         context: ChatContext,
         history: List[Message],
+        model: Optional[str] = None,
+        usuario_id: Optional[int] = None,
+        campos: Optional[List[str]] = None,
     ) -> AsyncGenerator[Dict[str, str], None]:
         """
         Gera o artefato completo usando o contexto coletado na conversa.
@@ -340,17 +514,42 @@ INSTRUÇÕES:
         Args:
             context: Contexto do projeto com dados coletados
             history: Histórico da conversa (para referência)
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            usuario_id: Usuário da chamada (fila justa do escalonador)
+            campos: Gerar apenas estes campos (reparo de uma geração incompleta)
             
         Yields:
             Chunks de texto do artefato sendo gerado (dicts)
         """
         logger.info(f"[{self.__class__.__name__}] === INICIANDO MÉTODO GERAR ===")
         
+        preparada = await self.preparar_geracao(context, history, model, usuario_id=usuario_id)
+        yield {"type": "context", **preparada.montagem.relatorio()}
+        async for item in self.stream_geracao(preparada, campos=campos, usuario_id=usuario_id):
+            yield item
+    
+    async def preparar_geracao(
+        self,
+        context: ChatContext,
+        history: List[Message],
+        model: Optional[str] = None,
+        usuario_id: Optional[int] = None,
+    ) -> GeracaoPreparada:
+        """
+        Monta o prompt de geração: resumo da conversa e contexto ajustados
+        ao orçamento de tokens. Feito uma vez por geração, mesmo quando ela
+        se divide em várias chamadas (seções, reparo de campos).
+        """
         # Carregar prompts do banco se necessário
         await self._load_prompts()
+        modelo = self._resolve_model(model)
         
-        # Extrair informações relevantes do histórico
-        conversa_resumo = self._resumir_conversa(history)
+        # Ajustar conversa (resumo + mensagens recentes) e base de conhecimento ao orçamento de tokens
+        resumo, recentes = await conversation_summarizer.condensar(
+            history, modelo, classe=CLASSE_GERACAO, usuario_id=usuario_id
+        )
+        context, conversa_resumo, montagem = self._ajustar_contexto_geracao(context, recentes, modelo, resumo=resumo)
+        registrar_montagem(self.__class__.__name__, "gerar", montagem)
         logger.info(f"[{self.__class__.__name__}] Conversa resumida: {conversa_resumo[:300]}...")
         
         # Construir prompt de geração
@@ -358,12 +557,47 @@ INSTRUÇÕES:
         logger.info(f"[{self.__class__.__name__}] Prompt de geração (primeiros 500 chars): {user_prompt[:500]}...")
         
         messages = [
-            {"role": "system", "content": self.system_prompt_generate},
+            mensagem_sistema(self.system_prompt_generate, "", modelo),
             {"role": "user", "content": user_prompt},
         ]
+        return GeracaoPreparada(modelo=modelo, messages=messages, montagem=montagem)
+    
+    async def stream_geracao(
+        self,
+        preparada: GeracaoPreparada,
+        campos: Optional[List[str]] = None,
+        rascunho: Optional[Dict[str, Any]] = None,
+        usuario_id: Optional[int] = None,
+    ) -> AsyncGenerator[Dict[str, str], None]:
+        """
+        Uma chamada de geração sobre o prompt preparado.
         
-        logger.info(f"[{self.__class__.__name__}] Iniciando geração de {self.nome_artefato}")
-        logger.info(f"[{self.__class__.__name__}] Model: {self.model}")
+        Args:
+            preparada: Prompt montado por preparar_geracao
+            campos: Gerar apenas estes campos (uma seção, ou o reparo de campos)
+            rascunho: Campos já gerados, que os `campos` devem citar (consistência)
+            usuario_id: Usuário da chamada (fila justa do escalonador)
+            
+        Yields:
+            Chunks de raciocínio e de conteúdo (dicts)
+        """
+        modelo = preparada.modelo
+        messages = preparada.messages
+        if campos:
+            instrucao = (
+                f"ATENÇÃO: gere APENAS os campos {', '.join(campos)}. "
+                "Retorne um único objeto JSON contendo somente essas chaves."
+            )
+            if rascunho:
+                instrucao = (
+                    "CAMPOS JÁ GERADOS (mantenha coerência com eles e cite-os quando pertinente):\n"
+                    f"{json.dumps(rascunho, ensure_ascii=False)}\n\n{instrucao}"
+                )
+            # O prefixo (sistema + prompt de geração) é o mesmo em todas as chamadas
+            messages = messages[:-1] + [{"role": "user", "content": f"{messages[-1]['content']}\n\n{instrucao}"}]
+        
+        logger.info(f"[{self.__class__.__name__}] Iniciando geração de {self.nome_artefato}" + (f" (campos: {', '.join(campos)})" if campos else ""))
+        logger.info(f"[{self.__class__.__name__}] Model: {modelo}")
         logger.info(f"[{self.__class__.__name__}] Temperature: {self.temperature_generate}")
         logger.info(f"[{self.__class__.__name__}] Max tokens: {self.max_tokens_generate}")
         logger.info(f"[{self.__class__.__name__}] ===== PAYLOAD ENVIADO À IA (gerar) =====")
@@ -373,33 +607,37 @@ INSTRUÇÕES:
 
         try:
             logger.info(f"[{self.__class__.__name__}] Chamando API OpenRouter...")
-            stream = await self.client.chat.completions.create(
-                model=self.model,
+            # Com hedge ligado, um modelo reserva pode assumir se o principal demorar
+            modelo_usado, stream = await llm_hedger.abrir(modelo, lambda m: self.client.chat.completions.create(
+                model=m,
                 messages=messages,
                 temperature=self.temperature_generate,
                 max_tokens=self.max_tokens_generate,
                 stream=True,
-            )
+                **opcoes_stream(),
+            ), classe=CLASSE_GERACAO, usuario_id=usuario_id, custo=self.max_tokens_generate)
             logger.info(f"[{self.__class__.__name__}] Stream criado com sucesso")
             
             chunk_count = 0
-            async for chunk in stream:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta:
-                    # Tratamento de raciocínio (thinking)
-                    reasoning_content = getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None)
-                    if not reasoning_content and hasattr(delta, "model_extra") and delta.model_extra:
-                        reasoning_content = delta.model_extra.get("reasoning") or delta.model_extra.get("reasoning_content")
-
-                    if reasoning_content:
-                        yield {"type": "reasoning", "content": reasoning_content}
-
-                    # Conteúdo principal
-                    if delta.content:
-                        chunk_count += 1
-                        if chunk_count <= 3:
-                            logger.debug(f"[{self.__class__.__name__}] Chunk #{chunk_count}: {delta.content[:50]}...")
-                        yield {"type": "content", "content": delta.content}
+            async with aclosing(stream):
+                async for chunk in stream:
+                    registrar_uso(chunk, modelo_usado, "gerar")
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if delta:
+                        # Tratamento de raciocínio (thinking)
+                        reasoning_content = getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None)
+                        if not reasoning_content and hasattr(delta, "model_extra") and delta.model_extra:
+                            reasoning_content = delta.model_extra.get("reasoning") or delta.model_extra.get("reasoning_content")
+
+                        if reasoning_content:
+                            yield {"type": "reasoning", "content": reasoning_content}
+
+                        # Conteúdo principal
+                        if delta.content:
+                            chunk_count += 1
+                            if chunk_count <= 3:
+                                logger.debug(f"[{self.__class__.__name__}] Chunk #{chunk_count}: {delta.content[:50]}...")
+                            yield {"type": "content", "content": delta.content}
             
             logger.info(f"[{self.__class__.__name__}] Geração completa. Total chunks: {chunk_count}")
                     
@@ -413,15 +651,27 @@ INSTRUÇÕES:
         contexto: Dict[str, Any],
         valor_atual: Optional[str] = None,
         instrucoes: Optional[str] = None,
+        model: Optional[str] = None,
+        forcar_cache: bool = False,
+        usuario_id: Optional[int] = None,
+        nova_versao: bool = False,
     ) -> AsyncGenerator[str, None]:
         """
         Regenera um campo específico do artefato.
 
+        Chamadas idênticas em sequência (clique duplo, reenvio) são servidas
+        pelo cache de respostas por LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS;
+        nova_versao=True ("regenerar de novo") ignora o cache.
+
         Args:
             campo: Nome do campo a regenerar
             contexto: Dados do projeto e itens PAC
             valor_atual: Valor atual do campo (para referência)
             instrucoes: Instruções específicas para regeneração
+            model: Modelo a usar nesta chamada (default: modelo da instância)
+            forcar_cache: Cachear mesmo acima da temperatura limite
+            usuario_id: Usuário da chamada (fila justa do escalonador)
+            nova_versao: Pedir outra versão (não reaproveitar a resposta em cache)
 
         Yields:
             Chunks de texto conforme são gerados pela IA
@@ -463,19 +713,34 @@ DIRETRIZES:
 
         logger.info(f"[{self.__class__.__name__}] Regenerando campo '{campo}'")
 
-        try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
+        modelo = self._resolve_model(model)
+        temperatura = self.temperature_chat + 0.1
+        max_tokens = 2048
+
+        async def chamar():
+            _modelo_usado, stream = await llm_hedger.abrir(modelo, lambda m: self.client.chat.completions.create(
+                model=m,
                 messages=messages,
-                temperature=self.temperature_chat + 0.1,
-                max_tokens=2048,
+                temperature=temperatura,
+                max_tokens=max_tokens,
                 stream=True,
-            )
+            ), classe=CLASSE_REGENERACAO, usuario_id=usuario_id, custo=max_tokens)
+            async with aclosing(stream):
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if delta and delta.content:
+                        yield delta.content
 
-            async for chunk in stream:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta and delta.content:
-                    yield delta.content
+        try:
+            if nova_versao:
+                stream = chamar()
+            else:
+                stream = response_cache.responder(
+                    modelo, messages, temperatura, max_tokens, chamar,
+                    forcar=forcar_cache, ttl=settings.LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS,
+                )
+            async for content in stream:
+                yield content
 
         except Exception as e:
             logger.error(f"[{self.__class__.__name__}] Erro ao regenerar campo: {e}")
@@ -517,15 +782,72 @@ Gere o {self.nome_artefato} completo em formato JSON."""
     
     def _resumir_conversa(self, history: List[Message]) -> str:
         """Resume o histórico da conversa para o prompt de geração."""
-        if not history:
+        partes = self._linhas_conversa(history)
+        if not partes:
             return "Nenhuma informação adicional coletada."
-        
+        return "\n".join(partes)
+    
+    def _linhas_conversa(self, history: List[Message]) -> List[str]:
+        """Últimas 10 mensagens, 200 caracteres cada, prefixadas pelo autor."""
         partes = []
-        for msg in history:
+        for msg in history[-10:]:
             prefixo = "Usuário:" if msg.role == "user" else "IA:"
             partes.append(f"{prefixo} {msg.content[:200]}")
+        return partes
+    
+    def _ajustar_contexto_geracao(
+        self,
+        context: ChatContext,
+        history: List[Message],
+        modelo: str,
+        resumo: Optional[str] = None,
+    ) -> Tuple[ChatContext, str, MontagemContexto]:
+        """
+        Ajusta o resumo da conversa e a base de conhecimento ao orçamento.
+        
+        O restante do prompt de geração (dados do projeto, artefatos
+        aprovados, skills) é obrigatório; dos documentos do projeto entram
+        só os trechos mais relevantes. A base de conhecimento é cortada
+        antes das mensagens da conversa, e as mensagens mais antigas antes
+        das recentes. `resumo` condensa as mensagens anteriores a `history`.
+        """
+        dados_fixos = {k: v for k, v in context.dados_coletados.items() if k != 'base_conhecimento'}
+        contexto_fixo = replace(context, dados_coletados=dados_fixos)
+        
+        linhas = self._linhas_conversa(history)
+        secoes = [SecaoContexto(
+            "fixo", self.system_prompt_generate + self.build_generate_prompt(contexto_fixo, "")
+        )]
+        if resumo:
+            # Resumo das mensagens anteriores às recentes (ver conversation_summary)
+            secoes.append(SecaoContexto(
+                "conversa:resumo", f"Resumo da conversa:\n{resumo}\n",
+                PRIORIDADE_HISTORICO + len(linhas),
+            ))
+        for i, linha in enumerate(linhas):
+            secoes.append(SecaoContexto(
+                f"conversa:{i}", linha,
+                PRIORIDADE_HISTORICO + (len(linhas) - 1 - i),
+                truncavel=False,
+            ))
+        base_conhecimento = context.dados_coletados.get('base_conhecimento')
+        if base_conhecimento:
+            secoes.append(SecaoContexto("base_conhecimento", base_conhecimento, PRIORIDADE_ANEXO))
+        # Documentos do projeto: trechos relevantes para a conversa e o artefato
+        consulta = "\n".join([self.nome_artefato, *linhas])
+        secoes += self.secoes_documentos(context, consulta, settings.KB_RETRIEVAL_TOP_K_GENERATE)
+        
+        montagem = ContextAssembler(modelo, self._orcamento("gerar")).montar(secoes)
+        
+        conversa = [s.texto for s in montagem.mantidas("conversa:")]
+        conversa_resumo = "\n".join(conversa) if conversa else "Nenhuma informação adicional coletada."
+        
+        base_mantida = montagem.texto("base_conhecimento")
+        base_mantida += "".join(s.texto for s in montagem.mantidas("documento:"))
+        if base_mantida:
+            dados_fixos = {**dados_fixos, 'base_conhecimento': base_mantida}
         
-        return "\n".join(partes[-10:])  # Últimas 10 mensagens
+        return replace(context, dados_coletados=dados_fixos), conversa_resumo, montagem
     
     def get_mensagem_inicial(self, context: ChatContext) -> str:
         """
@@ -62,6 +62,15 @@ class EditalChatAgent(ConversationalAgent):
         "disposicoes_finais",
     ]
 
+    # Geração em seções paralelas (ver ConversationalAgent.secoes_geracao):
+    # os 4 campos do schema de geração são independentes
+    secoes_geracao = [
+        ["objeto"],
+        ["condicoes_participacao"],
+        ["criterios_julgamento"],
+        ["fase_lances"],
+    ]
+
     def get_mensagem_inicial(self, context: ChatContext) -> str:
         """Mensagem inicial customizada para Edital."""
 
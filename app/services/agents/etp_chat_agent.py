@@ -79,12 +79,22 @@ class ETPChatAgent(ConversationalAgent):
         "viabilidade_contratacao",
     ]
 
+    # Geração em seções paralelas (ver ConversationalAgent.secoes_geracao)
+    secoes_geracao = [
+        ["descricao_necessidade", "area_requisitante", "alinhamento_pca", "resultados_pretendidos"],
+        ["requisitos_contratacao", "estimativa_quantidades", "descricao_solucao", "justificativa_parcelamento"],
+        ["levantamento_mercado", "estimativa_valor", "contratacoes_correlatas"],
+        ["providencias_previas", "impactos_ambientais", "analise_riscos"],
+    ]
+    # O parecer final conclui a partir dos demais campos
+    campos_consistencia = ["viabilidade_contratacao"]
+
     def __init__(self, model_override: Optional[str] = None, active_skills_instr: str = ""):
         super().__init__(model_override=model_override)
         self.active_skills_instr = active_skills_instr
 
-    def build_chat_system_prompt(self, context: ChatContext) -> str:
-        base_prompt = super().build_chat_system_prompt(context)
+    def build_chat_prompt_estatico(self) -> str:
+        base_prompt = super().build_chat_prompt_estatico()
         if self.active_skills_instr:
             base_prompt += f"\n\n{self.active_skills_instr}"
         return base_prompt
@@ -0,0 +1,250 @@
+"""
+Sistema LIA - Requisições com Hedge entre Modelos
+=================================================
+Os modelos gratuitos do OpenRouter têm tempo até o primeiro token (TTFT)
+muito variável e devolvem 429 com frequência. Com o hedge ligado
+(LLM_HEDGING_ENABLED), se o modelo principal não produzir o primeiro
+token dentro do atraso de hedge, a mesma requisição é disparada num
+modelo reserva; fica o stream que produzir o primeiro token antes e o
+outro é cancelado (a conexão HTTP é fechada).
+
+- Se o principal falhar antes do primeiro token (429, timeout), o
+  reserva é disparado na hora, sem esperar o atraso.
+- O atraso acompanha o TTFT observado do modelo principal: percentil
+  LLM_HEDGE_PERCENTILE das últimas amostras (janela de model_health,
+  alimentada pelas sondas e pelo tráfego real),
+  limitado a [LLM_HEDGE_MIN_DELAY_MS, LLM_HEDGE_MAX_DELAY_MS]. Com poucas
+  amostras, vale LLM_HEDGE_DELAY_MS.
+- O reserva é o candidato (LLM_HEDGE_FALLBACK_MODELS ou AVAILABLE_MODELS)
+  com menor TTFT mediano observado, ignorando os marcados como não
+  saudáveis.
+
+TTFT e falhas são registrados em model_health também com o hedge
+desligado, para que o atraso e o roteamento já estejam calibrados.
+
+Cada chamada passa antes pelo escalonador (llm_scheduler), na classe de
+prioridade informada; a vaga fica com o stream até ele ser fechado.
+
+Uso:
+    modelo_usado, stream = await llm_hedger.abrir(
+        modelo, lambda m: client.chat.completions.create(model=m, ..., stream=True),
+        classe=CLASSE_CHAT, usuario_id=usuario_id, custo=max_tokens,
+    )
+    async for chunk in stream:
+        ...
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from app.config import AVAILABLE_MODELS, settings
+from app.services.metrics import metrics, percentil
+from app.services.model_health import model_health
+from .llm_scheduler import CLASSE_CHAT, VagaLLM, llm_scheduler
+
+logger = logging.getLogger(__name__)
+
+CriarStream = Callable[[str], Awaitable[Any]]
+
+
+def _tem_token(chunk: Any) -> bool:
+    """Se o chunk traz conteúdo ou raciocínio (primeiro token efetivo)."""
+    delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+    if delta is None:
+        return False
+    if delta.content or getattr(delta, "reasoning", None) or getattr(delta, "reasoning_content", None):
+        return True
+    extra = getattr(delta, "model_extra", None) or {}
+    return bool(extra.get("reasoning") or extra.get("reasoning_content"))
+
+
+async def _fechar(stream: Any) -> None:
+    try:
+        await stream.close()
+    except Exception:
+        pass
+
+
+class _StreamComVaga:
+    """Repassa os chunks do stream e devolve a vaga do escalonador ao terminar ou fechar."""
+
+    def __init__(self, chunks: AsyncIterator[Any], vaga: VagaLLM):
+        self._chunks = chunks
+        self._vaga = vaga
+
+    def __aiter__(self) -> "_StreamComVaga":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            # Fim do stream, erro ou cancelamento
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._chunks.aclose()
+        finally:
+            self._vaga.liberar()
+
+
+class LLMHedger:
+    """Abre streams de chat com hedge entre o modelo principal e um reserva."""
+
+    # ========== ATRASO E MODELO RESERVA ==========
+
+    @staticmethod
+    def _ttfts(modelo: str) -> list:
+        return model_health.ttft_amostras(modelo)
+
+    def atraso_ms(self, modelo: str) -> float:
+        """Atraso de hedge do modelo, adaptado ao TTFT observado."""
+        amostras = self._ttfts(modelo)
+        if len(amostras) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DELAY_MS
+        atraso = percentil(amostras, settings.LLM_HEDGE_PERCENTILE)
+        return min(max(atraso, settings.LLM_HEDGE_MIN_DELAY_MS), settings.LLM_HEDGE_MAX_DELAY_MS)
+
+    def candidatos(self, modelo: str) -> List[str]:
+        """Modelos reserva para `modelo`, do menor para o maior TTFT mediano."""
+        configurados = [m.strip() for m in settings.LLM_HEDGE_FALLBACK_MODELS.split(",") if m.strip()]
+        modelos = configurados or [m["id"] for m in AVAILABLE_MODELS]
+        modelos = [m for m in modelos if m != modelo and model_health.saudavel(m) is not False]
+
+        def mediana(m: str) -> float:
+            amostras = self._ttfts(m)
+            return percentil(amostras, 50) if amostras else settings.LLM_HEDGE_DELAY_MS
+
+        # sorted é estável: sem amostras, vale a ordem da lista
+        return sorted(modelos, key=mediana)
+
+    def modelo_reserva(self, modelo: str) -> Optional[str]:
+        candidatos = self.candidatos(modelo)
+        return candidatos[0] if candidatos else None
+
+    # ========== STREAMS ==========
+
+    async def _ate_primeiro_token(self, modelo: str, criar: CriarStream) -> Tuple[Any, AsyncIterator[Any], List[Any]]:
+        """
+        Abre o stream e lê até o primeiro token.
+
+        Devolve (stream, iterador, chunks lidos); o restante é lido do
+        mesmo iterador em _continuar.
+        """
+        inicio = time.perf_counter()
+        try:
+            stream = await criar(modelo)
+        except Exception as e:
+            model_health.registrar(modelo, erro=type(e).__name__)
+            raise
+        iterador = stream.__aiter__()
+        lidos = []
+        try:
+            async for chunk in iterador:
+                lidos.append(chunk)
+                if _tem_token(chunk):
+                    break
+        except BaseException as e:
+            # Cancelado (perdeu a corrida) ou erro: encerra a resposta HTTP
+            if isinstance(e, Exception):
+                model_health.registrar(modelo, erro=type(e).__name__)
+            await _fechar(stream)
+            raise
+        ttft_ms = (time.perf_counter() - inicio) * 1000
+        metrics.observe("llm.ttft_ms", ttft_ms, modelo=modelo)
+        model_health.registrar(modelo, ttft_ms=ttft_ms)
+        return stream, iterador, lidos
+
+    @staticmethod
+    async def _continuar(stream: Any, iterador: AsyncIterator[Any], lidos: List[Any]) -> AsyncIterator[Any]:
+        try:
+            for chunk in lidos:
+                yield chunk
+            async for chunk in iterador:
+                yield chunk
+        finally:
+            await _fechar(stream)
+
+    @staticmethod
+    async def _cancelar(tarefa: asyncio.Task) -> None:
+        if tarefa.done():
+            if not tarefa.cancelled() and tarefa.exception() is None:
+                await _fechar(tarefa.result()[0])
+            return
+        tarefa.cancel()
+        await asyncio.gather(tarefa, return_exceptions=True)
+
+    async def abrir(
+        self,
+        modelo: str,
+        criar: CriarStream,
+        classe: str = CLASSE_CHAT,
+        usuario_id: Optional[int] = None,
+        custo: float = 1.0,
+    ) -> Tuple[str, AsyncIterator[Any]]:
+        """
+        Abre o stream de chat; retorna (modelo que respondeu, chunks).
+
+        `criar(modelo)` deve retornar o stream do create(..., stream=True).
+        A chamada aguarda a vez no escalonador (classe de prioridade,
+        usuário e custo em tokens) e ocupa a vaga até o stream fechar.
+        """
+        vaga = await llm_scheduler.reservar(classe, usuario_id, custo)
+        try:
+            modelo_usado, chunks = await self._abrir(modelo, criar)
+        except BaseException:
+            vaga.liberar()
+            raise
+        return modelo_usado, _StreamComVaga(chunks, vaga)
+
+    async def _abrir(self, modelo: str, criar: CriarStream) -> Tuple[str, AsyncIterator[Any]]:
+        reserva = self.modelo_reserva(modelo) if settings.LLM_HEDGING_ENABLED else None
+        principal = asyncio.create_task(self._ate_primeiro_token(modelo, criar))
+        if reserva is None:
+            return modelo, self._continuar(*await principal)
+
+        tarefas = {principal: modelo}
+        atraso = self.atraso_ms(modelo) / 1000
+        try:
+            await asyncio.wait({principal}, timeout=atraso)
+            if not principal.done() or principal.exception() is not None:
+                motivo = "erro" if principal.done() else "atraso"
+                logger.info(
+                    f"[Hedge] {modelo} sem primeiro token em {atraso * 1000:.0f}ms ({motivo}); "
+                    f"disparando {reserva}"
+                )
+                metrics.incr("llm.hedge.disparado", motivo=motivo)
+                tarefas[asyncio.create_task(self._ate_primeiro_token(reserva, criar))] = reserva
+
+            pendentes = set(tarefas)
+            erro: Optional[BaseException] = None
+            while pendentes:
+                prontas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in prontas:
+                    if tarefa.exception() is not None:
+                        erro = erro or tarefa.exception()
+                        logger.warning(f"[Hedge] {tarefas[tarefa]} falhou: {tarefa.exception()}")
+                        continue
+                    vencedor = tarefas[tarefa]
+                    for outra in tarefas:
+                        if outra is not tarefa:
+                            await self._cancelar(outra)
+                    metrics.incr("llm.hedge.vencedor", papel="principal" if vencedor == modelo else "reserva")
+                    return vencedor, self._continuar(*tarefa.result())
+            # Todas falharam: propaga o erro do principal (ou o primeiro)
+            raise principal.exception() or erro
+        except BaseException:
+            for tarefa in tarefas:
+                await self._cancelar(tarefa)
+            raise
+
+
+# Instância global
+llm_hedger = LLMHedger()
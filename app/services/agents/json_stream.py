@@ -0,0 +1,222 @@
+"""
+Sistema LIA - Parser JSON Incremental para Streams de Geração
+==============================================================
+A geração de artefatos chega como um único objeto JSON, token a token.
+Em vez de esperar o fim do stream para um json.loads (em que uma chave
+mal fechada descarta o documento inteiro), o parser acompanha o objeto
+de nível superior e entrega cada campo assim que o valor dele fecha.
+
+- Texto antes do primeiro '{' (cercas ```json, preâmbulo) é ignorado;
+  o que vier depois do '}' final também.
+- Cada valor é decodificado sozinho (json.loads, strict=False para
+  quebras de linha literais dentro de strings): um valor quebrado vira
+  um campo inválido, sem perder os demais.
+- Stream interrompido no meio de um valor: o campo fica faltando.
+
+Os campos entregues são validados contra o *_CAMPOS_CONFIG do artefato
+(`validar_campo`); os faltantes ou inválidos podem ser pedidos de novo,
+sozinhos, em vez do documento inteiro (`campos_faltantes`).
+
+Uso:
+    parser = IncrementalJSONParser()
+    for chunk in stream:
+        for campo, valor in parser.alimentar(chunk):
+            ...
+    parser.finalizar()
+    parser.campos, parser.invalidos, parser.completo
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Estados do objeto de nível superior
+_ANTES = 0          # procurando o '{' inicial
+_CHAVE = 1          # esperando uma chave (ou '}')
+_DOIS_PONTOS = 2    # esperando ':' após a chave
+_VALOR = 3          # esperando o início do valor
+_LENDO_VALOR = 4    # dentro do valor, até ',' ou '}' no nível superior
+_FIM = 5            # objeto fechado
+
+
+class IncrementalJSONParser:
+    """Entrega os campos de nível superior de um objeto JSON à medida que fecham."""
+
+    def __init__(self):
+        self.campos: Dict[str, Any] = {}
+        self.invalidos: Dict[str, str] = {}
+        self._buf = ""
+        self._pos = 0
+        self._estado = _ANTES
+        self._chave: Optional[str] = None
+        self._inicio = 0            # início do token atual (chave ou valor) em _buf
+        self._aninhamento = 0       # profundidade de {} / [] dentro do valor
+        self._em_string = False
+        self._escape = False
+
+    @property
+    def completo(self) -> bool:
+        """Se o '}' do objeto de nível superior chegou."""
+        return self._estado == _FIM
+
+    def alimentar(self, texto: str) -> List[Tuple[str, Any]]:
+        """Consome mais texto do stream; retorna os campos (válidos) que fecharam."""
+        if self._estado == _FIM or not texto:
+            return []
+        self._buf += texto
+        fechados: List[Tuple[str, Any]] = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf) and self._estado != _FIM:
+            c = buf[i]
+            estado = self._estado
+
+            if estado == _ANTES:
+                if c == "{":
+                    self._estado = _CHAVE
+
+            elif estado == _CHAVE:
+                if self._em_string:
+                    if self._escape:
+                        self._escape = False
+                    elif c == "\\":
+                        self._escape = True
+                    elif c == '"':
+                        self._em_string = False
+                        self._chave = self._decodificar_chave(buf[self._inicio:i + 1])
+                        self._estado = _DOIS_PONTOS
+                elif c == '"':
+                    self._em_string = True
+                    self._inicio = i
+                elif c == "}":
+                    self._estado = _FIM
+
+            elif estado == _DOIS_PONTOS:
+                if c == ":":
+                    self._estado = _VALOR
+
+            elif estado == _VALOR:
+                if not c.isspace():
+                    self._estado = _LENDO_VALOR
+                    self._inicio = i
+                    continue  # reprocessa o caractere como parte do valor
+
+            elif estado == _LENDO_VALOR:
+                if self._em_string:
+                    if self._escape:
+                        self._escape = False
+                    elif c == "\\":
+                        self._escape = True
+                    elif c == '"':
+                        self._em_string = False
+                elif c == '"':
+                    self._em_string = True
+                elif c in "{[":
+                    self._aninhamento += 1
+                elif c in "}]" and self._aninhamento > 0:
+                    self._aninhamento -= 1
+                elif self._aninhamento == 0 and c in ",}":
+                    campo = self._fechar_valor(buf[self._inicio:i])
+                    if campo is not None:
+                        fechados.append(campo)
+                    self._estado = _FIM if c == "}" else _CHAVE
+                    # Descarta o que já foi consumido
+                    buf = buf[i + 1:]
+                    i = 0
+                    continue
+            i += 1
+
+        self._buf = buf
+        self._pos = i
+        return fechados
+
+    def finalizar(self) -> List[Tuple[str, Any]]:
+        """
+        Fim do stream. Um último valor sem o '}' de fechamento é aceito se
+        estiver inteiro; retorna o campo entregue nesse caso.
+        """
+        if self._estado != _LENDO_VALOR or self._em_string or self._aninhamento:
+            return []
+        campo = self._fechar_valor(self._buf[self._inicio:])
+        self._estado = _FIM
+        return [campo] if campo is not None else []
+
+    @staticmethod
+    def _decodificar_chave(bruto: str) -> str:
+        try:
+            return json.loads(bruto, strict=False)
+        except ValueError:
+            return bruto.strip('"')
+
+    def _fechar_valor(self, bruto: str) -> Optional[Tuple[str, Any]]:
+        chave, self._chave = self._chave, None
+        if chave is None:
+            return None
+        try:
+            valor = json.loads(bruto.strip(), strict=False)
+        except ValueError as e:
+            self.invalidos[chave] = f"JSON inválido: {e}"
+            return None
+        self.campos[chave] = valor
+        self.invalidos.pop(chave, None)
+        return chave, valor
+
+
+# ========== VALIDAÇÃO CONTRA O *_CAMPOS_CONFIG ==========
+
+def _config_do_campo(campos_config: Dict[str, Dict[str, Any]], chave: str) -> Optional[Dict[str, Any]]:
+    """Configuração do campo pela chave do config ou pelo nome gerado pela IA (campo_ia)."""
+    if chave in campos_config:
+        return campos_config[chave]
+    for cfg in campos_config.values():
+        if cfg.get("campo_ia") == chave:
+            return cfg
+    return None
+
+
+def validar_campo(campos_config: Dict[str, Dict[str, Any]], chave: str, valor: Any) -> Optional[str]:
+    """
+    Motivo de o valor não servir para o campo (None se serve).
+
+    Chaves fora do config (metadados do schema de geração, como
+    prioridade_sugerida) não são validadas. null é aceito: os schemas de
+    geração o permitem nos campos opcionais ("string ou null").
+    """
+    cfg = _config_do_campo(campos_config, chave)
+    if cfg is None or valor is None:
+        return None
+    input_type = cfg.get("input_type")
+    if isinstance(valor, str) and not valor.strip():
+        return "valor vazio"
+    if input_type == "json":
+        if not isinstance(valor, (list, dict)):
+            return "esperado uma lista ou objeto JSON"
+    elif input_type == "number":
+        if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+            return "esperado um número"
+    elif input_type == "checkbox":
+        if not isinstance(valor, bool):
+            return "esperado verdadeiro ou falso"
+    elif input_type == "date":
+        if not isinstance(valor, str):
+            return "esperado uma data (texto)"
+    elif cfg.get("options"):
+        # options: [{"value", "label"}, ...] (ou valores simples)
+        valores = [o["value"] if isinstance(o, dict) else o for o in cfg["options"]]
+        if valor not in valores:
+            return "valor fora das opções do campo"
+    return None
+
+
+def campos_faltantes(campos_config: Dict[str, Dict[str, Any]], gerados: Dict[str, Any]) -> List[str]:
+    """Campos preenchidos pela IA (tipo B) ausentes em `gerados`, pelo nome gerado."""
+    faltantes = []
+    for chave, cfg in campos_config.items():
+        if cfg.get("tipo") != "B":
+            continue
+        nome = cfg.get("campo_ia") or chave
+        if nome not in gerados and chave not in gerados:
+            faltantes.append(nome)
+    return faltantes
@@ -0,0 +1,78 @@
+"""
+Sistema LIA - Cliente LLM Compartilhado
+=======================================
+Um único AsyncOpenAI por processo, apontando para o OpenRouter e
+reutilizando o pool HTTP "openrouter" (keep-alive, HTTP/2).
+
+Também mantém uma instância de cada classe de agente: os agentes são
+sem estado por requisição (o modelo é passado por chamada), então
+não há motivo para construí-los a cada mensagem.
+
+Uso:
+    from app.services.agents.llm_client import llm_clients, get_agent
+
+    client = llm_clients.get()
+    agent = get_agent(DFDChatAgent)
+    async for chunk in agent.chat(..., model="openai/gpt-oss-20b:free"):
+        ...
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+from typing import Dict, Optional, Type, TypeVar
+
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMClientManager:
+    """Mantém o AsyncOpenAI do processo sobre o pool HTTP compartilhado."""
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client = None
+
+    def get(self) -> AsyncOpenAI:
+        """
+        Retorna o cliente OpenRouter compartilhado.
+
+        Se o pool HTTP subjacente foi recriado (ex: após shutdown/startup
+        em testes), o AsyncOpenAI é reconstruído sobre o novo pool.
+        """
+        http_client = http_clients.get("openrouter")
+        if self._client is None or self._http_client is not http_client:
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENROUTER_API_KEY,
+                base_url=settings.OPENROUTER_BASE_URL,
+                timeout=settings.OPENROUTER_TIMEOUT,
+                http_client=http_client,
+            )
+            self._http_client = http_client
+            logger.info("[LLM] Cliente OpenRouter compartilhado criado")
+        return self._client
+
+
+# Instância global
+llm_clients = LLMClientManager()
+
+
+# ========== INSTÂNCIAS COMPARTILHADAS DE AGENTES ==========
+
+_AGENTES: Dict[type, object] = {}
+
+
+def get_agent(agent_class: Type[T]) -> T:
+    """Retorna a instância compartilhada (criada sob demanda) de um agente."""
+    agent = _AGENTES.get(agent_class)
+    if agent is None:
+        agent = agent_class()
+        _AGENTES[agent_class] = agent
+    return agent
@@ -0,0 +1,204 @@
+"""
+Sistema LIA - Escalonador de Chamadas ao LLM
+============================================
+Chat interativo e gerações de 8k tokens disputam a mesma cota do
+OpenRouter. O escalonador limita os streams simultâneos do worker ao
+provedor (LLM_SCHEDULER_MAX_CONCURRENT) e decide quem sai da espera.
+
+Classes de prioridade (prioridade estrita, nesta ordem):
+- "chat": turno de chat interativo;
+- "regeneracao": regeneração de um campo;
+- "geracao": geração completa do artefato;
+- "lote": gerações sem usuário esperando o stream (gerar_json).
+
+- LLM_SCHEDULER_RESERVED_INTERACTIVE vagas ficam reservadas ao chat: as
+  demais classes nunca ocupam todas as vagas, então um turno de chat não
+  espera o fim de uma geração longa.
+- Dentro de cada classe, fila justa ponderada por usuário (WFQ): cada
+  pedido recebe uma marca de término virtual = max(tempo virtual da
+  classe, término do último pedido do usuário) + custo / peso, e sai da
+  fila o de menor marca. O custo é o max_tokens da chamada: quem dispara
+  muitas gerações grandes não passa na frente de quem pediu uma.
+
+Uso (via llm_hedger.abrir, que segura a vaga até o stream fechar):
+    vaga = await llm_scheduler.reservar(CLASSE_CHAT, usuario_id, custo=max_tokens)
+    try:
+        ...
+    finally:
+        vaga.liberar()
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLASSE_CHAT = "chat"
+CLASSE_REGENERACAO = "regeneracao"
+CLASSE_GERACAO = "geracao"
+CLASSE_LOTE = "lote"
+
+# Da maior para a menor prioridade
+CLASSES = [CLASSE_CHAT, CLASSE_REGENERACAO, CLASSE_GERACAO, CLASSE_LOTE]
+
+
+@dataclass
+class VagaLLM:
+    """Vaga de uma chamada ao LLM; `liberar()` é idempotente."""
+    escalonador: "LLMScheduler"
+    classe: str
+    usuario_id: Optional[int]
+    custo: float
+    chegada: float = field(default_factory=time.monotonic)
+    inicio_virtual: float = 0.0
+    admitida: asyncio.Future = None
+    liberada: bool = False
+
+    def liberar(self) -> None:
+        if not self.liberada:
+            self.liberada = True
+            self.escalonador._liberar(self)
+
+
+class LLMScheduler:
+    """Vagas de chamada ao LLM com prioridade por classe e WFQ por usuário."""
+
+    def __init__(self):
+        self._ativos = 0
+        self._ativos_por_classe: Dict[str, int] = {c: 0 for c in CLASSES}
+        self._filas: Dict[str, List[Tuple[float, int, VagaLLM]]] = {c: [] for c in CLASSES}
+        self._tempo_virtual: Dict[str, float] = {c: 0.0 for c in CLASSES}
+        self._ultimo_fim: Dict[str, Dict[Optional[int], float]] = {c: {} for c in CLASSES}
+        self._seq = itertools.count()
+
+    def capacidade(self, classe: str) -> int:
+        """Máximo de chamadas ativas (de todas as classes) para admitir esta classe."""
+        maximo = settings.LLM_SCHEDULER_MAX_CONCURRENT
+        if classe == CLASSE_CHAT:
+            return maximo
+        return max(maximo - settings.LLM_SCHEDULER_RESERVED_INTERACTIVE, 1)
+
+    def _marca_termino(self, vaga: VagaLLM, peso: float) -> float:
+        fins = self._ultimo_fim[vaga.classe]
+        vaga.inicio_virtual = max(self._tempo_virtual[vaga.classe], fins.get(vaga.usuario_id, 0.0))
+        fim = vaga.inicio_virtual + vaga.custo / max(peso, 0.001)
+        fins[vaga.usuario_id] = fim
+        return fim
+
+    def _esquecer_usuarios_inativos(self, classe: str) -> None:
+        """Descarta marcas já ultrapassadas pelo tempo virtual (não influenciam mais)."""
+        fins = self._ultimo_fim[classe]
+        if len(fins) > 1000:
+            v = self._tempo_virtual[classe]
+            for usuario in [u for u, fim in fins.items() if fim <= v]:
+                del fins[usuario]
+
+    # ========== RESERVA ==========
+
+    async def reservar(
+        self,
+        classe: str,
+        usuario_id: Optional[int] = None,
+        custo: float = 1.0,
+        peso: float = 1.0,
+    ) -> VagaLLM:
+        """Aguarda a vez da chamada e retorna a vaga (liberar ao fechar o stream)."""
+        if classe not in self._filas:
+            raise ValueError(f"Classe de prioridade desconhecida: {classe}")
+        vaga = VagaLLM(self, classe, usuario_id, custo)
+        fim = self._marca_termino(vaga, peso)
+
+        if not self._ha_espera(classe) and self._ativos < self.capacidade(classe):
+            self._admitir(vaga)
+            return vaga
+
+        vaga.admitida = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._filas[classe], (fim, next(self._seq), vaga))
+        metrics.incr("llm.escalonador.espera", classe=classe)
+        try:
+            await vaga.admitida
+        except asyncio.CancelledError:
+            # O cancelamento da tarefa cancela o future antes deste bloco rodar;
+            # entre os dois, _despachar já o ignora (ver _esperando)
+            if not vaga.admitida.done():
+                vaga.admitida.cancel()
+            # Admitida no mesmo ciclo do cancelamento: _liberar devolve a vaga;
+            # senão só sai da fila (removida em _despachar)
+            vaga.liberar()
+            raise
+        metrics.observe("llm.escalonador.espera_ms", (time.monotonic() - vaga.chegada) * 1000, classe=classe)
+        return vaga
+
+    @staticmethod
+    def _esperando(vaga: VagaLLM) -> bool:
+        """Ainda na fila: nem liberada nem com o future resolvido (admitida ou cancelada)."""
+        return not vaga.liberada and not vaga.admitida.done()
+
+    def _ha_espera(self, classe: str) -> bool:
+        """Se há pedidos esperando nesta classe ou numa de prioridade maior."""
+        for c in CLASSES:
+            if any(self._esperando(r) for _, _, r in self._filas[c]):
+                return True
+            if c == classe:
+                return False
+        return False
+
+    def _admitir(self, vaga: VagaLLM) -> None:
+        self._ativos += 1
+        self._ativos_por_classe[vaga.classe] += 1
+        # Tempo virtual da classe avança até o início do pedido atendido
+        self._tempo_virtual[vaga.classe] = max(self._tempo_virtual[vaga.classe], vaga.inicio_virtual)
+        metrics.incr("llm.escalonador.admitido", classe=vaga.classe)
+
+    def _liberar(self, vaga: VagaLLM) -> None:
+        if vaga.admitida is None or (vaga.admitida.done() and not vaga.admitida.cancelled()):
+            self._ativos -= 1
+            self._ativos_por_classe[vaga.classe] -= 1
+            self._esquecer_usuarios_inativos(vaga.classe)
+        self._despachar()
+
+    def _despachar(self) -> None:
+        """Admite os próximos pedidos enquanto houver vaga, por prioridade."""
+        for classe in CLASSES:
+            fila = self._filas[classe]
+            while fila:
+                _, _, vaga = fila[0]
+                if not self._esperando(vaga):
+                    heapq.heappop(fila)  # cancelada enquanto esperava
+                    continue
+                if self._ativos >= self.capacidade(classe):
+                    # Prioridade estrita: classes menores também não passam
+                    return
+                heapq.heappop(fila)
+                self._admitir(vaga)
+                vaga.admitida.set_result(True)
+            # Fila desta classe vazia: tenta a próxima
+
+    def estado(self) -> Dict[str, Any]:
+        """Ocupação por classe (para /health/metrics)."""
+        return {
+            "ativos": self._ativos,
+            "maximo": settings.LLM_SCHEDULER_MAX_CONCURRENT,
+            "por_classe": {
+                c: {
+                    "ativos": self._ativos_por_classe[c],
+                    "fila": sum(1 for _, _, r in self._filas[c] if self._esperando(r)),
+                }
+                for c in CLASSES
+            },
+        }
+
+
+# Instância global
+llm_scheduler = LLMScheduler()
@@ -82,16 +82,28 @@ Vou te ajudar a identificar e planejar a gestao de riscos desta contratacao conf
 **Para comecar: quais areas mais te preocupam nesta contratacao?**
 (Ex: prazo de entrega, disponibilidade de fornecedores, complexidade tecnica, orcamento)"""
 
-    def build_chat_system_prompt(self, context: ChatContext) -> str:
-        """
-        Constroi o system prompt para o modo chat.
-        Inclui contexto do projeto, DFD e cotacoes aprovados.
-        """
+    def build_chat_prompt_estatico(self) -> str:
+        """Prompt do agente, checklist e instrucoes (prefixo estatico do chat)."""
         checklist = "\n".join([f"- {item}" for item in self.dados_necessarios])
 
-        base_prompt = f"""{self.system_prompt_chat}
+        return f"""{self.system_prompt_chat}
 
-CONTEXTO DO PROJETO:
+DADOS IMPORTANTES A COLETAR:
+{checklist}
+
+INSTRUCOES:
+1. Converse naturalmente para coletar as preocupacoes do usuario
+2. Use os dados do DFD e cotacoes que ja temos no contexto - NAO pergunte sobre eles!
+3. ASSIM QUE o usuario mencionar 1+ areas de preocupacao, IMEDIATAMENTE:
+   - Faca um resumo breve
+   - Adicione [GERAR_PGR] ao final da mensagem
+4. Se o usuario pedir "gerar", "criar", "fazer o PGR", adicione [GERAR_PGR] imediatamente
+5. NUNCA mencione JSON, schemas ou formatos tecnicos
+6. Seja conciso - 2-3 mensagens no maximo antes de mostrar [GERAR_PGR]"""
+
+    def build_chat_contexto_projeto(self, context: ChatContext) -> str:
+        """Contexto do projeto, DFD e cotacoes aprovados."""
+        base_prompt = f"""CONTEXTO DO PROJETO:
 - ID: {context.projeto_id}
 - Titulo: {context.projeto_titulo}
 - Setor: {context.setor_usuario}
@@ -136,21 +148,6 @@ DADOS DA PESQUISA DE PRECOS APROVADA:
             if context.dados_coletados.get('equipe_responsavel'):
                 base_prompt += f"\n- Equipe responsavel: {context.dados_coletados['equipe_responsavel']}"
 
-        base_prompt += f"""
-
-DADOS IMPORTANTES A COLETAR:
-{checklist}
-
-INSTRUCOES:
-1. Converse naturalmente para coletar as preocupacoes do usuario
-2. Use os dados do DFD e cotacoes que ja temos no contexto - NAO pergunte sobre eles!
-3. ASSIM QUE o usuario mencionar 1+ areas de preocupacao, IMEDIATAMENTE:
-   - Faca um resumo breve
-   - Adicione [GERAR_PGR] ao final da mensagem
-4. Se o usuario pedir "gerar", "criar", "fazer o PGR", adicione [GERAR_PGR] imediatamente
-5. NUNCA mencione JSON, schemas ou formatos tecnicos
-6. Seja conciso - 2-3 mensagens no maximo antes de mostrar [GERAR_PGR]"""
-
         return base_prompt
 
     def build_generate_prompt(self, context: ChatContext, conversa_resumo: str) -> str:
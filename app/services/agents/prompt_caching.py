@@ -0,0 +1,108 @@
+"""
+Sistema LIA - Cache de Prefixo de Prompt no Provedor
+====================================================
+Os provedores do OpenRouter reaproveitam o processamento de um prefixo
+de prompt idêntico ao de uma chamada recente (prompt caching), o que
+reduz o tempo até o primeiro token e o custo dos tokens de entrada.
+
+Para isso o prompt do chat é montado em duas partes:
+- prefixo estático: prompt do agente (banco), checklist, instruções e
+  skills ativas; idêntico entre os turnos de uma conversa;
+- cauda dinâmica: dados do projeto, anexos, trechos recuperados e resumo
+  da conversa; muda a cada turno e vem depois do prefixo.
+
+OpenAI, DeepSeek e afins fazem o cache do prefixo automaticamente.
+Anthropic e Gemini exigem um marcador cache_control no bloco a ser
+cacheado; ele é enviado apenas para os modelos em
+LLM_CACHE_CONTROL_MODELS.
+
+A taxa de acerto é medida pelos campos de uso devolvidos no último
+chunk do stream (usage.prompt_tokens_details.cached_tokens).
+
+Uso:
+    mensagem = mensagem_sistema(prefixo, cauda, modelo)
+    stream = await client.chat.completions.create(..., **opcoes_stream())
+    async for chunk in stream:
+        registrar_uso(chunk, modelo, "chat")
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def suporta_cache_control(modelo: str) -> bool:
+    """Se o modelo precisa do marcador cache_control explícito."""
+    prefixos = [p.strip() for p in settings.LLM_CACHE_CONTROL_MODELS.split(",") if p.strip()]
+    return any(modelo.startswith(p) for p in prefixos)
+
+
+def mensagem_sistema(prefixo: str, cauda: str, modelo: str) -> Dict[str, Any]:
+    """
+    Mensagem de sistema com o prefixo estático antes da cauda dinâmica.
+
+    Para modelos com cache_control, o prefixo vai num bloco de texto
+    próprio marcado como cacheável.
+    """
+    if not suporta_cache_control(modelo):
+        return {"role": "system", "content": prefixo + cauda}
+
+    partes = [{"type": "text", "text": prefixo, "cache_control": {"type": "ephemeral"}}]
+    if cauda:
+        partes.append({"type": "text", "text": cauda})
+    return {"role": "system", "content": partes}
+
+
+def opcoes_stream() -> Dict[str, Any]:
+    """Parâmetros extras do create() para o provedor devolver o uso no stream."""
+    return {"stream_options": {"include_usage": True}}
+
+
+def _cached_tokens(usage: Any) -> int:
+    detalhes = getattr(usage, "prompt_tokens_details", None)
+    if detalhes is None and getattr(usage, "model_extra", None):
+        detalhes = usage.model_extra.get("prompt_tokens_details")
+    if isinstance(detalhes, dict):
+        return detalhes.get("cached_tokens") or 0
+    return getattr(detalhes, "cached_tokens", 0) or 0
+
+
+def registrar_uso(chunk: Any, modelo: str, modo: str) -> Optional[float]:
+    """
+    Registra tokens de entrada e tokens servidos do cache do provedor.
+
+    Chamado para cada chunk do stream; só o chunk com `usage` (o último,
+    com include_usage) conta. Retorna a taxa de acerto do chunk de uso.
+    """
+    usage = getattr(chunk, "usage", None)
+    if not usage or not getattr(usage, "prompt_tokens", None):
+        return None
+
+    cached = _cached_tokens(usage)
+    taxa = cached / usage.prompt_tokens
+    metrics.incr("llm.prompt_tokens", usage.prompt_tokens, modo=modo)
+    metrics.incr("llm.prompt_tokens_cache", cached, modo=modo)
+    metrics.observe("llm.prompt_cache_taxa", taxa * 100, modo=modo)
+    logger.info(
+        f"[PromptCache] {modelo} ({modo}): {cached}/{usage.prompt_tokens} "
+        f"tokens de entrada do cache ({taxa:.0%})"
+    )
+    return taxa
+
+
+def taxa_acerto(modo: Optional[str] = None) -> Dict[str, float]:
+    """Taxa de acerto agregada do worker {modo: fração de tokens cacheados}."""
+    modos = [modo] if modo else ["chat", "gerar"]
+    taxas = {}
+    for m in modos:
+        total = metrics.contador("llm.prompt_tokens", modo=m)
+        if total:
+            taxas[m] = round(metrics.contador("llm.prompt_tokens_cache", modo=m) / total, 4)
+    return taxas
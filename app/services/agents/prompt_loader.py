@@ -1,10 +1,23 @@
 """
 Prompt Loader - Carrega templates de prompts do banco de dados
+
+Inclui o PromptCache: cache em memória por worker, aquecido no startup
+e invalidado entre workers via Redis pub/sub sempre que um template é
+criado, atualizado, versionado ou removido.
 """
-from typing import Optional
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.database import AsyncSessionLocal
 from app.models.prompt_template import PromptTemplate
+from app.services.metrics import metrics
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
 
 
 class PromptLoader:
@@ -91,8 +104,156 @@ class PromptLoader:
         return {p.prompt_type: p.conteudo for p in prompts}
 
 
-# Cache global de prompts (opcional - para evitar queries repetidas)
-_PROMPT_CACHE = {}
+# ========== CACHE DE PROMPTS ==========
+
+# Canal Redis usado para propagar invalidações entre workers
+CANAL_INVALIDACAO = "lia:prompt_templates:invalidar"
+
+# Marcador para prompts inexistentes (evita consultar o banco a cada chamada)
+_AUSENTE = object()
+
+
+class PromptCache:
+    """
+    Cache de prompts ativos chaveado por (agent_type, prompt_type).
+
+    - aquecer(): carrega todos os prompts ativos no startup (1 query)
+    - get()/get_multiple(): leitura em memória; miss consulta o banco
+    - invalidar(): limpa localmente e publica no Redis para os demais workers
+    - escutar(): task de background que aplica invalidações recebidas
+    """
+
+    def __init__(self):
+        self._dados: Dict[Tuple[str, str], object] = {}
+        self._origem = f"{os.getpid()}-{id(self)}"
+        self._listener: Optional[asyncio.Task] = None
+
+    async def aquecer(self) -> int:
+        """Carrega todos os prompts ativos. Retorna a quantidade carregada."""
+        async with AsyncSessionLocal() as session:
+            stmt = select(PromptTemplate).where(
+                PromptTemplate.ativa == True
+            ).order_by(
+                PromptTemplate.agent_type,
+                PromptTemplate.prompt_type,
+                PromptTemplate.ordem.asc()
+            )
+            result = await session.execute(stmt)
+            templates = result.scalars().all()
+
+        dados: Dict[Tuple[str, str], object] = {}
+        for t in templates:
+            # Mantém o de menor ordem para cada chave
+            dados.setdefault((t.agent_type, t.prompt_type), t.conteudo)
+        self._dados = dados
+        logger.info(f"[PromptCache] {len(dados)} prompt(s) carregado(s)")
+        return len(dados)
+
+    async def get(self, agent_type: str, prompt_type: str = "system") -> Optional[str]:
+        """Retorna o prompt ativo ou None se não existir."""
+        chave = (agent_type, prompt_type)
+        valor = self._dados.get(chave)
+        if valor is not None:
+            metrics.incr("prompt_cache.hit")
+            return None if valor is _AUSENTE else valor
+
+        metrics.incr("prompt_cache.miss")
+        async with AsyncSessionLocal() as session:
+            loader = PromptLoader(session)
+            conteudo = await loader.get_prompt(agent_type, prompt_type, default="")
+
+        self._dados[chave] = conteudo or _AUSENTE
+        return conteudo or None
+
+    async def get_multiple(self, agent_type: str, prompt_types: list[str]) -> dict[str, str]:
+        """Versão em lote de get(): {prompt_type: conteudo} só com os encontrados."""
+        prompts = {}
+        for prompt_type in prompt_types:
+            conteudo = await self.get(agent_type, prompt_type)
+            if conteudo is not None:
+                prompts[prompt_type] = conteudo
+        return prompts
+
+    def _limpar_local(self, agent_type: Optional[str] = None, prompt_type: Optional[str] = None) -> None:
+        if agent_type is None:
+            self._dados.clear()
+            return
+        for chave in list(self._dados):
+            if chave[0] == agent_type and (prompt_type is None or chave[1] == prompt_type):
+                self._dados.pop(chave, None)
+
+    async def invalidar(self, agent_type: Optional[str] = None, prompt_type: Optional[str] = None) -> None:
+        """
+        Invalida uma chave (ou tudo, sem argumentos) neste worker e
+        publica a invalidação para os demais.
+        """
+        self._limpar_local(agent_type, prompt_type)
+        metrics.incr("prompt_cache.invalidacao")
+
+        r = await get_redis()
+        if r is None:
+            return
+        try:
+            await r.publish(CANAL_INVALIDACAO, json.dumps({
+                "origem": self._origem,
+                "agent_type": agent_type,
+                "prompt_type": prompt_type,
+            }))
+        except Exception as e:
+            logger.warning(f"[PromptCache] Erro ao publicar invalidação: {e}")
+
+    async def escutar(self) -> None:
+        """Loop de assinatura do canal de invalidação (reconecta em caso de erro)."""
+        while True:
+            r = await get_redis()
+            if r is None:
+                await asyncio.sleep(5)
+                continue
+            pubsub = r.pubsub()
+            try:
+                await pubsub.subscribe(CANAL_INVALIDACAO)
+                # Mensagens perdidas durante a reconexão: recomeçar do zero
+                self._limpar_local()
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    try:
+                        dados = json.loads(msg["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if dados.get("origem") == self._origem:
+                        continue
+                    self._limpar_local(dados.get("agent_type"), dados.get("prompt_type"))
+                    logger.debug(f"[PromptCache] Invalidação recebida: {dados}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[PromptCache] Listener de invalidação caiu: {e}. Reconectando...")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def iniciar_listener(self) -> None:
+        """Inicia a task de escuta (chamado no startup)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.escutar())
+
+    async def parar_listener(self) -> None:
+        """Cancela a task de escuta (chamado no shutdown)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+
+
+# Instância global
+prompt_cache = PromptCache()
 
 
 async def load_prompt_cached(
@@ -105,29 +266,30 @@ async def load_prompt_cached(
     Versão com cache do carregamento de prompts.
     
     Args:
-        session: Sessão do banco
+        session: Sessão do banco (usada apenas quando use_cache=False)
         agent_type: Tipo do agente
         prompt_type: Tipo do prompt
         use_cache: Se deve usar cache (padrão True)
     
     Returns:
         Conteúdo do prompt
-    """
-    cache_key = f"{agent_type}:{prompt_type}"
-    
-    if use_cache and cache_key in _PROMPT_CACHE:
-        return _PROMPT_CACHE[cache_key]
     
-    loader = PromptLoader(session)
-    prompt = await loader.get_prompt(agent_type, prompt_type)
-    
-    if use_cache:
-        _PROMPT_CACHE[cache_key] = prompt
+    Raises:
+        ValueError: Se o prompt não existir
+    """
+    if not use_cache:
+        loader = PromptLoader(session)
+        return await loader.get_prompt(agent_type, prompt_type)
     
+    prompt = await prompt_cache.get(agent_type, prompt_type)
+    if prompt is None:
+        raise ValueError(
+            f"Prompt não encontrado: agent_type={agent_type}, "
+            f"prompt_type={prompt_type}. Verifique se a tabela foi populada."
+        )
     return prompt
 
 
 def clear_prompt_cache():
-    """Limpa o cache de prompts. Útil após atualizar prompts no banco."""
-    global _PROMPT_CACHE
-    _PROMPT_CACHE.clear()
+    """Limpa o cache local de prompts. Para invalidar todos os workers use prompt_cache.invalidar()."""
+    prompt_cache._limpar_local()
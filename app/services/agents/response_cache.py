@@ -0,0 +1,181 @@
+"""
+Sistema LIA - Cache de Respostas do LLM
+=======================================
+Reaproveita a resposta de uma chamada idêntica ao LLM (mesmo modelo,
+mensagens, temperatura e max_tokens), comum em regeneração de campo e
+gerar_json: clique duplo, nova tentativa após erro na interface, mesma
+combinação de skills.
+
+- Opt-in por chamada: só os métodos que passam pelo cache (via
+  `responder`) são afetados, e LLM_RESPONSE_CACHE_ENABLED desliga tudo.
+- Chamadas com temperatura acima de LLM_RESPONSE_CACHE_MAX_TEMPERATURE
+  não são cacheadas (a variação é intencional), salvo `forcar=True`.
+- Respostas ficam no Redis (TTL LLM_RESPONSE_CACHE_TTL_SECONDS, ou o
+  `ttl` da chamada); com o Redis fora do ar, numa LRU em memória do
+  worker, com a mesma validade. A regeneração de campo usa uma janela
+  curta (LLM_RESPONSE_CACHE_REGEN_TTL_SECONDS): só deduplica clique
+  duplo e reenvio, sem prender o usuário à mesma versão. Respostas maiores que
+  LLM_RESPONSE_CACHE_MAX_BYTES não são guardadas.
+- Um acerto é devolvido como stream (em blocos), para que os clientes
+  SSE se comportem como numa chamada real.
+- Só respostas completas entram no cache (erro ou cancelamento no meio
+  do stream descartam o parcial).
+
+Uso:
+    async for trecho in response_cache.responder(
+        modelo, messages, temperature, max_tokens,
+        lambda: self._stream(...),
+    ):
+        yield trecho
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "lia:llm_resposta"
+
+# Respostas mantidas na LRU em memória (fallback sem Redis)
+MAX_RESPOSTAS_EM_CACHE = 128
+
+# Tamanho (caracteres) de cada chunk no replay de uma resposta em cache
+BLOCO_REPLAY = 64
+
+
+def chave_resposta(modelo: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int) -> str:
+    """Hash estável de (modelo, mensagens, temperatura, max_tokens)."""
+    conteudo = json.dumps(
+        {"modelo": modelo, "messages": messages, "temperature": round(temperature, 4), "max_tokens": max_tokens},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Respostas completas do LLM por hash da requisição."""
+
+    def __init__(self):
+        # chave -> (expira em, monotonic; resposta)
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def cacheavel(temperature: float, forcar: bool = False) -> bool:
+        if not settings.LLM_RESPONSE_CACHE_ENABLED:
+            return False
+        return forcar or temperature <= settings.LLM_RESPONSE_CACHE_MAX_TEMPERATURE
+
+    # ========== ARMAZENAMENTO ==========
+
+    def _guardar_local(self, chave: str, resposta: str, ttl: int) -> None:
+        self._local[chave] = (time.monotonic() + ttl, resposta)
+        self._local.move_to_end(chave)
+        while len(self._local) > MAX_RESPOSTAS_EM_CACHE:
+            self._local.popitem(last=False)
+
+    def _buscar_local(self, chave: str) -> Optional[str]:
+        item = self._local.get(chave)
+        if item is None:
+            return None
+        expira, resposta = item
+        if expira <= time.monotonic():
+            del self._local[chave]
+            return None
+        self._local.move_to_end(chave)
+        return resposta
+
+    async def buscar(self, chave: str) -> Optional[str]:
+        r = await get_redis()
+        if r is None:
+            return self._buscar_local(chave)
+        try:
+            return await r.get(f"{PREFIXO_REDIS}:{chave}")
+        except Exception as e:
+            logger.warning(f"[CacheLLM] Erro ao ler Redis: {e}")
+            marcar_falha()
+            return self._buscar_local(chave)
+
+    async def gravar(self, chave: str, resposta: str, ttl: Optional[int] = None) -> bool:
+        if not resposta or len(resposta.encode("utf-8")) > settings.LLM_RESPONSE_CACHE_MAX_BYTES:
+            metrics.incr("llm.cache_resposta", resultado="grande_demais" if resposta else "vazia")
+            return False
+        ttl = ttl or settings.LLM_RESPONSE_CACHE_TTL_SECONDS
+        r = await get_redis()
+        if r is None:
+            self._guardar_local(chave, resposta, ttl)
+            return True
+        try:
+            await r.set(f"{PREFIXO_REDIS}:{chave}", resposta, ex=ttl)
+        except Exception as e:
+            logger.warning(f"[CacheLLM] Erro ao gravar Redis: {e}")
+            marcar_falha()
+            self._guardar_local(chave, resposta, ttl)
+        return True
+
+    # ========== STREAM ==========
+
+    @staticmethod
+    async def _replay(resposta: str) -> AsyncIterator[str]:
+        for i in range(0, len(resposta), BLOCO_REPLAY):
+            yield resposta[i:i + BLOCO_REPLAY]
+            await asyncio.sleep(0)
+
+    async def responder(
+        self,
+        modelo: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        gerar: Callable[[], AsyncIterator[str]],
+        forcar: bool = False,
+        ttl: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream da resposta: replay do cache ou `gerar()` (gravado ao final,
+        válido por `ttl` segundos; padrão LLM_RESPONSE_CACHE_TTL_SECONDS).
+        """
+        if not self.cacheavel(temperature, forcar):
+            metrics.incr("llm.cache_resposta", resultado="ignorado")
+            async for trecho in gerar():
+                yield trecho
+            return
+
+        chave = chave_resposta(modelo, messages, temperature, max_tokens)
+        resposta = await self.buscar(chave)
+        if resposta is not None:
+            metrics.incr("llm.cache_resposta", resultado="hit")
+            logger.info(f"[CacheLLM] Resposta em cache para {modelo} ({len(resposta)} chars)")
+            async for trecho in self._replay(resposta):
+                yield trecho
+            return
+
+        metrics.incr("llm.cache_resposta", resultado="miss")
+        partes = []
+        async for trecho in gerar():
+            partes.append(trecho)
+            yield trecho
+        # Só chega aqui se o stream terminou sem erro nem cancelamento
+        await self.gravar(chave, "".join(partes), ttl)
+
+    def taxa_acerto(self) -> Optional[float]:
+        """Fração de acertos entre as chamadas elegíveis ao cache neste worker."""
+        hits = metrics.contador("llm.cache_resposta", resultado="hit")
+        total = hits + metrics.contador("llm.cache_resposta", resultado="miss")
+        return round(hits / total, 4) if total else None
+
+
+# Instância global
+response_cache = LLMResponseCache()
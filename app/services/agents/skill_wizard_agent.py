@@ -15,6 +15,7 @@ from typing import AsyncGenerator, List, Optional, Dict, Any
 from openai import AsyncOpenAI
 
 from app.config import settings
+from .llm_client import llm_clients
 
 logger = logging.getLogger(__name__)
 
@@ -55,22 +56,24 @@ REGRAS:
 
 
 class SkillWizardAgent:
-    """Agente para criacao guiada de skills via chat."""
+    """Agente para criacao guiada de skills via chat (instancia reutilizavel)."""
 
     def __init__(self, model_override: Optional[str] = None):
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENROUTER_API_KEY,
-            base_url=settings.OPENROUTER_BASE_URL,
-            timeout=settings.OPENROUTER_TIMEOUT,
-        )
         self.model = model_override or settings.OPENROUTER_DEFAULT_MODEL
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Cliente OpenRouter compartilhado pelo processo."""
+        return llm_clients.get()
+
     async def chat(
         self,
         message: str,
         history: List[Dict[str, str]],
+        model: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         """Processa mensagem do usuario e retorna resposta em streaming."""
+        modelo = model or self.model
         messages = [
             {"role": "system", "content": SKILL_WIZARD_SYSTEM_PROMPT}
         ]
@@ -80,20 +83,21 @@ class SkillWizardAgent:
 
         messages.append({"role": "user", "content": message})
 
-        logger.info(f"[SkillWizard] Chat com {len(messages)} mensagens, model={self.model}")
+        logger.info(f"[SkillWizard] Chat com {len(messages)} mensagens, model={modelo}")
 
         try:
             stream = await self.client.chat.completions.create(
-                model=self.model,
+                model=modelo,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=1024,
                 stream=True,
             )
 
-            async for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
 
         except Exception as e:
             logger.error(f"[SkillWizard] Erro no chat: {e}")
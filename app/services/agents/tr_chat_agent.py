@@ -63,12 +63,21 @@ class TRChatAgent(ConversationalAgent):
         "criterios_aceitacao",
     ]
 
+    # Geração em seções paralelas (ver ConversationalAgent.secoes_geracao)
+    secoes_geracao = [
+        ["definicao_objeto", "justificativa"],
+        ["especificacao_tecnica"],
+        ["obrigacoes"],
+    ]
+    # Aceitação e pagamento se referem à especificação e às obrigações
+    campos_consistencia = ["criterios_aceitacao"]
+
     def __init__(self, model_override: Optional[str] = None, active_skills_instr: str = ""):
         super().__init__(model_override=model_override)
         self.active_skills_instr = active_skills_instr
 
-    def build_chat_system_prompt(self, context: ChatContext) -> str:
-        base_prompt = super().build_chat_system_prompt(context)
+    def build_chat_prompt_estatico(self) -> str:
+        base_prompt = super().build_chat_prompt_estatico()
         if self.active_skills_instr:
             base_prompt += f"\n\n{self.active_skills_instr}"
         return base_prompt
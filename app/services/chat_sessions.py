@@ -0,0 +1,208 @@
+"""
+Sistema LIA - Sessões de Chat no Servidor
+=========================================
+Guarda o histórico das conversas do chat de artefatos no servidor, para
+que o navegador envie apenas a nova mensagem e o session_id em vez de
+reenviar o histórico inteiro (com anexos) a cada turno.
+
+Armazenamento:
+- Redis (cópia de trabalho): JSON em lia:sessao:<id>, expira após
+  CHAT_SESSION_TTL_SECONDS sem uso.
+- Banco (sessoes_chat, cópia durável): gravado a cada alteração; lido
+  quando a chave do Redis expirou ou o Redis está fora do ar.
+
+Cada mensagem guarda a contagem de tokens estimada no momento em que
+entrou na sessão, evitando reestimar o histórico inteiro a cada turno.
+Como o histórico no servidor é estável, os resumos de conversa
+(conversation_summary, cacheados por hash do prefixo) são reaproveitados
+entre os turnos.
+
+Uso:
+    sessao = await chat_sessions.criar(projeto_id, "dfd", usuario_id)
+    sessao = await chat_sessions.obter(session_id, projeto_id, "dfd", usuario_id)
+    historico = sessao.historico()
+    await chat_sessions.acrescentar(sessao, [("user", msg), ("assistant", resposta)])
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import json
+import logging
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.sessao_chat import SessaoChat
+from app.schemas.ia_schemas import Message
+from .agents.context_budget import estimar_tokens
+from .metrics import metrics
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "lia:sessao"
+
+
+@dataclass
+class EstadoSessao:
+    """Conteúdo de uma sessão de chat."""
+    id: str
+    projeto_id: int
+    tipo_artefato: str
+    usuario_id: int
+    mensagens: List[Dict[str, Any]] = field(default_factory=list)
+    attachments: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return sum(m.get("tokens", 0) for m in self.mensagens)
+
+    def historico(self) -> List[Message]:
+        """Mensagens no formato usado pelos agentes (tokens em metadata)."""
+        return [
+            Message(role=m["role"], content=m["content"], metadata={"tokens": m.get("tokens")})
+            for m in self.mensagens
+        ]
+
+
+class ChatSessionStore:
+    """Sessões de chat no Redis, com cópia durável no banco."""
+
+    @staticmethod
+    def _chave(session_id: str) -> str:
+        return f"{PREFIXO_REDIS}:{session_id}"
+
+    @staticmethod
+    def _mensagem(role: str, content: str) -> Dict[str, Any]:
+        return {"role": role, "content": content, "tokens": estimar_tokens(content)}
+
+    # ========== REDIS ==========
+
+    async def _ler_redis(self, session_id: str) -> Optional[EstadoSessao]:
+        r = await get_redis()
+        if r is None:
+            return None
+        try:
+            dados = await r.get(self._chave(session_id))
+        except Exception as e:
+            logger.warning(f"[Sessão {session_id[:8]}] Erro ao ler Redis: {e}")
+            marcar_falha()
+            return None
+        return EstadoSessao(**json.loads(dados)) if dados else None
+
+    async def _gravar_redis(self, sessao: EstadoSessao) -> None:
+        r = await get_redis()
+        if r is None:
+            return
+        try:
+            await r.set(
+                self._chave(sessao.id),
+                json.dumps(asdict(sessao), ensure_ascii=False),
+                ex=settings.CHAT_SESSION_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"[Sessão {sessao.id[:8]}] Erro ao gravar Redis: {e}")
+            marcar_falha()
+
+    # ========== BANCO ==========
+
+    async def _ler_banco(self, session_id: str) -> Optional[EstadoSessao]:
+        async with AsyncSessionLocal() as db:
+            registro = await db.get(SessaoChat, session_id)
+            if registro is None:
+                return None
+            return EstadoSessao(
+                id=registro.id,
+                projeto_id=registro.projeto_id,
+                tipo_artefato=registro.tipo_artefato,
+                usuario_id=registro.usuario_id,
+                mensagens=list(registro.mensagens or []),
+                attachments=list(registro.attachments or []),
+            )
+
+    async def _gravar_banco(self, sessao: EstadoSessao) -> None:
+        async with AsyncSessionLocal() as db:
+            registro = await db.get(SessaoChat, sessao.id)
+            if registro is None:
+                registro = SessaoChat(
+                    id=sessao.id,
+                    projeto_id=sessao.projeto_id,
+                    tipo_artefato=sessao.tipo_artefato,
+                    usuario_id=sessao.usuario_id,
+                )
+                db.add(registro)
+            registro.mensagens = list(sessao.mensagens)
+            registro.attachments = list(sessao.attachments)
+            await db.commit()
+
+    async def _gravar(self, sessao: EstadoSessao) -> None:
+        await self._gravar_redis(sessao)
+        await self._gravar_banco(sessao)
+
+    # ========== API ==========
+
+    async def criar(
+        self,
+        projeto_id: int,
+        tipo_artefato: str,
+        usuario_id: int,
+        mensagens: Optional[List[Tuple[str, str]]] = None,
+    ) -> EstadoSessao:
+        """Nova sessão, opcionalmente já com mensagens (ex: boas-vindas)."""
+        sessao = EstadoSessao(
+            id=uuid.uuid4().hex,
+            projeto_id=projeto_id,
+            tipo_artefato=tipo_artefato,
+            usuario_id=usuario_id,
+            mensagens=[self._mensagem(role, content) for role, content in (mensagens or [])],
+        )
+        await self._gravar(sessao)
+        metrics.incr("chat.sessoes_criadas", tipo=tipo_artefato)
+        return sessao
+
+    async def obter(
+        self,
+        session_id: str,
+        projeto_id: int,
+        tipo_artefato: str,
+        usuario_id: int,
+    ) -> Optional[EstadoSessao]:
+        """
+        Sessão do usuário para o projeto/artefato, ou None.
+
+        Sessões de outro usuário, projeto ou tipo de artefato são tratadas
+        como inexistentes.
+        """
+        sessao = await self._ler_redis(session_id)
+        if sessao is None:
+            sessao = await self._ler_banco(session_id)
+            if sessao is not None:
+                metrics.incr("chat.sessao_leitura", origem="banco")
+                await self._gravar_redis(sessao)
+        else:
+            metrics.incr("chat.sessao_leitura", origem="redis")
+
+        if sessao is None or (sessao.projeto_id, sessao.tipo_artefato, sessao.usuario_id) != (
+            projeto_id, tipo_artefato, usuario_id
+        ):
+            return None
+        return sessao
+
+    async def acrescentar(
+        self,
+        sessao: EstadoSessao,
+        mensagens: List[Tuple[str, str]],
+        attachments: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Acrescenta mensagens (e atualiza os anexos, se informados) e grava."""
+        sessao.mensagens.extend(self._mensagem(role, content) for role, content in mensagens)
+        if attachments is not None:
+            sessao.attachments = list(attachments)
+        await self._gravar(sessao)
+
+
+# Instância global
+chat_sessions = ChatSessionStore()
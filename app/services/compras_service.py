@@ -14,13 +14,13 @@ from app.schemas.compras import (
     DetalheItemPNCP
 )
 from .estatisticas_precos import calcular_estatisticas, detectar_outliers_iqr, calcular_percentil
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://dadosabertos.compras.gov.br"
 
-# Timeout configuração (aumentado para APIs lentas)
-TIMEOUT_CONFIG = httpx.Timeout(300.0, connect=30.0, read=300.0)
+# Timeouts e limites do pool ficam em http_clients (upstream "compras_gov")
 
 
 class ComprasGovService:
@@ -28,18 +28,14 @@ class ComprasGovService:
     
     def __init__(self):
         self.base_url = BASE_URL
-        self.client = None
     
     async def _get_client(self) -> httpx.AsyncClient:
-        """Retorna um cliente HTTP assíncrono"""
-        if self.client is None or self.client.is_closed:
-            self.client = httpx.AsyncClient(timeout=TIMEOUT_CONFIG)
-        return self.client
+        """Retorna o cliente HTTP compartilhado do pool 'compras_gov'"""
+        return http_clients.get("compras_gov")
     
     async def close(self):
-        """Fecha o cliente HTTP"""
-        if self.client and not self.client.is_closed:
-            await self.client.aclose()
+        """Mantido por compatibilidade: o pool é fechado no shutdown da aplicação"""
+        return None
     
     async def _fazer_requisicao(
         self, 
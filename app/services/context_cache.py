@@ -0,0 +1,238 @@
+"""
+Sistema LIA - Cache do Contexto de Chat por Projeto
+===================================================
+Guarda o ChatContext montado por construir_contexto_chat (projeto, itens
+do PAC e artefatos aprovados) por (projeto_id, context_deps),
+para que cada mensagem, geração e regeneração não repita as consultas.
+
+Invalidação (write-through):
+- Eventos do SQLAlchemy observam as gravações de Projeto, artefatos
+  (ArtefatoBase) e PAC em qualquer router. No commit, o projeto
+  afetado (ou tudo, para PAC e UPDATE/DELETE em massa) é removido do
+  cache deste worker.
+- A invalidação é publicada no Redis (pub/sub) para os demais workers,
+  no mesmo esquema do PromptCache.
+- CONTEXT_CACHE_TTL_SECONDS limita a idade de qualquer snapshot, como
+  rede de segurança para gravações feitas fora do ORM.
+
+As skills dependem do usuário e não fazem parte do snapshot: são
+resolvidas a cada chamada por services/skill_resolver.
+
+Uso:
+    contexto = await context_cache.obter(projeto_id, deps, carregar)
+    # carregar: corrotina sem argumentos que monta o ChatContext do banco
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import replace
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.artefatos.base import ArtefatoBase
+from app.models.pac import PAC
+from app.models.projeto import Projeto
+from .agents.conversational_agent import ChatContext
+from .metrics import metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Canal Redis usado para propagar invalidações entre workers
+CANAL_INVALIDACAO = "lia:contexto_chat:invalidar"
+
+# Alvo de invalidação que limpa todos os projetos
+TODOS = "*"
+
+# Chave em Session.info com os alvos acumulados até o commit
+_INFO_ALVOS = "lia_contexto_invalidar"
+
+Chave = Tuple[int, Tuple[str, ...]]
+
+
+def _alvo(obj: Any) -> Optional[Any]:
+    """Projeto afetado por uma gravação do ORM (TODOS, projeto_id ou None)."""
+    if isinstance(obj, Projeto):
+        return obj.id
+    if isinstance(obj, PAC):
+        return TODOS
+    if isinstance(obj, ArtefatoBase):
+        return getattr(obj, "projeto_id", None)
+    return None
+
+
+class ContextSnapshotCache:
+    """Snapshots de ChatContext por (projeto_id, context_deps)."""
+
+    def __init__(self):
+        self._dados: Dict[Chave, Tuple[float, ChatContext]] = {}
+        self._geracao = 0  # Incrementada a cada invalidação (descarta cargas concorrentes)
+        self._origem = f"{os.getpid()}-{id(self)}"
+        self._listener: Optional[asyncio.Task] = None
+        self._tarefas: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def chave(projeto_id: int, context_deps: Iterable[str]) -> Chave:
+        return projeto_id, tuple(sorted(set(context_deps)))
+
+    @staticmethod
+    def _copia(contexto: ChatContext) -> ChatContext:
+        # Chamadores alteram dados_coletados/attachments/documentos por requisição
+        return replace(
+            contexto,
+            itens_pac=list(contexto.itens_pac),
+            dados_coletados=dict(contexto.dados_coletados),
+            attachments=list(contexto.attachments),
+            documentos=list(contexto.documentos),
+        )
+
+    async def obter(
+        self,
+        projeto_id: int,
+        context_deps: Iterable[str],
+        carregar: Callable[[], Awaitable[ChatContext]],
+    ) -> ChatContext:
+        """Snapshot em cache ou carregado por `carregar()` (cópia por chamada)."""
+        chave = self.chave(projeto_id, context_deps)
+        item = self._dados.get(chave)
+        if item is not None and time.monotonic() - item[0] < settings.CONTEXT_CACHE_TTL_SECONDS:
+            metrics.incr("contexto_chat.hit")
+            return self._copia(item[1])
+
+        metrics.incr("contexto_chat.miss")
+        geracao = self._geracao
+        contexto = await carregar()
+        if geracao == self._geracao:
+            self._dados[chave] = (time.monotonic(), contexto)
+        return self._copia(contexto)
+
+    # ========== INVALIDAÇÃO ==========
+
+    def _limpar_local(self, alvos: Iterable[Any]) -> None:
+        self._geracao += 1
+        alvos = set(alvos)
+        if TODOS in alvos:
+            self._dados.clear()
+            return
+        for chave in [c for c in self._dados if c[0] in alvos]:
+            del self._dados[chave]
+
+    def invalidar(self, alvos: Iterable[Any]) -> None:
+        """
+        Remove os projetos (ou TODOS) do cache deste worker e agenda a
+        publicação da invalidação para os demais.
+        """
+        alvos = sorted({a for a in alvos if a is not None}, key=str)
+        if not alvos:
+            return
+        self._limpar_local(alvos)
+        metrics.incr("contexto_chat.invalidacao")
+        try:
+            tarefa = asyncio.get_running_loop().create_task(self._publicar(alvos))
+        except RuntimeError:
+            return  # Fora de um event loop (scripts): nada a propagar
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _publicar(self, alvos: list) -> None:
+        r = await get_redis()
+        if r is None:
+            return
+        try:
+            await r.publish(CANAL_INVALIDACAO, json.dumps({"origem": self._origem, "alvos": alvos}))
+        except Exception as e:
+            logger.warning(f"[ContextoChat] Erro ao publicar invalidação: {e}")
+
+    async def escutar(self) -> None:
+        """Loop de assinatura do canal de invalidação (reconecta em caso de erro)."""
+        while True:
+            r = await get_redis()
+            if r is None:
+                await asyncio.sleep(5)
+                continue
+            pubsub = r.pubsub()
+            try:
+                await pubsub.subscribe(CANAL_INVALIDACAO)
+                # Mensagens perdidas durante a reconexão: recomeçar do zero
+                self._limpar_local([TODOS])
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    try:
+                        dados = json.loads(msg["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if dados.get("origem") != self._origem:
+                        self._limpar_local(dados.get("alvos") or [TODOS])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[ContextoChat] Listener de invalidação caiu: {e}. Reconectando...")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def iniciar_listener(self) -> None:
+        """Inicia a task de escuta (chamado no startup)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.escutar())
+
+    async def parar_listener(self) -> None:
+        """Cancela a task de escuta (chamado no shutdown)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+
+
+# Instância global
+context_cache = ContextSnapshotCache()
+
+
+# ========== EVENTOS DO ORM ==========
+
+@event.listens_for(Session, "after_flush")
+def _coletar_alvos(session: Session, _flush_context) -> None:
+    alvos = session.info.setdefault(_INFO_ALVOS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        alvo = _alvo(obj)
+        if alvo is not None:
+            alvos.add(alvo)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_em_massa(execucao) -> None:
+    # UPDATE/DELETE em massa não passam pelo flush: sem saber o projeto, limpa tudo
+    if not (execucao.is_update or execucao.is_delete) or execucao.bind_mapper is None:
+        return
+    classe = execucao.bind_mapper.class_
+    if issubclass(classe, (Projeto, PAC, ArtefatoBase)):
+        execucao.session.info.setdefault(_INFO_ALVOS, set()).add(TODOS)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_invalidacao(session: Session) -> None:
+    alvos = session.info.pop(_INFO_ALVOS, None)
+    if alvos:
+        context_cache.invalidar(alvos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_alvos(session: Session) -> None:
+    session.info.pop(_INFO_ALVOS, None)
@@ -0,0 +1,368 @@
+"""
+Sistema LIA - Buffer de Gerações Retomáveis
+===========================================
+Mantém os eventos SSE de uma geração de artefato no servidor, indexados
+por um generation_id, para que o navegador possa reconectar (header
+Last-Event-ID) e continuar de onde parou sem refazer a chamada ao LLM.
+
+O produtor (stream do LLM) roda numa task própria, desacoplada da
+resposta HTTP: se a conexão cair, a geração continua sendo gravada no
+buffer. Se nenhum leitor (local ou em outro worker) voltar em até
+GENERATION_ORPHAN_GRACE_SECONDS, o stream do LLM é cancelado para não
+consumir tokens à toa.
+
+Armazenamento:
+- Memória do worker (sempre): leitores no mesmo worker leem daqui.
+- Redis Stream (espelho, best-effort): permite retomar em outro worker.
+  Cada evento é gravado com o id explícito "<event_id>-0", de modo que
+  XREAD a partir de "<Last-Event-ID>-0" devolve exatamente o restante.
+
+Ambos expiram após GENERATION_BUFFER_TTL_SECONDS sem novos eventos: a
+cópia local de uma geração concluída é removida por um timer, mesmo que
+o worker não receba novas gerações. Se o espelho for desligado no meio
+(falha no Redis), o stream recebe um marcador de fim incompleto (ou é
+apagado), para que leitores em outros workers não fiquem esperando até
+o TTL.
+
+Uso:
+    gen_id = generation_buffer.criar(usuario_id=user.id)
+    generation_buffer.iniciar(gen_id, produtor_sse())
+    return StreamingResponse(generation_buffer.ler(gen_id, apos=0))
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from .metrics import metrics
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "lia:geracao"
+
+# Intervalo de comentários SSE de keep-alive enquanto o LLM não produz eventos
+KEEPALIVE_SECONDS = 15
+
+
+@dataclass
+class _Geracao:
+    """Estado local de uma geração."""
+    usuario_id: Optional[int]
+    eventos: List[Tuple[int, str]] = field(default_factory=list)
+    concluida: bool = False
+    atualizada_em: float = field(default_factory=time.monotonic)
+    novo_evento: asyncio.Event = field(default_factory=asyncio.Event)
+    espelhar: bool = True  # Desligado após falha no Redis
+    espelhados: int = 0  # Eventos já gravados no Redis Stream
+    leitores: int = 0
+    tarefa: Optional[asyncio.Task] = None
+
+
+def separar_eventos(texto: str) -> List[Tuple[Optional[int], str]]:
+    """
+    Divide um texto SSE em eventos individuais, extraindo a linha 'id:'.
+
+    Um único yield do produtor pode conter mais de um evento (ex: delta +
+    checkpoint); cada um precisa ser gravado com seu próprio id.
+    """
+    eventos = []
+    for bloco in texto.split("\n\n"):
+        if not bloco.strip():
+            continue
+        event_id = None
+        for linha in bloco.split("\n"):
+            if linha.startswith("id:"):
+                try:
+                    event_id = int(linha[3:].strip())
+                except ValueError:
+                    pass
+                break
+        eventos.append((event_id, bloco + "\n\n"))
+    return eventos
+
+
+class GenerationBuffer:
+    """Buffer de eventos de gerações em andamento/recentes."""
+
+    def __init__(self):
+        self._local: Dict[str, _Geracao] = {}
+        self._tarefas: Set[asyncio.Task] = set()
+
+    @property
+    def ttl(self) -> int:
+        return settings.GENERATION_BUFFER_TTL_SECONDS
+
+    @staticmethod
+    def _chave(gen_id: str) -> str:
+        return f"{PREFIXO_REDIS}:{gen_id}"
+
+    def _limpar_expiradas(self) -> None:
+        agora = time.monotonic()
+        expiradas = [
+            gen_id for gen_id, g in self._local.items()
+            if agora - g.atualizada_em > self.ttl
+        ]
+        for gen_id in expiradas:
+            del self._local[gen_id]
+
+    # ========== PRODUÇÃO ==========
+
+    def criar(self, usuario_id: Optional[int] = None) -> str:
+        """Registra uma nova geração e retorna seu id."""
+        self._limpar_expiradas()
+        gen_id = uuid.uuid4().hex
+        self._local[gen_id] = _Geracao(usuario_id=usuario_id)
+        return gen_id
+
+    def iniciar(self, gen_id: str, produtor: AsyncIterator[str]) -> asyncio.Task:
+        """
+        Consome o produtor SSE numa task independente da requisição.
+
+        A task continua mesmo que nenhum cliente esteja lendo.
+        """
+        tarefa = asyncio.create_task(self._consumir(gen_id, produtor))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+        g = self._local.get(gen_id)
+        if g is not None:
+            g.tarefa = tarefa
+        return tarefa
+
+    async def _consumir(self, gen_id: str, produtor: AsyncIterator[str]) -> None:
+        try:
+            async for texto in produtor:
+                for event_id, frame in separar_eventos(texto):
+                    await self.publicar(gen_id, event_id, frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[Geração {gen_id[:8]}] Produtor falhou: {e}")
+        finally:
+            await self.concluir(gen_id)
+
+    async def publicar(self, gen_id: str, event_id: Optional[int], frame: str) -> None:
+        """Acrescenta um evento ao buffer e acorda os leitores."""
+        g = self._local.get(gen_id)
+        if g is None:
+            return
+        if event_id is None:
+            # Eventos sem id (não deveriam ocorrer em v2) herdam o último id
+            event_id = g.eventos[-1][0] if g.eventos else 0
+        g.eventos.append((event_id, frame))
+        self._notificar(g)
+
+        if g.espelhar:
+            await self._espelhar(gen_id, g, {"frame": frame}, f"{event_id}-0")
+
+    async def concluir(self, gen_id: str) -> None:
+        """Marca a geração como terminada (leitores encerram após o último evento)."""
+        g = self._local.get(gen_id)
+        if g is None or g.concluida:
+            return
+        g.concluida = True
+        self._notificar(g)
+        if g.espelhar:
+            await self._espelhar(gen_id, g, {"fim": "1"}, "*")
+        # A cópia local fica disponível para retomada até o TTL e então sai da memória
+        asyncio.get_running_loop().call_later(self.ttl, self._expirar, gen_id)
+
+    def _expirar(self, gen_id: str) -> None:
+        g = self._local.get(gen_id)
+        if g is None:
+            return
+        restante = self.ttl - (time.monotonic() - g.atualizada_em)
+        if restante > 0:
+            asyncio.get_running_loop().call_later(restante, self._expirar, gen_id)
+        else:
+            del self._local[gen_id]
+
+    @staticmethod
+    def _notificar(g: _Geracao) -> None:
+        g.atualizada_em = time.monotonic()
+        evento, g.novo_evento = g.novo_evento, asyncio.Event()
+        evento.set()
+
+    async def _espelhar(self, gen_id: str, g: _Geracao, campos: Dict[str, str], stream_id: str) -> None:
+        r = await get_redis()
+        if r is None:
+            g.espelhar = False
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            if not g.eventos[:-1] and "frame" in campos:
+                # Primeiro evento: registra o dono para checagem na retomada
+                pipe.hset(f"{self._chave(gen_id)}:meta", mapping={"usuario_id": g.usuario_id or ""})
+                pipe.expire(f"{self._chave(gen_id)}:meta", self.ttl)
+            pipe.xadd(self._chave(gen_id), campos, id=stream_id)
+            pipe.expire(self._chave(gen_id), self.ttl)
+            await pipe.execute()
+            g.espelhados += 1
+        except Exception as e:
+            logger.warning(f"[Geração {gen_id[:8]}] Espelho Redis desativado: {e}")
+            g.espelhar = False
+            marcar_falha()
+            if g.espelhados:
+                await self._encerrar_espelho(gen_id, r)
+
+    async def _encerrar_espelho(self, gen_id: str, r) -> None:
+        """
+        Espelho desligado no meio da geração: fecha o stream com um fim
+        incompleto (ou o apaga) para o leitor de outro worker não esperar
+        até o TTL por eventos que não virão.
+        """
+        try:
+            await r.xadd(self._chave(gen_id), {"fim": "1", "incompleto": "1"}, id="*")
+            return
+        except Exception:
+            pass
+        try:
+            await r.delete(self._chave(gen_id))
+        except Exception as e:
+            logger.warning(f"[Geração {gen_id[:8]}] Não foi possível encerrar o espelho: {e}")
+
+    # ========== LEITORES ==========
+
+    def _agendar_verificacao_orfa(self, gen_id: str) -> None:
+        tarefa = asyncio.create_task(self._cancelar_se_orfa(gen_id))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _cancelar_se_orfa(self, gen_id: str) -> None:
+        """Após o período de graça, cancela o produtor se ninguém voltou a ler."""
+        await asyncio.sleep(settings.GENERATION_ORPHAN_GRACE_SECONDS)
+        g = self._local.get(gen_id)
+        if g is None or g.concluida or g.leitores > 0:
+            return
+        if await self._leitor_remoto(gen_id):
+            # Há leitor em outro worker; verificar de novo mais tarde
+            self._agendar_verificacao_orfa(gen_id)
+            return
+        if g.tarefa is not None and not g.tarefa.done():
+            g.tarefa.cancel()
+            metrics.incr("llm.stream_cancelado", origem="geracao", motivo="sem_leitor")
+            logger.info(f"[Geração {gen_id[:8]}] Sem leitores; stream do LLM cancelado")
+
+    async def _leitor_remoto(self, gen_id: str) -> bool:
+        r = await get_redis()
+        if r is None:
+            return False
+        try:
+            return bool(await r.exists(f"{self._chave(gen_id)}:leitor"))
+        except Exception:
+            marcar_falha()
+            return False
+
+    # ========== LEITURA ==========
+
+    async def dono(self, gen_id: str) -> Tuple[bool, Optional[int]]:
+        """Retorna (existe, usuario_id) da geração, local ou no Redis."""
+        g = self._local.get(gen_id)
+        if g is not None:
+            return True, g.usuario_id
+
+        r = await get_redis()
+        if r is None:
+            return False, None
+        try:
+            meta = await r.hgetall(f"{self._chave(gen_id)}:meta")
+        except Exception as e:
+            logger.warning(f"[Geração {gen_id[:8]}] Erro ao consultar Redis: {e}")
+            marcar_falha()
+            return False, None
+        if not meta:
+            return False, None
+        usuario_id = meta.get("usuario_id")
+        return True, int(usuario_id) if usuario_id else None
+
+    async def ler(self, gen_id: str, apos: int = 0) -> AsyncIterator[str]:
+        """Entrega os eventos com id > apos e segue acompanhando até o fim."""
+        if apos:
+            metrics.incr("geracao.retomadas")
+
+        if gen_id in self._local:
+            async for frame in self._ler_local(gen_id, apos):
+                yield frame
+        else:
+            async for frame in self._ler_redis(gen_id, apos):
+                yield frame
+
+    async def _ler_local(self, gen_id: str, apos: int) -> AsyncIterator[str]:
+        g = self._local[gen_id]
+        i = 0
+        while i < len(g.eventos) and g.eventos[i][0] <= apos:
+            i += 1
+
+        g.leitores += 1
+        try:
+            while True:
+                while i < len(g.eventos):
+                    yield g.eventos[i][1]
+                    i += 1
+                if g.concluida:
+                    return
+                aguardando = g.novo_evento
+                try:
+                    await asyncio.wait_for(aguardando.wait(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            g.leitores -= 1
+            if g.leitores == 0 and not g.concluida:
+                self._agendar_verificacao_orfa(gen_id)
+
+    async def _ler_redis(self, gen_id: str, apos: int) -> AsyncIterator[str]:
+        r = await get_redis()
+        if r is None:
+            return
+        chave = self._chave(gen_id)
+        ultimo = f"{apos}-0"
+        while True:
+            try:
+                # Sinaliza ao worker produtor que ainda há quem leia esta geração
+                await r.set(f"{chave}:leitor", "1", ex=settings.GENERATION_ORPHAN_GRACE_SECONDS)
+                resposta = await r.xread({chave: ultimo}, block=KEEPALIVE_SECONDS * 1000, count=200)
+            except Exception as e:
+                logger.warning(f"[Geração {gen_id[:8]}] Erro ao ler Redis: {e}")
+                marcar_falha()
+                return
+
+            if not resposta:
+                if not await r.exists(chave):
+                    return
+                yield ": keep-alive\n\n"
+                continue
+
+            for _chave, entradas in resposta:
+                for stream_id, campos in entradas:
+                    ultimo = stream_id
+                    if campos.get("fim"):
+                        if campos.get("incompleto"):
+                            # O worker produtor perdeu o Redis: o restante não está aqui
+                            yield "data: " + json.dumps({
+                                "type": "error",
+                                "error": "Não foi possível retomar a geração neste servidor",
+                            }) + "\n\n"
+                        return
+                    yield campos["frame"]
+
+    # ========== SHUTDOWN ==========
+
+    async def encerrar(self) -> None:
+        """Cancela as gerações em andamento (chamado no shutdown)."""
+        for tarefa in list(self._tarefas):
+            tarefa.cancel()
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+
+# Instância global
+generation_buffer = GenerationBuffer()
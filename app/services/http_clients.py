@@ -0,0 +1,185 @@
+"""
+Sistema LIA - Registro de Clientes HTTP
+=======================================
+Mantém um httpx.AsyncClient por upstream (Compras.gov, OpenRouter,
+Google News), criado no startup da aplicação e fechado no shutdown.
+
+Cada upstream tem seu próprio pool de conexões com limites explícitos,
+keep-alive e HTTP/2 (quando o pacote h2 está instalado), evitando um
+novo handshake TLS a cada requisição.
+
+Uso:
+    from app.services.http_clients import http_clients
+
+    client = http_clients.get("openrouter")
+    resp = await client.get("/models")
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 depende do pacote opcional h2 (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass
+class UpstreamConfig:
+    """Configuração de pool para um upstream."""
+    base_url: str
+    timeout: httpx.Timeout
+    max_connections: int
+    max_keepalive: int
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _upstreams_padrao() -> Dict[str, UpstreamConfig]:
+    """Upstreams conhecidos pelo sistema."""
+    return {
+        "compras_gov": UpstreamConfig(
+            base_url="https://dadosabertos.compras.gov.br",
+            # Timeout aumentado para APIs lentas
+            timeout=httpx.Timeout(300.0, connect=30.0, read=300.0),
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive=settings.HTTP_POOL_MAX_KEEPALIVE,
+        ),
+        "openrouter": UpstreamConfig(
+            base_url=settings.OPENROUTER_BASE_URL,
+            timeout=httpx.Timeout(float(settings.OPENROUTER_TIMEOUT), connect=10.0),
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS_LLM,
+            max_keepalive=settings.HTTP_POOL_MAX_KEEPALIVE_LLM,
+            headers={
+                "HTTP-Referer": "https://lia.tre-go.jus.br",
+                "X-Title": "LIA TRE-GO",
+            },
+        ),
+        "google_news": UpstreamConfig(
+            base_url="https://news.google.com",
+            timeout=httpx.Timeout(5.0),
+            max_connections=4,
+            max_keepalive=2,
+        ),
+    }
+
+
+async def _on_request(request: httpx.Request) -> None:
+    """Marca o início da requisição para cálculo de latência."""
+    request.extensions["lia_inicio"] = time.perf_counter()
+
+
+def _hooks(nome: str) -> Dict[str, list]:
+    """Event hooks que alimentam as métricas do pool."""
+
+    async def _on_response(response: httpx.Response) -> None:
+        inicio = response.request.extensions.get("lia_inicio")
+        metrics.incr("http.requisicoes", upstream=nome, status=f"{response.status_code // 100}xx")
+        if inicio is not None:
+            metrics.observe("http.latencia_ms", (time.perf_counter() - inicio) * 1000, upstream=nome)
+
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+class HTTPClientRegistry:
+    """Registro de clientes HTTP compartilhados, um por upstream."""
+
+    def __init__(self, upstreams: Optional[Dict[str, UpstreamConfig]] = None):
+        self._upstreams = upstreams
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    @property
+    def upstreams(self) -> Dict[str, UpstreamConfig]:
+        # Lazy: settings podem ser ajustadas antes do primeiro uso
+        if self._upstreams is None:
+            self._upstreams = _upstreams_padrao()
+        return self._upstreams
+
+    def _criar(self, nome: str) -> httpx.AsyncClient:
+        cfg = self.upstreams[nome]
+        http2 = settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+        client = httpx.AsyncClient(
+            base_url=cfg.base_url,
+            timeout=cfg.timeout,
+            headers=cfg.headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=cfg.max_connections,
+                max_keepalive_connections=cfg.max_keepalive,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks=_hooks(nome),
+        )
+        logger.info(
+            f"[HTTP] Pool '{nome}' criado (http2={http2}, "
+            f"max={cfg.max_connections}, keepalive={cfg.max_keepalive})"
+        )
+        return client
+
+    def get(self, nome: str) -> httpx.AsyncClient:
+        """
+        Retorna o cliente do upstream, criando-o se necessário.
+
+        Fora do lifespan (scripts, testes) o cliente é criado sob demanda.
+        """
+        if nome not in self.upstreams:
+            raise KeyError(f"Upstream HTTP desconhecido: {nome}")
+
+        client = self._clients.get(nome)
+        if client is None or client.is_closed:
+            client = self._criar(nome)
+            self._clients[nome] = client
+        return client
+
+    async def start(self) -> None:
+        """Cria todos os pools (chamado no startup)."""
+        if settings.HTTP2_ENABLED and not HTTP2_AVAILABLE:
+            logger.warning("[HTTP] HTTP/2 habilitado mas pacote 'h2' não instalado; usando HTTP/1.1")
+        for nome in self.upstreams:
+            self.get(nome)
+
+    async def close(self) -> None:
+        """Fecha todos os pools (chamado no shutdown)."""
+        for nome, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"[HTTP] Erro ao fechar pool '{nome}': {e}")
+        self._clients.clear()
+
+    def metricas(self) -> Dict[str, Any]:
+        """Estado dos pools: conexões abertas/ociosas e limites configurados."""
+        resultado = {}
+        for nome, cfg in self.upstreams.items():
+            client = self._clients.get(nome)
+            info: Dict[str, Any] = {
+                "ativo": bool(client and not client.is_closed),
+                "max_connections": cfg.max_connections,
+                "max_keepalive": cfg.max_keepalive,
+            }
+            # httpcore não expõe o pool publicamente; leitura defensiva
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            conexoes = getattr(pool, "connections", None)
+            if conexoes is not None:
+                info["conexoes"] = len(conexoes)
+                info["ociosas"] = sum(1 for c in conexoes if c.is_idle())
+                info["http2"] = sum(1 for c in conexoes if "HTTP/2" in repr(c))
+            resultado[nome] = info
+        return resultado
+
+
+# Instância global
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,160 @@
+"""
+Sistema LIA - Base de Conhecimento do Projeto
+=============================================
+Persistência e recuperação dos documentos anexados ao chat de um projeto.
+
+O texto de cada arquivo é extraído uma única vez no upload, fatiado e
+gravado em documentos_conhecimento. As requisições de chat passam apenas
+o file_id; o agente recebe os documentos já fatiados e inclui no prompt
+somente os trechos mais relevantes (BM25) para a mensagem ou artefato.
+
+Documentos são imutáveis após o upload, então o índice BM25 de cada um
+fica em cache em memória por file_id.
+
+Uso:
+    from app.services.knowledge_base import salvar_documento, carregar_documentos, documento_index
+
+    doc = await salvar_documento(db, file_id=..., projeto_id=..., filename=..., texto=...)
+    documentos = await carregar_documentos(db, projeto_id, ["<file_id>", ...])
+    trechos = documento_index.buscar(documentos[0], "prazo de entrega", k=5)
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.documento_conhecimento import DocumentoConhecimento
+from .retrieval import BM25Index, MAX_INDICES_EM_CACHE, fatiar_textos_base
+
+logger = logging.getLogger(__name__)
+
+
+def fatiar_documento(filename: str, texto: Optional[str]) -> List[Dict[str, Any]]:
+    """Trechos de um documento, no mesmo formato dos textos_base das skills."""
+    return fatiar_textos_base([{"titulo": filename, "conteudo": texto or ""}])
+
+
+def documento_para_contexto(doc: DocumentoConhecimento) -> Dict[str, Any]:
+    """Formato usado em ChatContext.documentos."""
+    return {
+        "file_id": doc.file_id,
+        "filename": doc.filename,
+        "chunks": doc.chunks or [],
+    }
+
+
+async def salvar_documento(
+    db: AsyncSession,
+    *,
+    file_id: str,
+    projeto_id: int,
+    filename: str,
+    texto: Optional[str],
+    usuario_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+    tamanho: int = 0,
+    sha256: Optional[str] = None,
+) -> DocumentoConhecimento:
+    """Fatia e grava o texto extraído de um upload na base do projeto."""
+    doc = DocumentoConhecimento(
+        file_id=file_id,
+        projeto_id=projeto_id,
+        usuario_id=usuario_id,
+        filename=filename,
+        content_type=content_type,
+        tamanho=tamanho,
+        sha256=sha256,
+        texto=texto,
+        chunks=fatiar_documento(filename, texto),
+    )
+    db.add(doc)
+    await db.commit()
+    await db.refresh(doc)
+    logger.info(
+        f"[Base Conhecimento] Documento {file_id[:8]} ({filename}) salvo no projeto "
+        f"{projeto_id}: {len(doc.chunks)} trechos"
+    )
+    return doc
+
+
+async def listar_documentos(db: AsyncSession, projeto_id: int) -> List[DocumentoConhecimento]:
+    """Documentos do projeto, mais recentes primeiro."""
+    stmt = (
+        select(DocumentoConhecimento)
+        .where(DocumentoConhecimento.projeto_id == projeto_id)
+        .order_by(DocumentoConhecimento.data_criacao.desc())
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def carregar_documentos(
+    db: AsyncSession,
+    projeto_id: int,
+    file_ids: List[str],
+) -> List[Dict[str, Any]]:
+    """
+    Documentos do projeto referenciados pelos file_ids, prontos para o agente.
+
+    file_ids de outros projetos ou inexistentes são ignorados. A ordem
+    segue a lista recebida.
+    """
+    if not file_ids:
+        return []
+    stmt = select(DocumentoConhecimento).where(
+        DocumentoConhecimento.projeto_id == projeto_id,
+        DocumentoConhecimento.file_id.in_(file_ids),
+    )
+    result = await db.execute(stmt)
+    por_id = {doc.file_id: doc for doc in result.scalars().all()}
+
+    ignorados = [f for f in file_ids if f not in por_id]
+    if ignorados:
+        logger.warning(f"[Base Conhecimento] file_ids não encontrados no projeto {projeto_id}: {ignorados}")
+    return [documento_para_contexto(por_id[f]) for f in dict.fromkeys(file_ids) if f in por_id]
+
+
+async def remover_documento(db: AsyncSession, doc: DocumentoConhecimento) -> None:
+    documento_index.invalidar(doc.file_id)
+    await db.delete(doc)
+    await db.commit()
+
+
+class DocumentKnowledgeIndex:
+    """Cache de índices BM25 por documento (file_id)."""
+
+    def __init__(self, max_indices: int = MAX_INDICES_EM_CACHE):
+        self._indices: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._max = max_indices
+
+    def _indice(self, documento: Dict[str, Any]) -> BM25Index:
+        file_id = documento["file_id"]
+        indice = self._indices.get(file_id)
+        if indice is not None:
+            self._indices.move_to_end(file_id)
+            return indice
+
+        indice = BM25Index(documento.get("chunks") or [])
+        self._indices[file_id] = indice
+        while len(self._indices) > self._max:
+            self._indices.popitem(last=False)
+        return indice
+
+    def buscar(self, documento: Dict[str, Any], consulta: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k trechos do documento para a consulta."""
+        if not documento.get("chunks"):
+            return []
+        return self._indice(documento).buscar(consulta, k)
+
+    def invalidar(self, file_id: str) -> None:
+        self._indices.pop(file_id, None)
+
+
+# Instância global
+documento_index = DocumentKnowledgeIndex()
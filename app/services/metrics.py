@@ -0,0 +1,101 @@
+"""
+Sistema LIA - Métricas em Processo
+==================================
+Contadores e amostras de latência mantidos em memória por worker.
+
+Não substitui um sistema de observabilidade completo (Prometheus, etc.),
+mas permite expor números básicos em /health/metrics sem dependências
+extras.
+
+Uso:
+    from app.services.metrics import metrics
+
+    metrics.incr("llm.stream.cancelado", tipo="dfd")
+    metrics.observe("http.latencia_ms", 123.4, upstream="openrouter")
+    snapshot = metrics.snapshot()
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Tuple
+
+
+# Quantidade de amostras mantidas por série de latência
+MAX_AMOSTRAS = 500
+
+
+def _chave(nome: str, labels: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Gera chave estável para (nome, labels)."""
+    return nome, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _formatar(chave: Tuple[str, Tuple[Tuple[str, str], ...]]) -> str:
+    """Formata a chave no estilo nome{label=valor}."""
+    nome, labels = chave
+    if not labels:
+        return nome
+    return f"{nome}{{{','.join(f'{k}={v}' for k, v in labels)}}}"
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil simples (nearest-rank) de uma sequência de números."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    idx = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return float(ordenados[idx])
+
+
+class Metrics:
+    """Registro thread-safe de contadores e amostras."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple, float] = defaultdict(float)
+        self._amostras: Dict[Tuple, Deque[float]] = defaultdict(lambda: deque(maxlen=MAX_AMOSTRAS))
+
+    def incr(self, nome: str, valor: float = 1, **labels) -> None:
+        """Incrementa um contador."""
+        with self._lock:
+            self._contadores[_chave(nome, labels)] += valor
+
+    def observe(self, nome: str, valor: float, **labels) -> None:
+        """Registra uma amostra (ex: latência em ms)."""
+        with self._lock:
+            self._amostras[_chave(nome, labels)].append(float(valor))
+
+    def contador(self, nome: str, **labels) -> float:
+        """Retorna o valor atual de um contador."""
+        with self._lock:
+            return self._contadores.get(_chave(nome, labels), 0)
+
+    def amostras(self, nome: str, **labels) -> list:
+        """Retorna cópia das amostras de uma série."""
+        with self._lock:
+            return list(self._amostras.get(_chave(nome, labels), ()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna todos os contadores e resumos (p50/p95) das amostras."""
+        with self._lock:
+            contadores = {_formatar(k): v for k, v in self._contadores.items()}
+            series = {k: list(v) for k, v in self._amostras.items()}
+
+        resumos = {}
+        for chave, valores in series.items():
+            if not valores:
+                continue
+            resumos[_formatar(chave)] = {
+                "n": len(valores),
+                "p50": round(percentil(valores, 50), 2),
+                "p95": round(percentil(valores, 95), 2),
+                "max": round(max(valores), 2),
+            }
+
+        return {"contadores": contadores, "latencias": resumos}
+
+
+# Instância global
+metrics = Metrics()
@@ -0,0 +1,285 @@
+"""
+Sistema LIA - Catálogo de Modelos (Cache em Segundo Plano)
+==========================================================
+Disponibilidade dos modelos exibida no dashboard e na página de
+configurações, atualizada em segundo plano em vez de a cada requisição.
+
+- A cada MODEL_CATALOG_REFRESH_SECONDS, um worker (lock no Redis) lê o
+  catálogo /models do OpenRouter e o status de cada modelo de
+  MODELOS_CONFIGURACAO; o resultado vai para o Redis, compartilhado
+  pelos workers. Sem Redis, cada worker mantém o seu em memória.
+- Com a sonda de model_health ativa, o status vem das medições dela
+  (sem um segundo ping); senão, de um ping mínimo em cada modelo. O
+  ping mede a ida e volta completa, não o TTFT: não alimenta model_health.
+- As leituras usam a cópia local do worker, renovada a partir do Redis
+  no máximo a cada MODEL_CATALOG_LOCAL_SECONDS.
+- Cada seção (lista de modelos online, status de cada modelo) tem um
+  ETag derivado do conteúdo, para respostas condicionais (304).
+
+Uso:
+    snapshot = await model_catalog.obter()
+    snapshot["online"], snapshot["etags"]["online"]
+    status = await model_catalog.status(modelo)
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import AVAILABLE_MODELS, settings
+from .http_clients import http_clients
+from .metrics import metrics
+from .model_health import model_health
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+CHAVE_REDIS = "lia:modelos:catalogo"
+CHAVE_LOCK = "lia:modelos:catalogo:lock"
+
+# Modelos exibidos (e pingados) nas páginas de configurações e artefatos
+MODELOS_CONFIGURACAO = [m["id"] for m in AVAILABLE_MODELS]
+
+# Mantido como online se o catálogo não puder ser lido (não quebra a UI)
+MODELO_FALLBACK = "arcee-ai/trinity-mini:free"
+
+
+def calcular_etag(conteudo: Any) -> str:
+    """ETag forte (entre aspas) do conteúdo serializado em JSON."""
+    serializado = json.dumps(conteudo, ensure_ascii=False, sort_keys=True)
+    return '"' + hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+async def buscar_modelos_online() -> List[str]:
+    """IDs dos modelos listados no catálogo /models do OpenRouter."""
+    client = http_clients.get("openrouter")
+    headers = {"Authorization": f"Bearer {settings.OPENROUTER_API_KEY}"}
+    resp = await client.get("/models", headers=headers, timeout=10.0)
+    resp.raise_for_status()
+    return sorted({m.get("id") for m in resp.json().get("data", []) if m.get("id")})
+
+
+async def pingar_modelo(modelo: str) -> Dict[str, Any]:
+    """
+    Envia uma mensagem mínima ao modelo e classifica a resposta.
+
+    Retorna:
+    - status: 'online', 'rate_limited', 'offline', 'error'
+    - tempo_ms: tempo de resposta em milissegundos
+    - mensagem: descrição do status
+    """
+    inicio = time.time()
+    try:
+        client = http_clients.get("openrouter")
+        headers = {"Authorization": f"Bearer {settings.OPENROUTER_API_KEY}"}
+        payload = {
+            "model": modelo,
+            "messages": [{"role": "user", "content": "ping"}],
+            "max_tokens": 1,
+            "temperature": 0
+        }
+        resp = await client.post("/chat/completions", headers=headers, json=payload, timeout=15.0)
+        tempo_ms = int((time.time() - inicio) * 1000)
+
+        if resp.status_code == 200:
+            return {"status": "online", "tempo_ms": tempo_ms, "mensagem": f"Respondeu em {tempo_ms}ms"}
+
+        if resp.status_code == 429:
+            return {"status": "rate_limited", "tempo_ms": tempo_ms, "mensagem": "Rate limit atingido"}
+        if resp.status_code == 503:
+            return {"status": "offline", "tempo_ms": tempo_ms, "mensagem": "Modelo indisponível"}
+        detalhe = ""
+        try:
+            detalhe = resp.json().get("error", {}).get("message", "")
+        except Exception:
+            pass
+        return {
+            "status": "error",
+            "tempo_ms": tempo_ms,
+            "mensagem": f"Erro {resp.status_code}: {detalhe[:50]}" if detalhe else f"Erro HTTP {resp.status_code}"
+        }
+
+    except httpx.TimeoutException:
+        return {"status": "offline", "tempo_ms": int((time.time() - inicio) * 1000), "mensagem": "Timeout (15s)"}
+    except Exception as e:
+        logger.error(f"Erro ao pingar modelo {modelo}: {e}")
+        return {"status": "error", "tempo_ms": int((time.time() - inicio) * 1000), "mensagem": f"Erro: {str(e)[:30]}"}
+
+
+def status_da_saude(modelo: str) -> Optional[Dict[str, Any]]:
+    """Status do modelo a partir do último resultado da sonda de model_health."""
+    ultimo = model_health.ultimo_resultado(modelo)
+    if ultimo is None:
+        return None
+    erro = ultimo["erro"]
+    if erro is None:
+        tempo_ms = int(ultimo["ttft_ms"] or 0)
+        return {"status": "online", "tempo_ms": tempo_ms, "mensagem": f"Primeiro token em {tempo_ms}ms"}
+    if erro == "429":
+        return {"status": "rate_limited", "tempo_ms": 0, "mensagem": "Rate limit atingido"}
+    if erro == "503" or "Timeout" in erro:
+        return {"status": "offline", "tempo_ms": 0, "mensagem": "Modelo indisponível"}
+    return {"status": "error", "tempo_ms": 0, "mensagem": f"Erro: {erro[:30]}"}
+
+
+class ModelCatalog:
+    """Snapshot compartilhado de modelos online e status de ping."""
+
+    def __init__(self):
+        self._local: Optional[Dict[str, Any]] = None
+        self._lido_em: float = 0.0
+        self._lock = asyncio.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+
+    # ========== LEITURA ==========
+
+    async def _ler_redis(self) -> Optional[Dict[str, Any]]:
+        r = await get_redis()
+        if r is None:
+            return None
+        try:
+            dados = await r.get(CHAVE_REDIS)
+        except Exception as e:
+            logger.warning(f"[Catalogo] Erro ao ler Redis: {e}")
+            marcar_falha()
+            return None
+        return json.loads(dados) if dados else None
+
+    async def obter(self) -> Dict[str, Any]:
+        """
+        Snapshot {online, status, etags, atualizado_em}.
+
+        Sem snapshot algum (logo após o boot), lê só a lista de modelos
+        online; os status chegam na primeira atualização em segundo plano.
+        """
+        if self._local is not None and time.monotonic() - self._lido_em < settings.MODEL_CATALOG_LOCAL_SECONDS:
+            return self._local
+
+        snapshot = await self._ler_redis()
+        if snapshot is not None:
+            self._guardar_local(snapshot)
+            return snapshot
+        if self._local is not None:
+            return self._local
+
+        async with self._lock:
+            if self._local is None:
+                metrics.incr("catalogo_modelos.leitura", resultado="frio")
+                self._guardar_local(self._montar(await self._online_ou_fallback(), {}))
+        return self._local
+
+    async def status(self, modelo: str) -> Optional[Dict[str, Any]]:
+        """Último status de ping do modelo (None se não é pingado em segundo plano)."""
+        return (await self.obter())["status"].get(modelo)
+
+    def _guardar_local(self, snapshot: Dict[str, Any]) -> None:
+        self._local = snapshot
+        self._lido_em = time.monotonic()
+
+    # ========== ATUALIZAÇÃO ==========
+
+    @staticmethod
+    async def _online_ou_fallback() -> List[str]:
+        try:
+            return await buscar_modelos_online()
+        except Exception as e:
+            logger.warning(f"Erro ao verificar status dos modelos: {e}")
+            return [MODELO_FALLBACK]
+
+    @staticmethod
+    def _montar(online: List[str], status: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "online": online,
+            "status": status,
+            "etags": {
+                "online": calcular_etag(online),
+                "status": {modelo: calcular_etag(s) for modelo, s in status.items()},
+            },
+            "atualizado_em": datetime.utcnow().isoformat(),
+        }
+
+    async def _status_todos(self) -> Dict[str, Dict[str, Any]]:
+        if model_health.ativo:
+            # A sonda já mede os modelos: sem um segundo ping
+            status = {m: status_da_saude(m) for m in MODELOS_CONFIGURACAO}
+            return {m: s for m, s in status.items() if s is not None}
+
+        limite = asyncio.Semaphore(settings.MODEL_CATALOG_PING_CONCURRENCY)
+
+        async def pingar(modelo: str) -> Dict[str, Any]:
+            async with limite:
+                return await pingar_modelo(modelo)
+
+        resultados = await asyncio.gather(*(pingar(m) for m in MODELOS_CONFIGURACAO))
+        return dict(zip(MODELOS_CONFIGURACAO, resultados))
+
+    async def atualizar(self) -> bool:
+        """
+        Atualiza o snapshot, se este worker obtiver o lock do ciclo.
+
+        Retorna False quando outro worker já está atualizando (este só
+        relê o Redis na próxima leitura).
+        """
+        r = await get_redis()
+        if r is not None:
+            try:
+                obtido = await r.set(CHAVE_LOCK, "1", nx=True, ex=max(settings.MODEL_CATALOG_REFRESH_SECONDS - 5, 30))
+            except Exception as e:
+                logger.warning(f"[Catalogo] Erro ao obter lock no Redis: {e}")
+                marcar_falha()
+                obtido, r = True, None
+            if not obtido:
+                return False
+
+        inicio = time.perf_counter()
+        online, status = await asyncio.gather(self._online_ou_fallback(), self._status_todos())
+        snapshot = self._montar(online, status)
+        self._guardar_local(snapshot)
+        if r is not None:
+            try:
+                await r.set(
+                    CHAVE_REDIS,
+                    json.dumps(snapshot, ensure_ascii=False),
+                    ex=settings.MODEL_CATALOG_REFRESH_SECONDS * 3,
+                )
+            except Exception as e:
+                logger.warning(f"[Catalogo] Erro ao gravar Redis: {e}")
+                marcar_falha()
+
+        metrics.observe("catalogo_modelos.atualizacao_ms", (time.perf_counter() - inicio) * 1000)
+        online_count = sum(1 for s in status.values() if s["status"] == "online")
+        logger.info(f"[Catalogo] Atualizado: {online_count}/{len(status)} modelos respondendo")
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.atualizar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Catalogo] Falha na atualização: {e}")
+            await asyncio.sleep(settings.MODEL_CATALOG_REFRESH_SECONDS)
+
+    def iniciar(self) -> None:
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+# Instância global
+model_catalog = ModelCatalog()
@@ -0,0 +1,394 @@
+"""
+Sistema LIA - Saúde e Roteamento de Modelos
+===========================================
+Mede continuamente os modelos de AVAILABLE_MODELS e escolhe o modelo
+das chamadas em que o usuário não definiu um.
+
+Medições (janela móvel de MODEL_HEALTH_WINDOW amostras por modelo):
+- TTFT (tempo até o primeiro token), tokens/s e taxa de erro;
+- alimentadas por uma sonda periódica em segundo plano (requisição
+  mínima em streaming a cada MODEL_HEALTH_INTERVAL_SECONDS) e pelo
+  tráfego real dos agentes (ver agents/hedging);
+- a sonda só roda com roteamento (MODEL_ROUTING_POLICY) ou hedge
+  (LLM_HEDGING_ENABLED) ligados, passa pelo llm_scheduler (classe
+  "lote") e, a cada ciclo, um único worker (lock no Redis) sonda e
+  publica os resultados, que os demais workers aplicam;
+- o preço por token vem do catálogo /models do OpenRouter (na falta
+  dele, do tier em AVAILABLE_MODELS).
+
+Políticas de roteamento (MODEL_ROUTING_POLICY):
+- "" (padrão): sem roteamento, vale OPENROUTER_DEFAULT_MODEL;
+- "fastest_healthy": modelo saudável com menor TTFT p90;
+- "cheapest_under_slo": modelo saudável mais barato com TTFT p90 até
+  MODEL_ROUTING_SLO_TTFT_MS (sem nenhum dentro do SLO, o mais rápido).
+
+Um modelo é saudável com ao menos MODEL_HEALTH_MIN_SAMPLES resultados
+e taxa de erro até MODEL_HEALTH_MAX_ERROR_RATE.
+
+Uso:
+    modelo = model_health.escolher()   # None = usar o padrão
+    model_health.registrar(modelo, ttft_ms=850)
+    model_health.registrar(modelo, erro="429")
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import AVAILABLE_MODELS, settings
+from .http_clients import http_clients
+from .metrics import metrics, percentil
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+CHAVE_REDIS = "lia:modelos:saude"
+CHAVE_LOCK = "lia:modelos:saude:lock"
+
+POLITICA_MAIS_RAPIDO = "fastest_healthy"
+POLITICA_MAIS_BARATO_SLO = "cheapest_under_slo"
+
+# Custo relativo por tier quando o preço do catálogo não está disponível
+CUSTO_POR_TIER = {"free": 0.0, "standard": 1.0, "premium": 10.0}
+
+PROMPT_SONDA = "Responda apenas: ok"
+
+
+def _janela() -> Deque:
+    return deque(maxlen=settings.MODEL_HEALTH_WINDOW)
+
+
+@dataclass
+class EstadoModelo:
+    """Janelas móveis de medições de um modelo."""
+    ttft_ms: Deque[float] = field(default_factory=_janela)
+    tokens_por_s: Deque[float] = field(default_factory=_janela)
+    resultados: Deque[bool] = field(default_factory=_janela)  # True = sucesso
+    ultimo_erro: Optional[str] = None
+    preco: Optional[float] = None  # USD por token (prompt + completion)
+    atualizado_em: float = 0.0
+
+    @property
+    def taxa_erro(self) -> float:
+        if not self.resultados:
+            return 0.0
+        return 1 - sum(self.resultados) / len(self.resultados)
+
+
+class ModelHealthMonitor:
+    """Saúde dos modelos (TTFT, tokens/s, erros) e política de roteamento."""
+
+    def __init__(self):
+        self._estados: Dict[str, EstadoModelo] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+        self._ultimo_ciclo: Optional[str] = None
+
+    def _estado(self, modelo: str) -> EstadoModelo:
+        estado = self._estados.get(modelo)
+        if estado is None:
+            estado = self._estados[modelo] = EstadoModelo()
+        return estado
+
+    @staticmethod
+    def modelos() -> List[str]:
+        return [m["id"] for m in AVAILABLE_MODELS]
+
+    # ========== MEDIÇÕES ==========
+
+    def registrar(
+        self,
+        modelo: str,
+        ttft_ms: Optional[float] = None,
+        tokens_por_s: Optional[float] = None,
+        erro: Optional[str] = None,
+    ) -> None:
+        """Registra o resultado de uma chamada (sonda ou tráfego real)."""
+        estado = self._estado(modelo)
+        estado.resultados.append(erro is None)
+        estado.atualizado_em = time.time()
+        if erro is not None:
+            estado.ultimo_erro = erro
+            return
+        if ttft_ms is not None:
+            estado.ttft_ms.append(ttft_ms)
+        if tokens_por_s is not None:
+            estado.tokens_por_s.append(tokens_por_s)
+
+    def ultimo_resultado(self, modelo: str) -> Optional[Dict[str, Any]]:
+        """Último resultado do modelo: {erro (None = sucesso), ttft_ms}; None sem medições."""
+        estado = self._estados.get(modelo)
+        if estado is None or not estado.resultados:
+            return None
+        if not estado.resultados[-1]:
+            return {"erro": estado.ultimo_erro, "ttft_ms": None}
+        return {"erro": None, "ttft_ms": estado.ttft_ms[-1] if estado.ttft_ms else None}
+
+    def ttft_amostras(self, modelo: str) -> List[float]:
+        estado = self._estados.get(modelo)
+        return list(estado.ttft_ms) if estado else []
+
+    def ttft_p90(self, modelo: str) -> Optional[float]:
+        amostras = self.ttft_amostras(modelo)
+        return percentil(amostras, 90) if amostras else None
+
+    def saudavel(self, modelo: str) -> Optional[bool]:
+        """True/False conforme as medições; None se ainda não há amostras suficientes."""
+        estado = self._estados.get(modelo)
+        if estado is None or len(estado.resultados) < settings.MODEL_HEALTH_MIN_SAMPLES:
+            return None
+        return estado.taxa_erro <= settings.MODEL_HEALTH_MAX_ERROR_RATE and bool(estado.ttft_ms)
+
+    def custo(self, modelo: str) -> float:
+        estado = self._estados.get(modelo)
+        if estado is not None and estado.preco is not None:
+            return estado.preco
+        tier = next((m.get("tier") for m in AVAILABLE_MODELS if m["id"] == modelo), None)
+        return CUSTO_POR_TIER.get(tier, CUSTO_POR_TIER["standard"])
+
+    # ========== ROTEAMENTO ==========
+
+    def escolher(self, politica: Optional[str] = None) -> Optional[str]:
+        """
+        Modelo para uma chamada sem modelo definido pelo usuário.
+
+        None quando o roteamento está desligado ou nenhum modelo tem
+        medições suficientes (o chamador usa o padrão).
+        """
+        politica = settings.MODEL_ROUTING_POLICY if politica is None else politica
+        if not politica:
+            return None
+
+        saudaveis = [m for m in self.modelos() if self.saudavel(m)]
+        if not saudaveis:
+            metrics.incr("llm.roteamento", politica=politica, resultado="sem_dados")
+            return None
+
+        def mais_rapido(modelos: List[str]) -> str:
+            return min(modelos, key=lambda m: self.ttft_p90(m))
+
+        if politica == POLITICA_MAIS_RAPIDO:
+            escolhido = mais_rapido(saudaveis)
+        elif politica == POLITICA_MAIS_BARATO_SLO:
+            no_slo = [m for m in saudaveis if self.ttft_p90(m) <= settings.MODEL_ROUTING_SLO_TTFT_MS]
+            if no_slo:
+                # Mais barato; empate (ex: vários gratuitos) fica com o mais rápido
+                escolhido = min(no_slo, key=lambda m: (self.custo(m), self.ttft_p90(m)))
+            else:
+                escolhido = mais_rapido(saudaveis)
+        else:
+            logger.warning(f"[Roteamento] Política desconhecida: {politica}")
+            return None
+
+        metrics.incr("llm.roteamento", politica=politica, modelo=escolhido)
+        return escolhido
+
+    def resumo(self) -> Dict[str, Any]:
+        """Estado por modelo (para /api/ia/models/health)."""
+        modelos = {}
+        for modelo in self.modelos():
+            estado = self._estados.get(modelo) or EstadoModelo()
+            ttft = list(estado.ttft_ms)
+            tps = list(estado.tokens_por_s)
+            modelos[modelo] = {
+                "saudavel": self.saudavel(modelo),
+                "amostras": len(estado.resultados),
+                "taxa_erro": round(estado.taxa_erro, 3),
+                "ttft_ms_p50": round(percentil(ttft, 50)) if ttft else None,
+                "ttft_ms_p90": round(percentil(ttft, 90)) if ttft else None,
+                "tokens_por_s_p50": round(percentil(tps, 50), 1) if tps else None,
+                "custo": self.custo(modelo),
+                "ultimo_erro": estado.ultimo_erro,
+            }
+        return {
+            "politica": settings.MODEL_ROUTING_POLICY or None,
+            "escolhido": self.escolher(),
+            "modelos": modelos,
+        }
+
+    # ========== SONDAS ==========
+
+    async def atualizar_precos(self) -> Dict[str, float]:
+        """Preço por token dos modelos, do catálogo /models do OpenRouter."""
+        client = http_clients.get("openrouter")
+        headers = {"Authorization": f"Bearer {settings.OPENROUTER_API_KEY}"}
+        resp = await client.get("/models", headers=headers, timeout=10.0)
+        resp.raise_for_status()
+        conhecidos = set(self.modelos())
+        precos = {}
+        for item in resp.json().get("data", []):
+            if item.get("id") not in conhecidos:
+                continue
+            pricing = item.get("pricing") or {}
+            try:
+                preco = float(pricing.get("prompt") or 0) + float(pricing.get("completion") or 0)
+            except (TypeError, ValueError):
+                continue
+            self._estado(item["id"]).preco = precos[item["id"]] = preco
+        return precos
+
+    def _resultado(self, modelo: str, **medicoes: Any) -> Dict[str, Any]:
+        """Registra o resultado da sonda e o retorna (para publicar aos demais workers)."""
+        self.registrar(modelo, **medicoes)
+        return {"modelo": modelo, **medicoes}
+
+    async def sondar(self, modelo: str) -> Dict[str, Any]:
+        """Requisição mínima em streaming: mede TTFT, tokens/s e erros."""
+        # Import tardio: o pacote de agentes importa este módulo
+        from .agents.llm_scheduler import llm_scheduler, CLASSE_LOTE
+
+        client = http_clients.get("openrouter")
+        headers = {"Authorization": f"Bearer {settings.OPENROUTER_API_KEY}"}
+        payload = {
+            "model": modelo,
+            "messages": [{"role": "user", "content": PROMPT_SONDA}],
+            "max_tokens": settings.MODEL_HEALTH_PROBE_MAX_TOKENS,
+            "temperature": 0,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        # A sonda disputa a cota do provedor como qualquer chamada: menor prioridade
+        vaga = await llm_scheduler.reservar(CLASSE_LOTE, custo=settings.MODEL_HEALTH_PROBE_MAX_TOKENS)
+        inicio = time.perf_counter()
+        primeiro = None
+        tokens = 0
+        try:
+            async with client.stream(
+                "POST", "/chat/completions", headers=headers, json=payload,
+                timeout=settings.MODEL_HEALTH_PROBE_TIMEOUT,
+            ) as resp:
+                if resp.status_code != 200:
+                    metrics.incr("llm.sonda", modelo=modelo, resultado=str(resp.status_code))
+                    return self._resultado(modelo, erro=str(resp.status_code))
+                async for linha in resp.aiter_lines():
+                    if not linha.startswith("data:") or linha.strip() == "data: [DONE]":
+                        continue
+                    try:
+                        dados = json.loads(linha[5:])
+                    except ValueError:
+                        continue
+                    if dados.get("error"):
+                        raise RuntimeError(dados["error"].get("message", "erro no stream"))
+                    if (dados.get("usage") or {}).get("completion_tokens"):
+                        tokens = dados["usage"]["completion_tokens"]
+                    for escolha in dados.get("choices") or []:
+                        if (escolha.get("delta") or {}).get("content"):
+                            if primeiro is None:
+                                primeiro = time.perf_counter()
+                            tokens = max(tokens, 1)
+        except Exception as e:
+            metrics.incr("llm.sonda", modelo=modelo, resultado="erro")
+            return self._resultado(modelo, erro=type(e).__name__)
+        finally:
+            vaga.liberar()
+
+        fim = time.perf_counter()
+        if primeiro is None:
+            metrics.incr("llm.sonda", modelo=modelo, resultado="sem_conteudo")
+            return self._resultado(modelo, erro="sem_conteudo")
+        duracao = fim - primeiro
+        metrics.incr("llm.sonda", modelo=modelo, resultado="ok")
+        return self._resultado(
+            modelo,
+            ttft_ms=(primeiro - inicio) * 1000,
+            tokens_por_s=tokens / duracao if duracao > 0 and tokens > 1 else None,
+        )
+
+    async def sondar_todos(self) -> Dict[str, Any]:
+        """Sonda todos os modelos; retorna o ciclo {id, precos, resultados}."""
+        precos: Dict[str, float] = {}
+        try:
+            precos = await self.atualizar_precos()
+        except Exception as e:
+            logger.warning(f"[SaudeModelos] Falha ao ler preços do catálogo: {e}")
+
+        limite = asyncio.Semaphore(settings.MODEL_HEALTH_PROBE_CONCURRENCY)
+
+        async def sondar_limitado(modelo: str) -> Dict[str, Any]:
+            async with limite:
+                return await self.sondar(modelo)
+
+        resultados = await asyncio.gather(*(sondar_limitado(m) for m in self.modelos()))
+        saudaveis = sum(1 for m in self.modelos() if self.saudavel(m))
+        logger.info(f"[SaudeModelos] Sondagem concluída: {saudaveis}/{len(self.modelos())} modelos saudáveis")
+        return {"id": uuid.uuid4().hex, "precos": precos, "resultados": resultados}
+
+    # ========== CICLO (UM WORKER SONDA POR TODOS) ==========
+
+    @property
+    def ativo(self) -> bool:
+        """Se a sondagem roda: só quando o roteamento ou o hedge usam as medições."""
+        return settings.MODEL_HEALTH_ENABLED and bool(settings.MODEL_ROUTING_POLICY or settings.LLM_HEDGING_ENABLED)
+
+    def _aplicar(self, ciclo: Dict[str, Any]) -> None:
+        """Aplica um ciclo sondado por outro worker (uma única vez)."""
+        if ciclo.get("id") == self._ultimo_ciclo:
+            return
+        self._ultimo_ciclo = ciclo.get("id")
+        for modelo, preco in (ciclo.get("precos") or {}).items():
+            self._estado(modelo).preco = preco
+        for resultado in ciclo.get("resultados") or []:
+            self.registrar(**resultado)
+
+    async def atualizar(self) -> bool:
+        """
+        Um ciclo de sondagem. O worker que obtém o lock do ciclo sonda e
+        publica os resultados no Redis; os demais aplicam o último ciclo
+        publicado. Sem Redis, cada worker sonda por si.
+        """
+        r = await get_redis()
+        if r is not None:
+            try:
+                obtido = await r.set(CHAVE_LOCK, "1", nx=True, ex=max(settings.MODEL_HEALTH_INTERVAL_SECONDS - 5, 30))
+                if not obtido:
+                    dados = await r.get(CHAVE_REDIS)
+                    if dados:
+                        self._aplicar(json.loads(dados))
+                    return False
+            except Exception as e:
+                logger.warning(f"[SaudeModelos] Erro no Redis: {e}")
+                marcar_falha()
+                r = None
+
+        ciclo = await self.sondar_todos()
+        self._ultimo_ciclo = ciclo["id"]
+        if r is not None:
+            try:
+                await r.set(CHAVE_REDIS, json.dumps(ciclo), ex=settings.MODEL_HEALTH_INTERVAL_SECONDS * 3)
+            except Exception as e:
+                logger.warning(f"[SaudeModelos] Erro ao gravar Redis: {e}")
+                marcar_falha()
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.atualizar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[SaudeModelos] Falha na sondagem: {e}")
+            await asyncio.sleep(settings.MODEL_HEALTH_INTERVAL_SECONDS)
+
+    def iniciar(self) -> None:
+        if not self.ativo:
+            return
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+# Instância global
+model_health = ModelHealthMonitor()
@@ -0,0 +1,216 @@
+"""
+Sistema LIA - Feed de Notícias (Atualizado em Segundo Plano)
+============================================================
+Notícias sobre licitações e IA exibidas no dashboard e em /api/news,
+agregadas dos feeds RSS do Google News fora do caminho da requisição.
+
+- A cada NEWS_FEED_REFRESH_SECONDS, um worker (lock no Redis) baixa os
+  feeds em paralelo, faz o parse do XML numa thread (fora do event loop)
+  e remove duplicatas por título (conjunto de hashes).
+- O último resultado bom (ao menos uma notícia) fica no Redis sem
+  expiração; uma atualização que falhe não o substitui.
+- As leituras usam a cópia local do worker, renovada a partir do Redis
+  no máximo a cada NEWS_FEED_LOCAL_SECONDS, e nunca esperam pelos
+  feeds: sem nenhum resultado ainda, retornam NOTICIAS_FALLBACK.
+
+Uso:
+    noticias = await news_feed.obter()
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import json
+import logging
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from .http_clients import http_clients
+from .metrics import metrics
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+CHAVE_REDIS = "lia:noticias:feed"
+CHAVE_LOCK = "lia:noticias:feed:lock"
+
+# Feeds RSS do Google News: licitações e IA
+FEEDS = [
+    "/rss/search?q=licitações+públicas+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419",
+    "/rss/search?q=inteligência+artificial+IA+brasil&hl=pt-BR&gl=BR&ceid=BR:pt-419",
+]
+
+# Notícias mais antigas que isso são descartadas
+MAX_DIAS_NOTICIA = 7
+
+# Placeholder com instruções enquanto não há notícias
+NOTICIAS_FALLBACK = [
+    {
+        "titulo": "Notícias sobre Licitações e IA em tempo real",
+        "link": "https://news.google.com/search?q=licitações+públicas+brasil",
+        "data": "Hoje",
+        "descricao": "Atualizações contínuas sobre licitações públicas e inteligência artificial no Brasil"
+    },
+    {
+        "titulo": "Acompanhe as últimas tendências em contratações públicas",
+        "link": "https://news.google.com/search?q=inteligência+artificial+brasil",
+        "data": "Hoje",
+        "descricao": "Tecnologia e inovação em processos de licitação"
+    }
+]
+
+
+def _texto(item: ET.Element, tag: str, padrao: str) -> str:
+    elemento = item.find(tag)
+    return elemento.text if elemento is not None and elemento.text else padrao
+
+
+def parsear_feed(conteudo: bytes, agora: datetime) -> List[Dict[str, str]]:
+    """Notícias recentes de um feed RSS (síncrono: rodar via asyncio.to_thread)."""
+    noticias = []
+    for item in ET.fromstring(conteudo).findall(".//item"):
+        titulo = _texto(item, "title", "Sem título")
+        pub_date = _texto(item, "pubDate", "")
+        data_fmt = "Recente"
+        if pub_date:
+            try:
+                dt = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
+            except ValueError:
+                dt = None
+            if dt is not None:
+                if (agora - dt).days > MAX_DIAS_NOTICIA:
+                    continue  # pula notícias muito antigas
+                data_fmt = dt.strftime("%d %b")
+        noticias.append({
+            "titulo": titulo,
+            "link": _texto(item, "link", "#"),
+            "data": data_fmt,
+            "descricao": titulo
+        })
+    return noticias
+
+
+def deduplicar(noticias: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Remove notícias de título repetido (sem diferenciar maiúsculas), mantendo a ordem."""
+    vistos = set()
+    unicas = []
+    for noticia in noticias:
+        chave = noticia["titulo"].lower()
+        if chave not in vistos:
+            vistos.add(chave)
+            unicas.append(noticia)
+    return unicas
+
+
+class NewsFeed:
+    """Último resultado bom dos feeds RSS, compartilhado entre workers."""
+
+    def __init__(self):
+        self._local: Optional[List[Dict[str, Any]]] = None
+        self._lido_em: float = 0.0
+        self._tarefa: Optional[asyncio.Task] = None
+
+    # ========== LEITURA ==========
+
+    async def obter(self) -> List[Dict[str, Any]]:
+        """Notícias do último resultado bom (ou NOTICIAS_FALLBACK); nunca acessa os feeds."""
+        if self._local is not None and time.monotonic() - self._lido_em < settings.NEWS_FEED_LOCAL_SECONDS:
+            return self._local
+
+        r = await get_redis()
+        if r is not None:
+            try:
+                dados = await r.get(CHAVE_REDIS)
+                if dados:
+                    self._guardar_local(json.loads(dados))
+                    return self._local
+            except Exception as e:
+                logger.warning(f"[Noticias] Erro ao ler Redis: {e}")
+                marcar_falha()
+
+        if self._local is not None:
+            return self._local
+        metrics.incr("noticias.leitura", resultado="fallback")
+        return NOTICIAS_FALLBACK
+
+    def _guardar_local(self, noticias: List[Dict[str, Any]]) -> None:
+        self._local = noticias
+        self._lido_em = time.monotonic()
+
+    # ========== ATUALIZAÇÃO ==========
+
+    @staticmethod
+    async def _baixar_feed(rss_url: str, agora: datetime) -> List[Dict[str, str]]:
+        try:
+            # Pool compartilhado (keep-alive): sem novo handshake TLS por requisição
+            response = await http_clients.get("google_news").get(rss_url)
+            if response.status_code != 200:
+                logger.warning(f"Feed {rss_url} retornou HTTP {response.status_code}")
+                return []
+            return await asyncio.to_thread(parsear_feed, response.content, agora)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar feed {rss_url}: {e}")
+            return []
+
+    async def atualizar(self) -> bool:
+        """
+        Baixa os feeds e grava o resultado, se este worker obtiver o lock
+        do ciclo e houver ao menos uma notícia.
+        """
+        r = await get_redis()
+        if r is not None:
+            try:
+                obtido = await r.set(CHAVE_LOCK, "1", nx=True, ex=max(settings.NEWS_FEED_REFRESH_SECONDS - 5, 30))
+            except Exception as e:
+                logger.warning(f"[Noticias] Erro ao obter lock no Redis: {e}")
+                marcar_falha()
+                obtido, r = True, None
+            if not obtido:
+                return False
+
+        agora = datetime.utcnow()
+        por_feed = await asyncio.gather(*(self._baixar_feed(url, agora) for url in FEEDS))
+        noticias = deduplicar([n for feed in por_feed for n in feed])[:settings.NEWS_FEED_MAX_ITEMS]
+        if not noticias:
+            metrics.incr("noticias.atualizacao", resultado="vazia")
+            logger.warning("[Noticias] Nenhuma notícia obtida; mantendo o último resultado")
+            return False
+
+        self._guardar_local(noticias)
+        if r is not None:
+            try:
+                await r.set(CHAVE_REDIS, json.dumps(noticias, ensure_ascii=False))
+            except Exception as e:
+                logger.warning(f"[Noticias] Erro ao gravar Redis: {e}")
+                marcar_falha()
+        metrics.incr("noticias.atualizacao", resultado="ok")
+        logger.info(f"[Noticias] {len(noticias)} notícia(s) atualizada(s)")
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.atualizar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Noticias] Falha na atualização: {e}")
+            await asyncio.sleep(settings.NEWS_FEED_REFRESH_SECONDS)
+
+    def iniciar(self) -> None:
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+# Instância global
+news_feed = NewsFeed()
@@ -0,0 +1,82 @@
+"""
+Sistema LIA - Conexão Redis Assíncrona
+======================================
+Cliente redis.asyncio compartilhado pelos serviços de cache, pub/sub e
+buffers de streaming.
+
+Se o Redis não estiver disponível, get_redis() retorna None e os
+serviços usam seus fallbacks em memória (mesmo padrão do CSRF em
+routers/views/common.py). Após uma falha, nova tentativa de conexão
+só é feita depois de REDIS_RETRY_SECONDS.
+
+Uso:
+    from app.services.redis_client import get_redis
+
+    r = await get_redis()
+    if r is not None:
+        await r.set("chave", "valor", ex=60)
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+import time
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre tentativas de reconexão após falha
+REDIS_RETRY_SECONDS = 30
+
+_client: Optional[aioredis.Redis] = None
+_indisponivel_ate: float = 0.0
+
+
+async def get_redis() -> Optional[aioredis.Redis]:
+    """Retorna o cliente Redis compartilhado ou None se indisponível."""
+    global _client, _indisponivel_ate
+
+    if _client is not None:
+        return _client
+
+    if time.monotonic() < _indisponivel_ate:
+        return None
+
+    try:
+        client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        await client.ping()
+        _client = client
+        logger.info("[Redis] Conexão assíncrona estabelecida")
+        return _client
+    except Exception as e:
+        _indisponivel_ate = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning(f"Redis não disponível, usando fallback em memória: {e}")
+        return None
+
+
+def marcar_falha() -> None:
+    """
+    Descarta a conexão após um erro de operação.
+
+    A próxima chamada a get_redis() aguardará REDIS_RETRY_SECONDS antes
+    de tentar reconectar, evitando martelar um Redis fora do ar.
+    """
+    global _client, _indisponivel_ate
+    _client = None
+    _indisponivel_ate = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+async def close_redis() -> None:
+    """Fecha a conexão (chamado no shutdown)."""
+    global _client
+    if _client is not None:
+        try:
+            await _client.close()
+        except Exception as e:
+            logger.warning(f"[Redis] Erro ao fechar conexão: {e}")
+        _client = None
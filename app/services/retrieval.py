@@ -0,0 +1,199 @@
+"""
+Sistema LIA - Recuperação Local de Trechos (BM25)
+=================================================
+Fatiamento de documentos em trechos e busca lexical BM25 em memória,
+para incluir no prompt só as passagens relevantes para a mensagem atual
+em vez do documento inteiro.
+
+- fatiar_texto(): divide um texto em trechos de ~TAMANHO_TRECHO caracteres,
+  respeitando parágrafos/frases, com sobreposição entre trechos.
+- BM25Index: índice Okapi BM25 sobre uma lista de trechos.
+- SkillKnowledgeIndex: índices por skill (textos_base), em cache por
+  (skill_id, data de atualização).
+
+Os trechos são gerados ao salvar a skill (coluna textos_base_chunks);
+skills antigas sem essa coluna são fatiadas sob demanda.
+
+Uso:
+    from app.services.retrieval import skill_index
+
+    trechos = skill_index.buscar(skill_dict, "prazo de garantia", k=4)
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tamanho alvo e sobreposição dos trechos (caracteres)
+TAMANHO_TRECHO = 1200
+SOBREPOSICAO_TRECHO = 200
+
+# Parâmetros BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Índices de skills mantidos em memória
+MAX_INDICES_EM_CACHE = 256
+
+_STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e ela ele em entre era essa esse esta este
+foi for ha isso isto ja la mais mas me mesmo na nas nao nem no nos o os ou para
+pela pelas pelo pelos por qual quando que se sem ser seu sua suas seus so sob
+sobre tambem te tem ter um uma umas uns voce
+""".split())
+
+_RE_TERMO = re.compile(r"\w+", re.UNICODE)
+_RE_FIM_FRASE = re.compile(r"(?<=[.!?;:])\s+")
+
+
+def _sem_acentos(texto: str) -> str:
+    normalizado = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in normalizado if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Termos normalizados (minúsculos, sem acento, sem stopwords)."""
+    termos = _RE_TERMO.findall(_sem_acentos(texto.lower()))
+    return [t for t in termos if len(t) > 1 and t not in _STOPWORDS]
+
+
+# ========== FATIAMENTO ==========
+
+def _unidades(texto: str) -> List[str]:
+    """Parágrafos; parágrafos longos demais são quebrados em frases."""
+    unidades = []
+    for paragrafo in re.split(r"\n\s*\n", texto):
+        paragrafo = paragrafo.strip()
+        if not paragrafo:
+            continue
+        if len(paragrafo) <= TAMANHO_TRECHO:
+            unidades.append(paragrafo)
+            continue
+        for frase in _RE_FIM_FRASE.split(paragrafo):
+            # Frases sem pontuação ainda podem exceder o tamanho
+            while len(frase) > TAMANHO_TRECHO:
+                unidades.append(frase[:TAMANHO_TRECHO])
+                frase = frase[TAMANHO_TRECHO - SOBREPOSICAO_TRECHO:]
+            if frase.strip():
+                unidades.append(frase.strip())
+    return unidades
+
+
+def fatiar_texto(texto: str) -> List[str]:
+    """Divide o texto em trechos de até ~TAMANHO_TRECHO chars com sobreposição."""
+    trechos: List[str] = []
+    atual = ""
+    for unidade in _unidades(texto or ""):
+        if atual and len(atual) + len(unidade) + 2 > TAMANHO_TRECHO:
+            trechos.append(atual)
+            # Sobreposição: cauda do trecho anterior abre o próximo
+            atual = atual[-SOBREPOSICAO_TRECHO:].lstrip()
+        atual = f"{atual}\n\n{unidade}" if atual else unidade
+    if atual.strip():
+        trechos.append(atual)
+    return trechos
+
+
+def fatiar_textos_base(textos_base: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Fatia os documentos de uma skill.
+
+    Retorna [{"doc": i, "titulo": ..., "ordem": j, "texto": ...}], formato
+    gravado em Skill.textos_base_chunks.
+    """
+    chunks = []
+    for i, doc in enumerate(textos_base or []):
+        titulo = doc.get("titulo", "Documento")
+        for j, trecho in enumerate(fatiar_texto(doc.get("conteudo", ""))):
+            chunks.append({"doc": i, "titulo": titulo, "ordem": j, "texto": trecho})
+    return chunks
+
+
+# ========== ÍNDICE BM25 ==========
+
+class BM25Index:
+    """Índice Okapi BM25 em memória sobre uma lista de trechos."""
+
+    def __init__(self, chunks: List[Dict[str, Any]]):
+        self.chunks = chunks
+        self._tf: List[Counter] = [Counter(tokenizar(c.get("texto", ""))) for c in chunks]
+        self._tamanhos = [sum(tf.values()) for tf in self._tf]
+        self._media = (sum(self._tamanhos) / len(self._tamanhos)) if self._tamanhos else 0.0
+        df: Counter = Counter()
+        for tf in self._tf:
+            df.update(tf.keys())
+        n = len(chunks)
+        self._idf = {
+            termo: math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+            for termo, freq in df.items()
+        }
+
+    def buscar(self, consulta: str, k: int = 4) -> List[Tuple[float, Dict[str, Any]]]:
+        """Os k trechos de maior pontuação (apenas pontuação > 0)."""
+        termos = set(tokenizar(consulta))
+        if not termos or not self.chunks:
+            return []
+
+        pontuados = []
+        for i, tf in enumerate(self._tf):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._tamanhos[i] / (self._media or 1))
+            for termo in termos:
+                freq = tf.get(termo)
+                if freq:
+                    score += self._idf[termo] * freq * (BM25_K1 + 1) / (freq + norm)
+            if score > 0:
+                pontuados.append((score, i))
+
+        pontuados.sort(reverse=True)
+        return [(score, self.chunks[i]) for score, i in pontuados[:k]]
+
+
+class SkillKnowledgeIndex:
+    """Cache de índices BM25 por skill."""
+
+    def __init__(self, max_indices: int = MAX_INDICES_EM_CACHE):
+        self._indices: "OrderedDict[Tuple[Any, Any], BM25Index]" = OrderedDict()
+        self._max = max_indices
+
+    def _indice(self, skill: Dict[str, Any]) -> BM25Index:
+        chave = (skill.get("id"), skill.get("data_atualizacao"))
+        indice = self._indices.get(chave)
+        if indice is not None:
+            self._indices.move_to_end(chave)
+            return indice
+
+        chunks = skill.get("textos_base_chunks")
+        if chunks is None:
+            # Skill salva antes do fatiamento na gravação
+            chunks = fatiar_textos_base(skill.get("textos_base"))
+        indice = BM25Index(chunks)
+
+        # Sem id não há como invalidar: não entra no cache
+        if chave[0] is not None:
+            self._indices[chave] = indice
+            while len(self._indices) > self._max:
+                self._indices.popitem(last=False)
+        return indice
+
+    def buscar(self, skill: Dict[str, Any], consulta: str, k: int = 4) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k trechos dos textos_base da skill para a consulta."""
+        if not skill.get("textos_base_chunks") and not skill.get("textos_base"):
+            return []
+        return self._indice(skill).buscar(consulta, k)
+
+    def invalidar(self, skill_id: int) -> None:
+        for chave in [c for c in self._indices if c[0] == skill_id]:
+            del self._indices[chave]
+
+
+# Instância global
+skill_index = SkillKnowledgeIndex()
@@ -0,0 +1,213 @@
+"""
+Sistema LIA - Resolução das Skills Ativas por Usuário
+=====================================================
+Resolve as skills aplicadas ao chat de um usuário: as skills do sistema
+mais as skills ativas do próprio usuário (índice
+idx_skills_usuario_ativa em (usuario_id, ativa)).
+
+- O texto integral dos textos_base (JSON grande) não é carregado: o
+  agente usa os trechos pré-calculados (textos_base_chunks) na busca
+  BM25 e apenas os títulos no prompt. Só skills antigas, ainda sem
+  trechos, têm os textos_base buscados para fatiar.
+- O conjunto resolvido fica em cache por usuário na memória do worker
+  (SKILL_CACHE_TTL_SECONDS). routers/skills.py invalida o usuário a cada
+  criação/edição/exclusão, e a invalidação é propagada aos demais
+  workers via Redis pub/sub, no mesmo esquema do PromptCache.
+
+Uso:
+    skills = await skill_resolver.resolver(db, usuario_id)
+    skill_resolver.invalidar(usuario_id)   # após commit em routers/skills.py
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app.config import settings
+from app.models.skill import Skill
+from .metrics import metrics
+from .redis_client import get_redis
+from .retrieval import fatiar_textos_base
+
+logger = logging.getLogger(__name__)
+
+# Canal Redis usado para propagar invalidações entre workers
+CANAL_INVALIDACAO = "lia:skills:invalidar"
+
+# Alvo de invalidação que limpa todos os usuários (skills do sistema)
+TODOS = "*"
+
+
+def _titulos(chunks: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Títulos dos documentos de origem dos trechos, na ordem dos documentos."""
+    titulos: Dict[int, str] = {}
+    for chunk in chunks:
+        titulos.setdefault(chunk.get("doc", 0), chunk.get("titulo") or "Doc")
+    return [{"titulo": titulos[doc]} for doc in sorted(titulos)]
+
+
+def _skill_para_dict(skill: Skill, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "id": skill.id,
+        "nome": skill.nome,
+        "descricao": skill.descricao,
+        "instrucoes": skill.instrucoes,
+        "escopo": skill.escopo,
+        "tools": skill.tools,
+        # Só os títulos: o conteúdo entra no prompt pelos trechos (BM25)
+        "textos_base": _titulos(chunks),
+        "textos_base_chunks": chunks,
+        "data_atualizacao": skill.data_atualizacao.isoformat() if skill.data_atualizacao else None,
+    }
+
+
+class SkillResolver:
+    """Skills do sistema + skills ativas do usuário, em cache por usuário."""
+
+    def __init__(self):
+        self._dados: Dict[int, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._geracao = 0  # Incrementada a cada invalidação (descarta cargas concorrentes)
+        self._origem = f"{os.getpid()}-{id(self)}"
+        self._listener: Optional[asyncio.Task] = None
+        self._tarefas: Set[asyncio.Task] = set()
+
+    async def _carregar(self, db: AsyncSession, usuario_id: Optional[int]) -> List[Dict[str, Any]]:
+        condicoes = [Skill.escopo == "system"]
+        if usuario_id is not None:
+            condicoes.append(and_(Skill.usuario_id == usuario_id, Skill.ativa == True))  # noqa: E712
+        stmt = (
+            select(Skill)
+            .where(or_(*condicoes))
+            .options(defer(Skill.textos_base))
+            .order_by(Skill.escopo.desc(), Skill.nome)
+        )
+        result = await db.execute(stmt)
+        skills = result.scalars().all()
+
+        # Skills salvas antes dos trechos pré-calculados: busca só os textos_base delas
+        sem_trechos = [s.id for s in skills if s.textos_base_chunks is None]
+        textos: Dict[int, Any] = {}
+        if sem_trechos:
+            result = await db.execute(
+                select(Skill.id, Skill.textos_base).where(Skill.id.in_(sem_trechos))
+            )
+            textos = {row.id: row.textos_base for row in result}
+
+        return [
+            _skill_para_dict(
+                s,
+                s.textos_base_chunks if s.textos_base_chunks is not None
+                else fatiar_textos_base(textos.get(s.id)),
+            )
+            for s in skills
+        ]
+
+    async def resolver(self, db: AsyncSession, usuario_id: Optional[int]) -> List[Dict[str, Any]]:
+        """Skills aplicáveis ao usuário (sistema + próprias ativas)."""
+        chave = usuario_id if usuario_id is not None else 0
+        item = self._dados.get(chave)
+        if item is not None and time.monotonic() - item[0] < settings.SKILL_CACHE_TTL_SECONDS:
+            metrics.incr("skills.resolucao", resultado="hit")
+            return list(item[1])
+
+        metrics.incr("skills.resolucao", resultado="miss")
+        geracao = self._geracao
+        skills = await self._carregar(db, usuario_id)
+        if geracao == self._geracao:
+            self._dados[chave] = (time.monotonic(), skills)
+        logger.info(f"[Skills] {len(skills)} skill(s) resolvida(s) para o usuário {usuario_id}")
+        return list(skills)
+
+    # ========== INVALIDAÇÃO ==========
+
+    def _limpar_local(self, alvos: List[Any]) -> None:
+        self._geracao += 1
+        if TODOS in alvos:
+            self._dados.clear()
+            return
+        for alvo in alvos:
+            self._dados.pop(alvo, None)
+
+    def invalidar(self, usuario_id: Optional[int] = None) -> None:
+        """
+        Descarta as skills resolvidas do usuário (None = todos, ex: skills
+        do sistema) e propaga a invalidação para os demais workers.
+        """
+        alvos = [TODOS if usuario_id is None else usuario_id]
+        self._limpar_local(alvos)
+        try:
+            tarefa = asyncio.get_running_loop().create_task(self._publicar(alvos))
+        except RuntimeError:
+            return  # Fora de um event loop (scripts): nada a propagar
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _publicar(self, alvos: List[Any]) -> None:
+        r = await get_redis()
+        if r is None:
+            return
+        try:
+            await r.publish(CANAL_INVALIDACAO, json.dumps({"origem": self._origem, "alvos": alvos}))
+        except Exception as e:
+            logger.warning(f"[Skills] Erro ao publicar invalidação: {e}")
+
+    async def escutar(self) -> None:
+        """Loop de assinatura do canal de invalidação (reconecta em caso de erro)."""
+        while True:
+            r = await get_redis()
+            if r is None:
+                await asyncio.sleep(5)
+                continue
+            pubsub = r.pubsub()
+            try:
+                await pubsub.subscribe(CANAL_INVALIDACAO)
+                # Mensagens perdidas durante a reconexão: recomeçar do zero
+                self._limpar_local([TODOS])
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    try:
+                        dados = json.loads(msg["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if dados.get("origem") != self._origem:
+                        self._limpar_local(dados.get("alvos") or [TODOS])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Skills] Listener de invalidação caiu: {e}. Reconectando...")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def iniciar_listener(self) -> None:
+        """Inicia a task de escuta (chamado no startup)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.escutar())
+
+    async def parar_listener(self) -> None:
+        """Cancela a task de escuta (chamado no shutdown)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+
+
+# Instância global
+skill_resolver = SkillResolver()
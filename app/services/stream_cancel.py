@@ -0,0 +1,89 @@
+"""
+Sistema LIA - Cancelamento de Streams na Desconexão
+===================================================
+Envolve o gerador de uma StreamingResponse e o cancela assim que o
+cliente desconecta, mesmo enquanto o LLM ainda não produziu o próximo
+token (momento em que o Starlette não percebe a queda sozinho).
+
+O cancelamento chega ao agente como CancelledError no ponto em que ele
+aguarda o OpenRouter; o `async with stream` dos agentes fecha então a
+resposta HTTP do upstream, interrompendo a geração e liberando a conexão.
+
+Uso:
+    return StreamingResponse(
+        cancelar_ao_desconectar(request, stream_chat(), origem="chat.dfd"),
+        media_type="text/event-stream",
+    )
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, TypeVar
+
+from starlette.requests import Request
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Intervalo de verificação de desconexão do cliente
+DISCONNECT_POLL_SECONDS = 1.0
+
+
+async def _aguardar_desconexao(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def cancelar_ao_desconectar(
+    request: Request,
+    gerador: AsyncIterator[T],
+    origem: str,
+) -> AsyncIterator[T]:
+    """
+    Repassa os itens de `gerador` até o fim ou até o cliente desconectar.
+
+    Na desconexão, o __anext__ pendente é cancelado, o gerador é fechado
+    e a métrica llm.stream_cancelado é registrada com a origem.
+    """
+    vigia = asyncio.create_task(_aguardar_desconexao(request))
+    proximo = None
+    try:
+        while True:
+            proximo = asyncio.ensure_future(gerador.__anext__())
+            await asyncio.wait({proximo, vigia}, return_when=asyncio.FIRST_COMPLETED)
+
+            if not proximo.done():
+                # Cliente saiu enquanto o upstream ainda gerava
+                proximo.cancel()
+                await asyncio.gather(proximo, return_exceptions=True)
+                metrics.incr("llm.stream_cancelado", origem=origem, motivo="desconexao")
+                logger.info(f"[Stream {origem}] Cliente desconectou; stream do LLM cancelado")
+                return
+
+            try:
+                item = proximo.result()
+            except StopAsyncIteration:
+                return
+            proximo = None
+            yield item
+    except (asyncio.CancelledError, GeneratorExit):
+        # Starlette cancelou a resposta (ex: falha ao enviar para o cliente)
+        if proximo is not None and not proximo.done():
+            proximo.cancel()
+            await asyncio.gather(proximo, return_exceptions=True)
+        metrics.incr("llm.stream_cancelado", origem=origem, motivo="resposta_encerrada")
+        raise
+    finally:
+        vigia.cancel()
+        aclose = getattr(gerador, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception as e:
+                logger.debug(f"[Stream {origem}] Erro ao fechar gerador: {e}")
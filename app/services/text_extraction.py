@@ -0,0 +1,252 @@
+"""
+Sistema LIA - Extração de Texto de Documentos
+=============================================
+Extrai o texto de PDFs, DOCX, Markdown e TXT enviados ao chat sem
+bloquear o event loop.
+
+- PDF e DOCX são processados num pool de processos (fitz/pypdf e
+  python-docx seguram a GIL por segundos em arquivos grandes). Os
+  processos são iniciados com "spawn" (não herdam threads e locks do
+  uvicorn) e o pool é recriado se um deles morrer (OOM, PDF que derruba
+  o parser): só a extração em curso falha, as seguintes seguem.
+- PDFs com mais de EXTRACTION_PDF_PAGES_PER_TASK páginas são divididos
+  em faixas de páginas extraídas em paralelo e concatenadas na ordem.
+- O resultado fica em cache pelo SHA-256 do conteúdo: memória do worker
+  e Redis (compartilhado entre workers, expira em
+  EXTRACTION_CACHE_TTL_SECONDS). Reenviar o mesmo edital ou lei devolve
+  o texto sem reprocessar.
+
+Uso:
+    from app.services.text_extraction import extrair_texto
+
+    # sha256 calculado durante o recebimento (upload_storage.receber_upload)
+    # ou, para arquivos já em disco, com calcular_sha256(caminho)
+    texto = await extrair_texto(caminho, content_type, sha256)
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import codecs
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from .metrics import metrics
+from .redis_client import get_redis, marcar_falha
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "lia:extracao"
+
+CONTENT_TYPE_PDF = "application/pdf"
+CONTENT_TYPE_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+CONTENT_TYPES_TEXTO = ("text/plain", "text/markdown")
+
+# Textos mantidos no cache em memória do worker
+MAX_TEXTOS_EM_CACHE = 64
+
+# Bloco de leitura para o hash e a decodificação de texto
+BLOCO_LEITURA = 1024 * 1024
+
+
+# ========== FUNÇÕES EXECUTADAS NO POOL (precisam ser picklable) ==========
+
+def _contar_paginas_pdf(caminho: str) -> int:
+    try:
+        import fitz  # pymupdf
+        with fitz.open(caminho) as doc:
+            return doc.page_count
+    except ImportError:
+        import pypdf
+        return len(pypdf.PdfReader(caminho).pages)
+
+
+def _extrair_paginas_pdf(caminho: str, inicio: int, fim: int) -> str:
+    """Texto das páginas [inicio, fim) de um PDF."""
+    try:
+        import fitz  # pymupdf
+        with fitz.open(caminho) as doc:
+            return "".join(doc[i].get_text() + "\n" for i in range(inicio, min(fim, doc.page_count)))
+    except ImportError:
+        import pypdf
+        paginas = pypdf.PdfReader(caminho).pages
+        return "".join((paginas[i].extract_text() or "") + "\n" for i in range(inicio, min(fim, len(paginas))))
+
+
+def _extrair_docx(caminho: str) -> str:
+    import docx
+    doc = docx.Document(caminho)
+    return "\n".join(para.text for para in doc.paragraphs)
+
+
+def _ler_texto(caminho: str) -> str:
+    # Decodificação incremental: o arquivo não é lido inteiro como bytes
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    partes = []
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b""):
+            partes.append(decoder.decode(bloco))
+    partes.append(decoder.decode(b"", final=True))
+    return "".join(partes)
+
+
+def _sha256_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# ========== POOL ==========
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = settings.EXTRACTION_WORKERS or min(4, os.cpu_count() or 1)
+        # spawn: um fork do processo do uvicorn copiaria threads e locks em uso
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"[Extração] Pool de processos iniciado ({workers} workers)")
+    return _pool
+
+
+def encerrar_pool() -> None:
+    """Finaliza o pool de processos (chamado no shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _no_pool(func, *args):
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # Um processo morreu: o executor fica quebrado para sempre; o próximo uso cria outro
+        if _pool is pool:
+            _pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            metrics.incr("extracao.pool_recriado")
+            logger.warning("[Extração] Processo do pool morreu; o pool será recriado")
+        raise
+
+
+def _faixas(total_paginas: int, por_tarefa: int) -> List[Tuple[int, int]]:
+    return [(i, min(i + por_tarefa, total_paginas)) for i in range(0, total_paginas, por_tarefa)]
+
+
+async def _extrair_pdf(caminho: str) -> str:
+    por_tarefa = settings.EXTRACTION_PDF_PAGES_PER_TASK
+    total = await _no_pool(_contar_paginas_pdf, caminho)
+    faixas = _faixas(total, por_tarefa) or [(0, 0)]
+    partes = await asyncio.gather(*(_no_pool(_extrair_paginas_pdf, caminho, ini, fim) for ini, fim in faixas))
+    if len(faixas) > 1:
+        logger.info(f"[Extração] PDF de {total} páginas extraído em {len(faixas)} faixas paralelas")
+    return "".join(partes).strip()
+
+
+# ========== CACHE ==========
+
+_cache_local: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _guardar_local(sha256: str, texto: str) -> None:
+    _cache_local[sha256] = texto
+    _cache_local.move_to_end(sha256)
+    while len(_cache_local) > MAX_TEXTOS_EM_CACHE:
+        _cache_local.popitem(last=False)
+
+
+async def _buscar_cache(sha256: str) -> Optional[str]:
+    texto = _cache_local.get(sha256)
+    if texto is not None:
+        _cache_local.move_to_end(sha256)
+        return texto
+
+    r = await get_redis()
+    if r is None:
+        return None
+    try:
+        texto = await r.get(f"{PREFIXO_REDIS}:{sha256}")
+    except Exception as e:
+        logger.warning(f"[Extração] Erro ao ler cache Redis: {e}")
+        marcar_falha()
+        return None
+    if texto is not None:
+        _guardar_local(sha256, texto)
+    return texto
+
+
+async def _gravar_cache(sha256: str, texto: str) -> None:
+    _guardar_local(sha256, texto)
+    r = await get_redis()
+    if r is None:
+        return
+    try:
+        await r.set(f"{PREFIXO_REDIS}:{sha256}", texto, ex=settings.EXTRACTION_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"[Extração] Erro ao gravar cache Redis: {e}")
+        marcar_falha()
+
+
+# ========== API ==========
+
+async def calcular_sha256(caminho: Path) -> str:
+    """SHA-256 do arquivo, calculado fora do event loop."""
+    return await asyncio.to_thread(_sha256_arquivo, str(caminho))
+
+
+def tipo_extraivel(content_type: Optional[str]) -> bool:
+    return content_type in (CONTENT_TYPE_PDF, CONTENT_TYPE_DOCX, *CONTENT_TYPES_TEXTO)
+
+
+async def extrair_texto(caminho: Path, content_type: Optional[str], sha256: Optional[str] = None) -> Optional[str]:
+    """
+    Texto do arquivo conforme o content_type (None se não suportado).
+
+    Com sha256, o resultado é buscado/gravado no cache. Falhas de
+    extração são logadas e devolvem None (não entram no cache).
+    """
+    if not tipo_extraivel(content_type):
+        return None
+
+    if sha256:
+        texto = await _buscar_cache(sha256)
+        if texto is not None:
+            metrics.incr("extracao.cache", resultado="hit")
+            return texto
+        metrics.incr("extracao.cache", resultado="miss")
+
+    inicio = time.perf_counter()
+    try:
+        if content_type == CONTENT_TYPE_PDF:
+            texto = await _extrair_pdf(str(caminho))
+        elif content_type == CONTENT_TYPE_DOCX:
+            texto = await _no_pool(_extrair_docx, str(caminho))
+        else:
+            texto = await asyncio.to_thread(_ler_texto, str(caminho))
+    except Exception as e:
+        logger.error(f"[Extração] Erro ao extrair {content_type} ({Path(caminho).name}): {e}")
+        metrics.incr("extracao.erros", tipo=content_type)
+        return None
+
+    metrics.observe("extracao.duracao_ms", (time.perf_counter() - inicio) * 1000, tipo=content_type)
+    if sha256 and texto:
+        await _gravar_cache(sha256, texto)
+    return texto
@@ -0,0 +1,288 @@
+"""
+Sistema LIA - Armazenamento Temporário de Uploads
+=================================================
+Recebe os arquivos enviados ao chat direto do corpo da requisição, sem
+manter o upload inteiro em memória nem deixá-lo ser recebido antes:
+
+- o multipart é interpretado à medida que os bytes chegam
+  (request.stream() + o parser incremental do python-multipart), em vez
+  de File(...)/Form(...), que fazem o Starlette receber e gravar o corpo
+  inteiro num arquivo temporário antes do handler rodar;
+- o limite de tamanho é verificado a cada bloco recebido: o upload é
+  abortado assim que passa de UPLOAD_MAX_BYTES, sem receber nem gravar
+  o restante;
+- o SHA-256 é calculado durante a gravação (chave do cache de extração);
+- a escrita em disco roda fora do event loop.
+
+Os arquivos ficam em UPLOAD_DIR apenas para a extração de texto; uma
+tarefa de limpeza remove os que passaram de UPLOAD_TTL_SECONDS.
+
+Uso:
+    recebido = await receber_upload(request, UPLOAD_DIR, file_id)
+    recebido.caminho, recebido.tamanho, recebido.sha256, recebido.campos
+
+Autor: Equipe TRE-GO
+Data: Fevereiro 2026
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("tmp/uploads")
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+# Nome do campo do arquivo no formulário
+CAMPO_ARQUIVO = "file"
+
+# Margem para os cabeçalhos multipart e os campos de texto do formulário
+MARGEM_MULTIPART = 64 * 1024
+
+
+class UploadMuitoGrande(Exception):
+    """O upload passou de UPLOAD_MAX_BYTES."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        super().__init__(f"Arquivo muito grande (max {limite // (1024 * 1024)}MB)")
+
+
+class UploadInvalido(Exception):
+    """Corpo que não é um multipart/form-data com o campo do arquivo."""
+
+
+@dataclass
+class UploadRecebido:
+    """Arquivo gravado em disco e os demais campos (texto) do formulário."""
+    caminho: Path
+    filename: str
+    content_type: str
+    tamanho: int
+    sha256: str
+    campos: Dict[str, str] = field(default_factory=dict)
+
+
+class _Parte:
+    """Parte do multipart sendo recebida."""
+
+    def __init__(self):
+        self.cabecalhos: Dict[bytes, bytes] = {}
+        self.nome: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.content_type = ""
+        self.valor = bytearray()
+
+
+class _ReceptorMultipart:
+    """
+    Callbacks do MultipartParser. Os bytes do arquivo ficam em `pendente`
+    até o chamador gravá-los (a gravação é assíncrona, os callbacks não).
+    """
+
+    def __init__(self, diretorio: Path, nome: str, limite: int):
+        self.diretorio = diretorio
+        self.nome = nome
+        self.limite = limite
+        self.parte: Optional[_Parte] = None
+        self.campo_cabecalho = b""
+        self.valor_cabecalho = b""
+        self.arquivo: Optional[_Parte] = None
+        self.caminho: Optional[Path] = None
+        self.campos: Dict[str, str] = {}
+        self.pendente: List[bytes] = []
+        self.tamanho = 0
+        self.tamanho_campos = 0
+        self.sha = hashlib.sha256()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._inicio_parte,
+            "on_header_field": self._campo_cabecalho,
+            "on_header_value": self._valor_cabecalho,
+            "on_header_end": self._fim_cabecalho,
+            "on_headers_finished": self._fim_cabecalhos,
+            "on_part_data": self._dados,
+            "on_part_end": self._fim_parte,
+        }
+
+    def _inicio_parte(self) -> None:
+        self.parte = _Parte()
+
+    def _campo_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self.campo_cabecalho += dados[inicio:fim]
+
+    def _valor_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self.valor_cabecalho += dados[inicio:fim]
+
+    def _fim_cabecalho(self) -> None:
+        self.parte.cabecalhos[self.campo_cabecalho.lower()] = self.valor_cabecalho
+        self.campo_cabecalho = self.valor_cabecalho = b""
+
+    def _fim_cabecalhos(self) -> None:
+        parte = self.parte
+        _, opcoes = parse_options_header(parte.cabecalhos.get(b"content-disposition", b""))
+        parte.nome = opcoes.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" in opcoes:
+            parte.filename = Path(opcoes[b"filename"].decode("utf-8", errors="replace")).name
+            parte.content_type = parte.cabecalhos.get(b"content-type", b"").decode("latin-1")
+        if parte.nome == CAMPO_ARQUIVO and parte.filename is not None:
+            if self.arquivo is not None:
+                raise UploadInvalido("Envie um arquivo por requisição")
+            self.arquivo = parte
+            self.caminho = self.diretorio / f"{self.nome}{Path(parte.filename).suffix}"
+
+    def _dados(self, dados: bytes, inicio: int, fim: int) -> None:
+        parte = self.parte
+        if parte is self.arquivo:
+            self.tamanho += fim - inicio
+            if self.tamanho > self.limite:
+                raise UploadMuitoGrande(self.limite)
+            bloco = dados[inicio:fim]
+            self.sha.update(bloco)
+            self.pendente.append(bloco)
+        elif parte.filename is None:
+            self.tamanho_campos += fim - inicio
+            if self.tamanho_campos > MARGEM_MULTIPART:
+                raise UploadInvalido("Campos do formulário grandes demais")
+            parte.valor += dados[inicio:fim]
+        # Outros arquivos (campo diferente de "file") são descartados
+
+    def _fim_parte(self) -> None:
+        parte = self.parte
+        if parte is not self.arquivo and parte.filename is None and parte.nome:
+            self.campos[parte.nome] = parte.valor.decode("utf-8", errors="replace")
+        self.parte = None
+
+
+async def receber_upload(
+    request: Request,
+    diretorio: Path,
+    nome: str,
+    limite: Optional[int] = None,
+) -> UploadRecebido:
+    """
+    Recebe o multipart da requisição gravando o campo "file" em
+    `diretorio / (nome + extensão)`, bloco a bloco, conforme chega.
+
+    Levanta UploadMuitoGrande assim que o arquivo passa do limite (o
+    restante do corpo não é lido) e UploadInvalido para corpos que não
+    são multipart ou não trazem o arquivo; nos dois casos o arquivo
+    parcial é removido.
+    """
+    limite = limite or settings.UPLOAD_MAX_BYTES
+    tipo, opcoes = parse_options_header(request.headers.get("content-type", ""))
+    if tipo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+        raise UploadInvalido("Envie o arquivo como multipart/form-data")
+
+    receptor = _ReceptorMultipart(diretorio, nome, limite)
+    parser = MultipartParser(opcoes[b"boundary"], receptor.callbacks())
+    saida = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if receptor.pendente:
+                if saida is None:
+                    saida = await asyncio.to_thread(open, receptor.caminho, "wb")
+                blocos, receptor.pendente = receptor.pendente, []
+                await asyncio.to_thread(saida.writelines, blocos)
+        parser.finalize()
+        if receptor.arquivo is None:
+            raise UploadInvalido(f"Campo '{CAMPO_ARQUIVO}' ausente")
+        if saida is None:
+            # Arquivo vazio
+            saida = await asyncio.to_thread(open, receptor.caminho, "wb")
+    except BaseException:
+        if saida is not None:
+            await asyncio.to_thread(saida.close)
+        if receptor.caminho is not None:
+            remover_arquivo(receptor.caminho)
+        raise
+    await asyncio.to_thread(saida.close)
+    metrics.observe("upload.tamanho_bytes", receptor.tamanho)
+    arquivo = receptor.arquivo
+    return UploadRecebido(
+        caminho=receptor.caminho,
+        filename=arquivo.filename,
+        content_type=arquivo.content_type,
+        tamanho=receptor.tamanho,
+        sha256=receptor.sha.hexdigest(),
+        campos=receptor.campos,
+    )
+
+
+def remover_arquivo(caminho: Path) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[Uploads] Não foi possível remover {caminho.name}: {e}")
+
+
+# ========== LIMPEZA POR TTL ==========
+
+def _remover_expirados(diretorio: Path, ttl: int) -> int:
+    limite = time.time() - ttl
+    removidos = 0
+    for caminho in diretorio.iterdir():
+        try:
+            if caminho.is_file() and caminho.stat().st_mtime < limite:
+                caminho.unlink()
+                removidos += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning(f"[Uploads] Erro ao remover {caminho.name}: {e}")
+    return removidos
+
+
+class UploadSweeper:
+    """Remove periodicamente os uploads temporários expirados."""
+
+    def __init__(self, diretorio: Path = UPLOAD_DIR):
+        self.diretorio = diretorio
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def varrer(self) -> int:
+        removidos = await asyncio.to_thread(_remover_expirados, self.diretorio, settings.UPLOAD_TTL_SECONDS)
+        if removidos:
+            metrics.incr("upload.expirados_removidos", removidos)
+            logger.info(f"[Uploads] {removidos} arquivo(s) temporário(s) expirado(s) removido(s)")
+        return removidos
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.varrer()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Uploads] Falha na limpeza: {e}")
+            await asyncio.sleep(settings.UPLOAD_SWEEP_INTERVAL_SECONDS)
+
+    def iniciar(self) -> None:
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+# Instância global
+upload_sweeper = UploadSweeper()
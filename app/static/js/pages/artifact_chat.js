@@ -20,6 +20,7 @@ window.artifactData = {};
 let readyToGenerate = false;
 let hasMessages = false;
 let chatAttachments = []; // Global attachments (Main Chat)
+let chatSessionId = null; // Server-side history (from chat init); replaces resending chatHistory
 let isGenerating = false;
 let currentRegenerateField = null;
 let deepResearchActive = false; // Deep Research State
@@ -35,6 +36,71 @@ let activeSessionSkills = new Set(); // IDs of active skills for Main Chat
 let availableModels = [];
 let selectedModel = 'arcee-ai/trinity-mini:free'; // Default: Trinity
 let modelsLoaded = false;
+// "Automático": no model is sent and the server routes by measured model health
+const MODEL_AUTO = 'auto';
+const MODEL_AUTO_OPTION = {
+    id: MODEL_AUTO,
+    name: 'Automático',
+    icon: '🧭',
+    tier: 'auto',
+    description: 'Escolhe o modelo pela saúde medida (latência, erros e custo)'
+};
+
+function modelForRequest(modelId) {
+    return modelId && modelId !== MODEL_AUTO ? modelId : null;
+}
+
+// ========== CHAT SESSION ==========
+// With a session the server keeps the history: requests carry only the new
+// message and session_id. Without one (or if it expired), the history is sent.
+function withChatHistory(body, history) {
+    if (chatSessionId) return { ...body, session_id: chatSessionId };
+    return { ...body, history };
+}
+
+async function postChatRequest(url, buildBody) {
+    const send = () => fetch(url, {
+        method: 'POST',
+        credentials: 'include',
+        headers: SSE_JSON_HEADERS,
+        body: JSON.stringify(buildBody())
+    });
+
+    let response = await send();
+    if (response.status === 404 && chatSessionId) {
+        console.warn('[Artifact Chat] Chat session expired, resending full history');
+        chatSessionId = null;
+        response = await send();
+    }
+    return response;
+}
+
+// ========== SSE PROTOCOL ==========
+// v2: server sends only deltas (+ periodic checkpoints); v1 (no header) sends cumulative content
+const SSE_JSON_HEADERS = { 'Content-Type': 'application/json', 'X-SSE-Protocol': '2' };
+
+// Over the concurrency limits the server answers 429/503 with Retry-After (seconds)
+function isCapacityResponse(response) {
+    return response.status === 429 || response.status === 503;
+}
+
+function capacityMessage(response) {
+    const retryAfter = response.headers.get('Retry-After');
+    return `O assistente está no limite de respostas simultâneas. Tente novamente${retryAfter ? ` em ${retryAfter} segundos` : ' em instantes'}.`;
+}
+
+function applySSEDelta(buffer, data) {
+    return data.delta !== undefined ? buffer + data.delta : (data.content || '');
+}
+
+function checkSSECheckpoint(data, buffers) {
+    if (data.type !== 'checkpoint' || !data.lengths) return;
+    for (const [tipo, length] of Object.entries(data.lengths)) {
+        if (buffers[tipo] !== undefined && buffers[tipo].length !== length) {
+            console.warn(`[SSE] Checkpoint divergente para '${tipo}': ${buffers[tipo].length} != ${length}`);
+        }
+    }
+}
 
 // ========== SKILLS MANAGEMENT ==========
 async function loadSkills() {
@@ -283,6 +349,10 @@ async function handleFileUpload(event) {
         // Create FormData
         const formData = new FormData();
         formData.append('file', file);
+        if (window.ARTIFACT_CONFIG?.projetoId) {
+            // Persist text documents in the project knowledge base
+            formData.append('projeto_id', window.ARTIFACT_CONFIG.projetoId);
+        }
 
         try {
             // Show loading state
@@ -302,13 +372,15 @@ async function handleFileUpload(event) {
             }
 
             const data = await response.json();
-            console.log('[Artifact Chat] Upload success:', { filename: data.filename, hasText: !!data.extracted_text, textLength: data.extracted_text?.length });
+            console.log('[Artifact Chat] Upload success:', { filename: data.filename, persisted: data.persisted, chunks: data.chunks, hasText: !!data.extracted_text });
 
             // Add to state
             chatAttachments.push({
                 type: file.type,
                 filename: data.filename,
                 url: data.url,
+                file_id: data.file_id,
+                persisted: !!data.persisted,
                 extracted_text: data.extracted_text
             });
 
@@ -363,8 +435,15 @@ function renderKnowledgeBase() {
     }).join('');
 }
 
-window.removeAttachment = function (index) {
-    chatAttachments.splice(index, 1);
+window.removeAttachment = async function (index) {
+    const [removed] = chatAttachments.splice(index, 1);
+    if (removed?.persisted && removed.file_id) {
+        try {
+            await fetch(`/api/ia-upload/${removed.file_id}`, { method: 'DELETE', credentials: 'include' });
+        } catch (error) {
+            console.warn('[Artifact Chat] Could not delete document from knowledge base:', error);
+        }
+    }
     renderKnowledgeBase();
     addMessage('assistant', '🗑️ Arquivo removido da base de conhecimento.');
 }
@@ -466,8 +545,9 @@ async function initChat() {
     const config = window.ARTIFACT_CONFIG;
 
     try {
-        // Load skills in background
+        // Load skills and project knowledge base in background
         loadSkills();
+        loadProjectDocuments();
 
         const response = await fetch(`${config.apiBase}/chat/init/${config.projetoId}`, {
             credentials: 'include'
@@ -476,6 +556,7 @@ async function initChat() {
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
         const data = await response.json();
+        chatSessionId = data.session_id || null;
         showWelcomeMessage(data.welcome_message);
     } catch (error) {
         console.error('Erro ao iniciar chat:', error);
@@ -485,6 +566,32 @@ async function initChat() {
     }
 }
 
+// Documents persisted in the project knowledge base are referenced by file_id;
+// the backend retrieves only the relevant chunks for each message.
+async function loadProjectDocuments() {
+    const config = window.ARTIFACT_CONFIG;
+    try {
+        const response = await fetch(`/api/ia-upload/projeto/${config.projetoId}`, {
+            credentials: 'include'
+        });
+        if (!response.ok) return;
+
+        const data = await response.json();
+        for (const doc of data.documentos || []) {
+            if (chatAttachments.some(att => att.file_id === doc.file_id)) continue;
+            chatAttachments.push({
+                type: doc.content_type || 'application/octet-stream',
+                filename: doc.filename,
+                file_id: doc.file_id,
+                persisted: true
+            });
+        }
+        renderKnowledgeBase();
+    } catch (error) {
+        console.warn('[Artifact Chat] Could not load project documents:', error);
+    }
+}
+
 // ========== DEEP RESEARCH ==========
 function initDeepResearchUI() {
     // Locate the left toolbar container
@@ -815,21 +922,21 @@ async function sendMessage() {
             contextData.data_limite = document.getElementById('inputDataLimite').value;
         }
 
-        const response = await fetch(`${config.apiBase}/chat/${config.projetoId}`, {
-            method: 'POST',
-            credentials: 'include',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                content: content,
-                history: chatHistory.slice(-10),
-                model: selectedModel,
-                attachments: chatAttachments, // Send current attachments
-                ...contextData
-            })
-        });
+        const response = await postChatRequest(`${config.apiBase}/chat/${config.projetoId}`, () => withChatHistory({
+            content: content,
+            model: modelForRequest(selectedModel),
+            attachments: chatAttachments, // Send current attachments
+            ...contextData
+        }, chatHistory.slice(-10)));
 
         removeTypingIndicator();
 
+        if (isCapacityResponse(response)) {
+            addMessage('assistant', capacityMessage(response));
+            btnSend.disabled = false;
+            return;
+        }
+
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
         let fullResponse = '';
@@ -853,13 +960,20 @@ async function sendMessage() {
                 try {
                     const data = JSON.parse(trimmedLine.slice(6));
 
+                    if (data.type === 'queue') {
+                        if (!streamingStarted) {
+                            addMessage('assistant', '', true);
+                            streamingStarted = true;
+                        }
+                        updateStreamingMessage(`Aguardando vaga (posição ${data.position} na fila)...`);
+                    }
+
                     if (data.type === 'reasoning') {
                         if (!streamingStarted) {
                             addMessage('assistant', '', true);
                             streamingStarted = true;
                         }
-                        // OpenRouter Items Paradigm: data.content is cumulative
-                        reasoningBuffer = data.content;
+                        reasoningBuffer = applySSEDelta(reasoningBuffer, data);
 
                         let combinedResponse = '';
                         if (reasoningBuffer) {
@@ -880,8 +994,7 @@ async function sendMessage() {
                             addMessage('assistant', '', true);
                             streamingStarted = true;
                         }
-                        // OpenRouter Items Paradigm: data.content is cumulative
-                        contentBuffer = data.content;
+                        contentBuffer = applySSEDelta(contentBuffer, data);
 
                         let combinedResponse = '';
                         if (reasoningBuffer) {
@@ -897,6 +1010,8 @@ async function sendMessage() {
                         updateStreamingMessage(combinedResponse);
                     }
 
+                    checkSSECheckpoint(data, { chunk: contentBuffer, reasoning: reasoningBuffer });
+
                     if (data.type === 'action' && data.action === 'generate') {
                         finalizeStreamingMessage(fullResponse);
                         showGenerateAuthorization();
@@ -1053,86 +1168,155 @@ async function authorizeGeneration(researchContext = null) {
     addMessage('assistant', `⚡ **Iniciando geração do ${config.artifactLabel}...** Aguarde enquanto preencho os campos.`);
 
     const requestBody = {
-        history: chatHistory,
         gestor: gestor || null,
         fiscal: fiscal || null,
         data_limite: dataLimite || null,
-        model: selectedModel,
+        model: modelForRequest(selectedModel),
         attachments: chatAttachments,
         skills: Array.from(activeSessionSkills),
         deep_research_context: researchContext || null
     };
 
     try {
-        const response = await fetch(`${config.apiBase}/chat/${config.projetoId}/gerar`, {
-            method: 'POST',
-            credentials: 'include',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(requestBody)
-        });
+        let response = await postChatRequest(
+            `${config.apiBase}/chat/${config.projetoId}/gerar`,
+            () => withChatHistory(requestBody, chatHistory)
+        );
 
+        if (isCapacityResponse(response)) {
+            throw new Error(capacityMessage(response));
+        }
         if (!response.ok) {
             const errorText = await response.text();
             throw new Error(`HTTP ${response.status}: ${errorText}`);
         }
 
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
         let fullResponse = '';
         let processedFields = new Set();
-        let lineBuffer = '';
 
-        while (true) {
-            const { done, value } = await reader.read();
-            if (done) break;
+        // Resumable generation (SSE v2): the server keeps generating if the
+        // connection drops; we reconnect with Last-Event-ID and continue.
+        let generationId = response.headers.get('X-Generation-Id');
+        let lastEventId = 0;
+        let generationFinished = false;
+        let resumeAttempts = 0;
 
-            lineBuffer += decoder.decode(value, { stream: true });
-            const lines = lineBuffer.split('\n');
-            lineBuffer = lines.pop(); // Keep partial line
+        function handleGenerationEvent(rawData) {
+            try {
+                const data = JSON.parse(rawData);
 
-            for (const line of lines) {
-                const trimmedLine = line.trim();
-                if (!trimmedLine || !trimmedLine.startsWith('data: ')) continue;
+                if (data.type === 'generation') {
+                    generationId = data.generation_id;
+                }
 
-                const rawData = trimmedLine.slice(6);
+                if (data.type === 'queue') {
+                    const progress = document.getElementById('workspaceProgress');
+                    if (progress) progress.textContent = `Na fila (posição ${data.position})`;
+                }
 
-                try {
-                    const data = JSON.parse(rawData);
+                if (data.type === 'reasoning') {
+                    // Ignorar raciocinio durante a geracao de artefatos para nao quebrar o JSON
+                    console.debug('[Generation] Ignorando reasoning chunk');
+                }
 
-                    if (data.type === 'reasoning') {
-                        // Ignorar raciocinio durante a geracao de artefatos para nao quebrar o JSON
-                        console.debug('[Generation] Ignorando reasoning chunk (cumulative):', data.content.substring(0, 20) + '...');
-                    }
+                if (data.type === 'chunk') {
+                    fullResponse = applySSEDelta(fullResponse, data);
+                    const newFields = updateFieldsFromStream(fullResponse, processedFields);
+                    newFields.forEach(f => processedFields.add(f));
+                    updateProgress(processedFields.size);
+                }
 
-                    if (data.type === 'chunk') {
-                        // OpenRouter Items Paradigm: data.content is cumulative
-                        fullResponse = data.content;
-                        const newFields = updateFieldsFromStream(fullResponse, processedFields);
-                        newFields.forEach(f => processedFields.add(f));
-                        updateProgress(processedFields.size);
-                    }
+                checkSSECheckpoint(data, { chunk: fullResponse });
 
-                    if (data.type === 'field') {
-                        const fieldKey = data.field;
-                        const fieldValue = data.value;
-                        updateFieldValue(fieldKey, fieldValue);
+                if (data.type === 'field') {
+                    const fieldKey = data.field;
+                    const fieldValue = data.value;
+                    updateFieldValue(fieldKey, fieldValue);
+                }
+
+                // Campo fechado no JSON (validado no servidor): valor final, já decodificado
+                if (data.type === 'field_complete') {
+                    updateFieldValue(data.field, data.value);
+                    processedFields.add(data.field);
+                    updateProgress(processedFields.size);
+                }
+
+                if (data.type === 'sections') {
+                    const progress = document.getElementById('workspaceProgress');
+                    if (progress) progress.textContent = `Gerando em ${data.sections.length} seções paralelas...`;
+                }
+
+                if (data.type === 'repair') {
+                    const progress = document.getElementById('workspaceProgress');
+                    if (progress) progress.textContent = `Corrigindo ${data.fields.length} campo(s)...`;
+                }
+
+                if (data.type === 'complete') {
+                    generationFinished = true;
+                    if (data.success && data.data) {
+                        window.artifactData = data.data;
+                        populateAllFields(data.data);
                     }
+                    finishGeneration();
+                }
 
-                    if (data.type === 'complete') {
-                        if (data.success && data.data) {
-                            window.artifactData = data.data;
-                            populateAllFields(data.data);
+                if (data.type === 'error') {
+                    generationFinished = true;
+                    console.error(`[${config.artifactType} Gen] Erro do servidor:`, data.error);
+                    addMessage('assistant', '❌ **Erro do servidor:** ' + data.error);
+                }
+            } catch (e) {
+                console.error('SSE parse error:', e);
+            }
+        }
+
+        while (true) {
+            try {
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let lineBuffer = '';
+                let pendingEventId = null;
+
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+
+                    lineBuffer += decoder.decode(value, { stream: true });
+                    const lines = lineBuffer.split('\n');
+                    lineBuffer = lines.pop(); // Keep partial line
+
+                    for (const line of lines) {
+                        const trimmedLine = line.trim();
+                        if (trimmedLine.startsWith('id: ')) {
+                            pendingEventId = parseInt(trimmedLine.slice(4), 10);
+                            continue;
                         }
-                        finishGeneration();
-                    }
+                        if (!trimmedLine || !trimmedLine.startsWith('data: ')) continue;
 
-                    if (data.type === 'error') {
-                        console.error(`[${config.artifactType} Gen] Erro do servidor:`, data.error);
-                        addMessage('assistant', '❌ **Erro do servidor:** ' + data.error);
+                        const rawData = trimmedLine.slice(6);
+                        if (pendingEventId !== null) {
+                            lastEventId = pendingEventId;
+                            pendingEventId = null;
+                        }
+
+                        handleGenerationEvent(rawData);
                     }
-                } catch (e) {
-                    console.error('SSE parse error:', e);
                 }
+
+                if (generationId && !generationFinished) {
+                    throw new Error('Conexão encerrada antes do fim da geração');
+                }
+                break;
+            } catch (streamErr) {
+                if (!generationId || generationFinished || resumeAttempts >= 3) throw streamErr;
+                resumeAttempts++;
+                console.warn(`[${config.artifactType} Gen] Conexão perdida, retomando após evento ${lastEventId} (tentativa ${resumeAttempts})`);
+                await new Promise(resolve => setTimeout(resolve, 1000 * resumeAttempts));
+                response = await fetch(`${config.apiBase}/chat/${config.projetoId}/gerar/${generationId}/stream`, {
+                    credentials: 'include',
+                    headers: { 'X-SSE-Protocol': '2', 'Last-Event-ID': String(lastEventId) }
+                });
+                if (!response.ok) throw streamErr;
             }
         }
 
@@ -1891,6 +2075,10 @@ async function sendInlineChat(fieldKey) {
 }
 
 // ========== FIELD REGENERATION ==========
+// Fields already regenerated on this page: asking again means "another version",
+// so the server skips its response cache (which only dedupes double clicks)
+const regeneratedFields = new Set();
+
 async function regenerateField(fieldKey, customInstructions = '', modelOverride = null, skillsOverride = [], attachmentsOverride = []) {
     const config = window.ARTIFACT_CONFIG;
     const fields = window.ARTIFACT_FIELDS;
@@ -1917,15 +2105,16 @@ async function regenerateField(fieldKey, customInstructions = '', modelOverride
         const response = await fetch(`${config.apiBase}/chat/${config.projetoId}/regenerar-campo`, {
             method: 'POST',
             credentials: 'include',
-            headers: { 'Content-Type': 'application/json' },
+            headers: SSE_JSON_HEADERS,
             body: JSON.stringify({
                 campo: fieldKey,
                 history: chatHistory,
                 prompt_adicional: customInstructions || `Melhore o texto mantendo a essência.`,
                 valor_atual: currentValue,
-                model: modelOverride || localStorage.getItem('selectedAIModel'),
+                model: modelForRequest(modelOverride || localStorage.getItem('selectedAIModel')),
                 active_skills: activeSkills,
-                attachments: attachmentsOverride
+                attachments: attachmentsOverride,
+                nova_versao: regeneratedFields.has(fieldKey)
             })
         });
 
@@ -1956,8 +2145,10 @@ async function regenerateField(fieldKey, customInstructions = '', modelOverride
                 try {
                     const data = JSON.parse(trimmedLine.slice(6));
 
+                    checkSSECheckpoint(data, { chunk: contentBuffer });
+
                     if (data.type === 'chunk') {
-                        contentBuffer = data.content;
+                        contentBuffer = applySSEDelta(contentBuffer, data);
                         // Live-update the field as it streams
                         const input = document.getElementById(`input-${fieldKey}`);
                         if (input) input.value = contentBuffer;
@@ -1979,6 +2170,7 @@ async function regenerateField(fieldKey, customInstructions = '', modelOverride
         }
 
         if (success || contentBuffer) {
+            regeneratedFields.add(fieldKey);
             updateFieldValue(fieldKey, contentBuffer);
             addMessage('assistant', `✅ **${fieldLabel}** regenerado com sucesso!`);
         } else {
@@ -2099,14 +2291,16 @@ async function loadAIModels() {
         if (!response.ok) throw new Error('Failed to load models');
 
         const data = await response.json();
-        availableModels = data.models;
+        availableModels = data.auto_routing ? [MODEL_AUTO_OPTION, ...data.models] : data.models;
         modelsLoaded = true;
 
         console.log('[Model Selector] Loaded models:', availableModels.length);
 
         // Load saved model from localStorage or use default
+        // (automatic routing by default when the server has it enabled)
         const savedModel = localStorage.getItem('selectedAIModel');
-        selectedModel = savedModel || data.default;
+        const savedAvailable = savedModel && availableModels.some(m => m.id === savedModel);
+        selectedModel = savedAvailable ? savedModel : (data.auto_routing ? MODEL_AUTO : data.default);
 
         // Render models in dropdown
         renderModelOptions();
@@ -0,0 +1,144 @@
+"""
+Testes do parser JSON incremental (app/services/agents/json_stream.py).
+"""
+
+import pytest
+
+from app.services.agents.json_stream import (
+    IncrementalJSONParser,
+    campos_faltantes,
+    validar_campo,
+)
+
+pytestmark = pytest.mark.unit
+
+DOCUMENTO = (
+    '```json\n'
+    '{"objeto": "Aquisição de 10 notebooks, {modelo X}",\n'
+    ' "itens": [{"qtd": 10, "obs": "a,b}"}],\n'
+    ' "valor": 1500.5,\n'
+    ' "aprovado": true,\n'
+    ' "nota": "linha 1\\nlinha \\"2\\", fim"}\n'
+    '```'
+)
+
+ESPERADO = {
+    "objeto": "Aquisição de 10 notebooks, {modelo X}",
+    "itens": [{"qtd": 10, "obs": "a,b}"}],
+    "valor": 1500.5,
+    "aprovado": True,
+    "nota": 'linha 1\nlinha "2", fim',
+}
+
+
+def _alimentar_em_pedacos(texto, tamanho):
+    parser = IncrementalJSONParser()
+    entregues = []
+    for i in range(0, len(texto), tamanho):
+        entregues += parser.alimentar(texto[i:i + tamanho])
+    entregues += parser.finalizar()
+    return parser, entregues
+
+
+class TestIncrementalJSONParser:
+
+    @pytest.mark.parametrize("tamanho", [1, 2, 3, 7, 64, len(DOCUMENTO)])
+    def test_qualquer_divisao_em_chunks(self, tamanho):
+        parser, entregues = _alimentar_em_pedacos(DOCUMENTO, tamanho)
+        assert dict(entregues) == ESPERADO
+        assert [chave for chave, _ in entregues] == list(ESPERADO)
+        assert parser.campos == ESPERADO
+        assert parser.invalidos == {}
+        assert parser.completo
+
+    def test_campo_entregue_assim_que_fecha(self):
+        parser = IncrementalJSONParser()
+        assert parser.alimentar('{"a": "x, y}') == []
+        assert parser.alimentar('", "b": 1') == [("a", "x, y}")]
+        assert parser.alimentar("}") == [("b", 1)]
+        assert parser.completo
+
+    def test_virgula_e_chave_dentro_de_string(self):
+        parser = IncrementalJSONParser()
+        entregues = parser.alimentar('{"a": "fecha } e , separa", "b": "\\"}"}')
+        assert entregues == [("a", "fecha } e , separa"), ("b", '"}')]
+
+    def test_escape_dividido_entre_chunks(self):
+        parser, entregues = _alimentar_em_pedacos('{"a": "x\\"}, y"}', 5)
+        assert entregues == [("a", 'x"}, y')]
+
+    def test_valor_truncado_fica_faltando(self):
+        parser = IncrementalJSONParser()
+        parser.alimentar('{"a": "ok", "b": "sem fim')
+        assert parser.finalizar() == []
+        assert parser.campos == {"a": "ok"}
+        assert "b" not in parser.invalidos
+        assert not parser.completo
+
+    def test_lista_truncada_fica_faltando(self):
+        parser = IncrementalJSONParser()
+        parser.alimentar('{"a": [1, 2')
+        assert parser.finalizar() == []
+        assert parser.campos == {}
+
+    def test_ultimo_valor_inteiro_sem_fechamento(self):
+        parser = IncrementalJSONParser()
+        parser.alimentar('{"a": 1, "b": "fim"')
+        assert parser.finalizar() == [("b", "fim")]
+        assert parser.campos == {"a": 1, "b": "fim"}
+
+    def test_valor_quebrado_nao_derruba_os_demais(self):
+        parser = IncrementalJSONParser()
+        entregues = parser.alimentar('{"a": tru, "b": 2}')
+        assert entregues == [("b", 2)]
+        assert "a" in parser.invalidos
+        assert parser.campos == {"b": 2}
+
+    def test_quebra_de_linha_literal_em_string(self):
+        parser = IncrementalJSONParser()
+        assert parser.alimentar('{"a": "linha 1\nlinha 2"}') == [("a", "linha 1\nlinha 2")]
+
+    def test_texto_apos_o_fechamento_e_ignorado(self):
+        parser = IncrementalJSONParser()
+        parser.alimentar('{"a": 1}')
+        assert parser.alimentar(', "b": 2}') == []
+        assert parser.campos == {"a": 1}
+
+
+class TestValidarCampo:
+
+    CONFIG = {
+        "descricao": {"tipo": "B", "input_type": "textarea"},
+        "itens": {"tipo": "B", "input_type": "json"},
+        "urgente": {"tipo": "B", "input_type": "checkbox"},
+        "modalidade": {"tipo": "B", "input_type": "select", "campo_ia": "modalidade_sugerida",
+                       "options": [{"value": "pregao", "label": "Pregão"}, {"value": "dispensa", "label": "Dispensa"}]},
+        "responsavel": {"tipo": "A", "input_type": "text"},
+    }
+
+    def test_valores_validos(self):
+        assert validar_campo(self.CONFIG, "descricao", "Texto") is None
+        assert validar_campo(self.CONFIG, "itens", [{"qtd": 1}]) is None
+        assert validar_campo(self.CONFIG, "urgente", False) is None
+
+    def test_opcao_pelo_value(self):
+        assert validar_campo(self.CONFIG, "modalidade_sugerida", "pregao") is None
+        assert validar_campo(self.CONFIG, "modalidade", "Pregão") == "valor fora das opções do campo"
+
+    def test_opcoes_simples(self):
+        config = {"x": {"options": ["a", "b"]}}
+        assert validar_campo(config, "x", "a") is None
+        assert validar_campo(config, "x", "c") is not None
+
+    def test_tipos_errados(self):
+        assert validar_campo(self.CONFIG, "itens", "lista") is not None
+        assert validar_campo(self.CONFIG, "urgente", "sim") is not None
+        assert validar_campo(self.CONFIG, "descricao", "   ") == "valor vazio"
+
+    def test_null_e_chave_fora_do_config_aceitos(self):
+        assert validar_campo(self.CONFIG, "descricao", None) is None
+        assert validar_campo(self.CONFIG, "prioridade_sugerida", 123) is None
+
+    def test_campos_faltantes_pelo_nome_gerado(self):
+        faltantes = campos_faltantes(self.CONFIG, {"descricao": "x", "modalidade_sugerida": "pregao"})
+        assert faltantes == ["itens", "urgente"]
@@ -0,0 +1,162 @@
+"""
+Testes do escalonador de chamadas ao LLM (app/services/agents/llm_scheduler.py).
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.agents.llm_scheduler import (
+    CLASSE_CHAT,
+    CLASSE_GERACAO,
+    CLASSE_LOTE,
+    CLASSE_REGENERACAO,
+    LLMScheduler,
+)
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def escalonador(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_CONCURRENT", 2)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_RESERVED_INTERACTIVE", 1)
+    return LLMScheduler()
+
+
+async def _ciclos():
+    """Deixa as tarefas criadas chegarem ao await da fila (ou retomarem)."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _em_fila(escalonador, classe, usuario_id=None, custo=1.0, admitidos=None):
+    vaga = await escalonador.reservar(classe, usuario_id, custo=custo)
+    if admitidos is not None:
+        admitidos.append((classe, usuario_id, custo))
+    return vaga
+
+
+class TestReserva:
+
+    async def test_admissao_imediata_com_vaga(self, escalonador):
+        vaga = await escalonador.reservar(CLASSE_CHAT, 1)
+        assert escalonador.estado()["ativos"] == 1
+        vaga.liberar()
+        vaga.liberar()  # idempotente
+        assert escalonador.estado()["ativos"] == 0
+
+    async def test_vagas_reservadas_ao_chat(self, escalonador):
+        geracao = await escalonador.reservar(CLASSE_GERACAO, 1)
+        # Geração só usa MAX - RESERVED = 1 vaga; a segunda espera
+        segunda = asyncio.create_task(escalonador.reservar(CLASSE_GERACAO, 2))
+        await _ciclos()
+        assert not segunda.done()
+        # O chat ainda entra na vaga reservada
+        chat = await asyncio.wait_for(escalonador.reservar(CLASSE_CHAT, 3), timeout=1)
+        assert escalonador.estado()["ativos"] == 2
+
+        chat.liberar()
+        await _ciclos()
+        assert not segunda.done()  # a vaga liberada é a reservada ao chat
+        geracao.liberar()
+        (await segunda).liberar()
+        assert escalonador.estado()["ativos"] == 0
+
+    async def test_classe_desconhecida(self, escalonador):
+        with pytest.raises(ValueError):
+            await escalonador.reservar("inexistente")
+
+
+class TestOrdemDeAdmissao:
+
+    async def test_prioridade_estrita_entre_classes(self, escalonador, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_CONCURRENT", 1)
+        monkeypatch.setattr(settings, "LLM_SCHEDULER_RESERVED_INTERACTIVE", 0)
+        ocupada = await escalonador.reservar(CLASSE_CHAT, 0)
+        admitidos = []
+        tarefas = [
+            asyncio.create_task(_em_fila(escalonador, classe, admitidos=admitidos))
+            for classe in (CLASSE_LOTE, CLASSE_GERACAO, CLASSE_REGENERACAO, CLASSE_CHAT)
+        ]
+        await _ciclos()
+        assert admitidos == []
+
+        ocupada.liberar()
+        for _ in range(len(tarefas)):
+            await _ciclos()
+            ativas = [t.result() for t in tarefas if t.done() and not t.result().liberada]
+            assert len(ativas) == 1
+            ativas[0].liberar()
+        ordem = [classe for classe, _, _ in admitidos]
+        assert ordem == [CLASSE_CHAT, CLASSE_REGENERACAO, CLASSE_GERACAO, CLASSE_LOTE]
+
+    async def test_fila_justa_por_usuario(self, escalonador, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_CONCURRENT", 1)
+        monkeypatch.setattr(settings, "LLM_SCHEDULER_RESERVED_INTERACTIVE", 0)
+        ocupada = await escalonador.reservar(CLASSE_GERACAO, 0)
+        admitidos = []
+        # Usuário 1 enfileira três gerações grandes; usuário 2, uma pequena depois
+        tarefas = [
+            asyncio.create_task(_em_fila(escalonador, CLASSE_GERACAO, 1, 8000, admitidos))
+            for _ in range(3)
+        ]
+        await _ciclos()
+        tarefas.append(asyncio.create_task(_em_fila(escalonador, CLASSE_GERACAO, 2, 1000, admitidos)))
+        await _ciclos()
+
+        ocupada.liberar()
+        for _ in range(len(tarefas)):
+            await _ciclos()
+            ativas = [t.result() for t in tarefas if t.done() and not t.result().liberada]
+            assert len(ativas) == 1
+            ativas[0].liberar()
+        usuarios = [usuario for _, usuario, _ in admitidos]
+        # O pedido pequeno do usuário 2 não espera as três gerações do usuário 1
+        assert usuarios == [2, 1, 1, 1]
+
+
+class TestCancelamento:
+
+    async def test_cancelada_na_fila_nao_ocupa_vaga(self, escalonador):
+        ocupada = await escalonador.reservar(CLASSE_GERACAO, 1)
+        esperando = asyncio.create_task(escalonador.reservar(CLASSE_GERACAO, 2))
+        depois = asyncio.create_task(escalonador.reservar(CLASSE_GERACAO, 3))
+        await _ciclos()
+        assert escalonador.estado()["por_classe"][CLASSE_GERACAO]["fila"] == 2
+
+        esperando.cancel()
+        await _ciclos()
+        assert esperando.cancelled()
+        assert escalonador.estado()["por_classe"][CLASSE_GERACAO]["fila"] == 1
+
+        ocupada.liberar()
+        vaga = await asyncio.wait_for(depois, timeout=1)
+        assert escalonador.estado()["ativos"] == 1
+        vaga.liberar()
+        assert escalonador.estado()["ativos"] == 0
+
+    async def test_cancelada_no_mesmo_ciclo_da_admissao(self, escalonador):
+        ocupada = await escalonador.reservar(CLASSE_GERACAO, 1)
+        esperando = asyncio.create_task(escalonador.reservar(CLASSE_GERACAO, 2))
+        await _ciclos()
+
+        # Vaga liberada (o pedido é admitido) e a tarefa cancelada antes de retomar
+        ocupada.liberar()
+        esperando.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await esperando
+        assert escalonador.estado()["ativos"] == 0
+
+    async def test_cancelada_antes_da_liberacao(self, escalonador):
+        ocupada = await escalonador.reservar(CLASSE_GERACAO, 1)
+        esperando = asyncio.create_task(escalonador.reservar(CLASSE_GERACAO, 2))
+        await _ciclos()
+
+        esperando.cancel()
+        ocupada.liberar()
+        with pytest.raises(asyncio.CancelledError):
+            await esperando
+        assert escalonador.estado()["ativos"] == 0
+        assert escalonador.estado()["por_classe"][CLASSE_GERACAO]["fila"] == 0